@@ -0,0 +1,235 @@
+"""A binary game archive with random access.
+
+Games are stored as their tags, result and 16-bit move codes (see
+`move.encode_move`), followed by a table of every game's offset, so a
+reader can seek straight to game N and replay it with `ChessRules.push`
+without parsing any notation. SAN only has to be parsed once, when a PGN
+file is converted with `convert_pgn`.
+
+The file layout, all little-endian, is::
+
+    header       magic 'CGGA', version, game count, offset table offset
+    games        per game: tags length, tags, result, ply count, move codes
+    offset table one 64-bit offset per game
+
+Run ``python -m chess_game.archive ARCHIVE PGN...`` to convert PGN files.
+"""
+from __future__ import absolute_import
+import argparse
+import array
+import collections
+import mmap
+import struct
+import sys
+
+from . import common
+from . import notation
+from . import pgn
+from . import rules
+from .move import decode_move
+
+
+ArchivedGame = collections.namedtuple('ArchivedGame',
+                                      ['tags', 'result', 'codes'])
+
+VERSION = 1
+
+_header = struct.Struct('<4sIQQ')
+_magic = 'CGGA'
+_game_header = struct.Struct('<I')
+_moves_header = struct.Struct('<BI')
+_offset = struct.Struct('<Q')
+
+_results = ('*', '1-0', '0-1', '1/2-1/2')
+_result_codes = dict((result, code) for code, result in enumerate(_results))
+
+_swap_bytes = sys.byteorder != 'little'
+
+
+def _encode_tags(tags):
+    return ''.join('{0}\0{1}\0'.format(name, value)
+                   for name, value in tags.iteritems())
+
+
+def _decode_tags(data):
+    fields = data.split('\0')[:-1]
+    return collections.OrderedDict(zip(fields[::2], fields[1::2]))
+
+
+class ArchiveWriter(object):
+    """Writes games to a new archive at `path`; `close` (or leaving a with
+    block) writes the offset table and header."""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(_header.pack(_magic, VERSION, 0, 0))
+        # Packed as they are added, so the table is the same on every
+        # platform.
+        self._offsets = bytearray()
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def add_game(self, codes, result='*', tags=None):
+        """Append a game made of the move codes `codes`, from the initial
+        position."""
+        self._offsets += _offset.pack(self._file.tell())
+        self._count += 1
+        tag_data = _encode_tags(tags or {})
+        codes = array.array('H', codes)
+        if _swap_bytes:
+            codes.byteswap()
+        self._file.write(_game_header.pack(len(tag_data)))
+        self._file.write(tag_data)
+        self._file.write(_moves_header.pack(_result_codes.get(result, 0),
+                                            len(codes)))
+        codes.tofile(self._file)
+
+    def add_pgn_game(self, game, chess_rules=None, notation_processor=None):
+        """Append a pgn.PGNGame, parsing its SAN moves on `chess_rules`,
+        which must be at the initial position and is rewound afterwards.
+
+        Raises the notation or legality error of the first bad move.
+        """
+        if chess_rules is None:
+            chess_rules = rules.ChessRules()
+        if notation_processor is None:
+            notation_processor = notation.ChessNotationProcessor(chess_rules)
+        try:
+            for algebraic_move in game.moves:
+                chess_rules.make_trusted_move(
+                    notation_processor.parse_algebraic_move(algebraic_move)
+                )
+            codes = chess_rules.moves.codes[:]
+        finally:
+            while chess_rules.moves:
+                chess_rules.pop()
+        self.add_game(codes, game.result, game.tags)
+
+    def close(self):
+        if self._file.closed:
+            return
+        table_offset = self._file.tell()
+        self._file.write(self._offsets)
+        self._file.seek(0)
+        self._file.write(_header.pack(_magic, VERSION, self._count,
+                                      table_offset))
+        self._file.close()
+
+
+def convert_pgn(pgn_paths, archive_path):
+    """Write the games of the PGN files at `pgn_paths` to a new archive,
+    skipping games with illegal or unreadable moves. Return the numbers of
+    games written and skipped."""
+    chess_rules = rules.ChessRules()
+    notation_processor = notation.ChessNotationProcessor(chess_rules)
+    skipped = 0
+    with ArchiveWriter(archive_path) as writer:
+        for path in pgn_paths:
+            for game in pgn.read_games(path):
+                try:
+                    writer.add_pgn_game(game, chess_rules, notation_processor)
+                except common.BAD_MOVE_ERRORS:
+                    skipped += 1
+        return len(writer), skipped
+
+
+class GameArchive(object):
+    """A memory-mapped archive written by `ArchiveWriter`."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as archive_file:
+            self._data = mmap.mmap(archive_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        magic, version, self._count, self._table_offset = (
+            _header.unpack_from(self._data)
+        )
+        if magic != _magic or version != VERSION:
+            self._data.close()
+            raise ValueError('{0} is not a game archive'.format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._data.close()
+
+    def __len__(self):
+        return self._count
+
+    def _game_offset(self, number):
+        if not 0 <= number < self._count:
+            raise IndexError('game {0} out of range'.format(number))
+        return _offset.unpack_from(
+            self._data, self._table_offset + number * _offset.size
+        )[0]
+
+    def _moves_offset(self, number):
+        offset = self._game_offset(number)
+        tags_length, = _game_header.unpack_from(self._data, offset)
+        return offset + _game_header.size + tags_length
+
+    def codes(self, number):
+        """Return the move codes of game `number`, without reading its
+        tags."""
+        offset = self._moves_offset(number)
+        _, plies = _moves_header.unpack_from(self._data, offset)
+        offset += _moves_header.size
+        codes = array.array('H')
+        codes.fromstring(self._data[offset:offset + 2 * plies])
+        if _swap_bytes:
+            codes.byteswap()
+        return codes
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += self._count
+        offset = self._game_offset(number)
+        tags_length, = _game_header.unpack_from(self._data, offset)
+        offset += _game_header.size
+        tags = _decode_tags(self._data[offset:offset + tags_length])
+        result, _ = _moves_header.unpack_from(self._data,
+                                              offset + tags_length)
+        return ArchivedGame(tags, _results[result], self.codes(number))
+
+    def __iter__(self):
+        for number in xrange(self._count):
+            yield self[number]
+
+    def replay(self, number, chess_rules=None, plies=None):
+        """Make the first `plies` moves (all by default) of game `number` on
+        `chess_rules`, a new ChessRules by default, and return it.
+
+        The moves were checked when the game was written, so they are made
+        without validation or finalization.
+        """
+        if chess_rules is None:
+            chess_rules = rules.ChessRules()
+        for code in self.codes(number)[:plies]:
+            chess_rules.push(decode_move(code, chess_rules))
+        return chess_rules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('archive')
+    parser.add_argument('pgn_paths', nargs='+')
+    args = parser.parse_args(argv)
+
+    written, skipped = convert_pgn(args.pgn_paths, args.archive)
+    print '{0} games written to {1}, {2} skipped'.format(written, args.archive,
+                                                         skipped)
+
+
+if __name__ == '__main__':
+    main()
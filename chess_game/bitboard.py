@@ -0,0 +1,209 @@
+from __future__ import absolute_import
+
+from . import board
+from . import common
+from . import pieces
+from . import tables
+from .position import ALL_POSITIONS, Position
+
+
+def _mask(positions):
+    bits = 0
+    for position in positions:
+        bits |= 1 << position.index
+    return bits
+
+
+def _iterate_bits(bits):
+    while bits:
+        lowest_bit = bits & -bits
+        yield lowest_bit.bit_length() - 1
+        bits ^= lowest_bit
+
+
+KNIGHT_ATTACKS = [_mask(targets) for targets in tables.KNIGHT_TARGETS]
+KING_ATTACKS = [_mask(targets) for targets in tables.KING_TARGETS]
+PAWN_ATTACKS = dict(
+    (color, [_mask(targets) for targets in table])
+    for color, table in tables.PAWN_ATTACKS.items()
+)
+RAY_MASKS = dict(
+    (direction, [_mask(ray) for ray in rays])
+    for direction, rays in tables.SLIDING_RAYS.items()
+)
+# Rays pointing towards higher indices meet their nearest blocker at the
+# lowest set bit, the others at the highest.
+_ascending_directions = frozenset(
+    direction for direction in RAY_MASKS
+    if direction[0] * 8 + direction[1] > 0
+)
+
+
+def sliding_attacks(index, occupied, directions):
+    """Return the bitboard of squares attacked from `index` along `directions`,
+    stopping at (and including) the first occupied square on each ray."""
+    attacks = 0
+    for direction in directions:
+        ray = RAY_MASKS[direction][index]
+        blockers = ray & occupied
+        if blockers:
+            if direction in _ascending_directions:
+                first_blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                first_blocker = blockers.bit_length() - 1
+            ray ^= RAY_MASKS[direction][first_blocker]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(index, occupied):
+    return sliding_attacks(index, occupied, tables.DIAGONALS)
+
+
+def rook_attacks(index, occupied):
+    return sliding_attacks(index, occupied, tables.STRAIGHTS)
+
+
+def piece_attacks(piece, index, occupied):
+    """Return the bitboard of squares attacked by `piece` standing on `index`."""
+    piece_class = type(piece)
+    if piece_class is pieces.Pawn:
+        return PAWN_ATTACKS[piece.color][index]
+    if piece_class is pieces.Knight:
+        return KNIGHT_ATTACKS[index]
+    if piece_class is pieces.King:
+        return KING_ATTACKS[index]
+    if piece_class is pieces.Bishop:
+        return bishop_attacks(index, occupied)
+    if piece_class is pieces.Rook:
+        return rook_attacks(index, occupied)
+    if piece_class is pieces.Queen:
+        return bishop_attacks(index, occupied) | rook_attacks(index, occupied)
+    return 0
+
+
+_piece_classes = (pieces.Pawn, pieces.Knight, pieces.Bishop,
+                  pieces.Rook, pieces.Queen, pieces.King)
+
+
+class BitboardChessBoard(board.ChessBoard):
+    """A chess board that keeps a 64-bit occupancy integer per color and piece
+    type alongside the piece array, and answers attack queries with bitwise
+    operations."""
+
+    provides_attacks = True
+
+    def __init__(self, board_array=None):
+        self.reset_board(board_array)
+
+    def reset_board(self, board_array=None):
+        if board_array is None:
+            board_array = self._new_board_array
+        self._board = [pieces.Empty] * 64
+        self._piece_bitboards = dict(
+            (color, dict((piece_class, 0) for piece_class in _piece_classes))
+            for color in (common.color.WHITE, common.color.BLACK)
+        )
+        self._occupancy = {common.color.WHITE: 0, common.color.BLACK: 0}
+        for index, piece in enumerate(board_array):
+            self.set_piece_at_index(index, piece)
+
+    def snapshot(self):
+        clone = object.__new__(type(self))
+        clone._board = list(self._board)
+        clone._piece_bitboards = dict(
+            (color, dict(bitboards))
+            for color, bitboards in self._piece_bitboards.iteritems()
+        )
+        clone._occupancy = dict(self._occupancy)
+        return clone
+
+    @property
+    def occupied(self):
+        return (self._occupancy[common.color.WHITE] |
+                self._occupancy[common.color.BLACK])
+
+    def occupancy(self, color):
+        return self._occupancy[color]
+
+    def piece_bitboard(self, piece_class, color):
+        return self._piece_bitboards[color][piece_class]
+
+    @Position.provide_position
+    def get_piece(self, position):
+        return self._board[position.index]
+
+    @Position.provide_position
+    def set_piece(self, position, piece=pieces.Empty):
+        self.set_piece_at_index(position.index, piece)
+
+    def get_piece_at_index(self, index):
+        return self._board[index]
+
+    def set_piece_at_index(self, index, piece):
+        bit = 1 << index
+        old_piece = self._board[index]
+        if not old_piece.is_empty:
+            self._piece_bitboards[old_piece.color][type(old_piece)] &= ~bit
+            self._occupancy[old_piece.color] &= ~bit
+        if not piece.is_empty:
+            self._piece_bitboards[piece.color][type(piece)] |= bit
+            self._occupancy[piece.color] |= bit
+        self._board[index] = piece
+
+    @Position.provide_position
+    def get_attacks(self, position):
+        """Return the bitboard of squares attacked by the piece on `position`."""
+        return piece_attacks(self._board[position.index], position.index,
+                             self.occupied)
+
+    @Position.provide_position
+    def is_square_threatened(self, position, by_color=common.color.WHITE):
+        return self.is_index_threatened(position.index, by_color)
+
+    def is_index_threatened(self, index, by_color):
+        attackers = self._piece_bitboards[by_color]
+        if KNIGHT_ATTACKS[index] & attackers[pieces.Knight]:
+            return True
+        # A pawn of by_color attacks this square exactly when a pawn of the
+        # other color standing here would attack the pawn's square.
+        if PAWN_ATTACKS[by_color.opponent][index] & attackers[pieces.Pawn]:
+            return True
+        if KING_ATTACKS[index] & attackers[pieces.King]:
+            return True
+        occupied = self.occupied
+        diagonal_attackers = attackers[pieces.Bishop] | attackers[pieces.Queen]
+        if diagonal_attackers and bishop_attacks(index, occupied) & diagonal_attackers:
+            return True
+        straight_attackers = attackers[pieces.Rook] | attackers[pieces.Queen]
+        if straight_attackers and rook_attacks(index, occupied) & straight_attackers:
+            return True
+        return False
+
+    @Position.provide_position
+    def get_attackers(self, position, by_color=common.color.WHITE):
+        return self.get_index_attackers(position.index, by_color)
+
+    def get_index_attackers(self, index, by_color):
+        attackers = self._piece_bitboards[by_color]
+        occupied = self.occupied
+        diagonal_attackers = attackers[pieces.Bishop] | attackers[pieces.Queen]
+        straight_attackers = attackers[pieces.Rook] | attackers[pieces.Queen]
+        attacker_bits = (
+            KNIGHT_ATTACKS[index] & attackers[pieces.Knight] |
+            PAWN_ATTACKS[by_color.opponent][index] & attackers[pieces.Pawn] |
+            KING_ATTACKS[index] & attackers[pieces.King] |
+            bishop_attacks(index, occupied) & diagonal_attackers |
+            rook_attacks(index, occupied) & straight_attackers
+        )
+        return [Position.from_index(attacker) for attacker in _iterate_bits(attacker_bits)]
+
+    def get_piece_destinations(self, index):
+        """Return the squares the knight, bishop, rook or queen on `index`
+        moves to, pins aside: the squares it attacks that its own pieces
+        don't stand on."""
+        piece = self._board[index]
+        destinations = (piece_attacks(piece, index, self.occupied) &
+                        ~self._occupancy[piece.color])
+        return [ALL_POSITIONS[destination]
+                for destination in _iterate_bits(destinations)]
@@ -8,12 +8,32 @@ from .position import Position
 
 class ChessBoard(object):
 
+    # Boards that set this implement is_index_threatened, get_index_attackers
+    # and get_piece_destinations themselves, and ChessRules defers to them.
+    provides_attacks = False
+    # How many DeltaChessBoards deep this board is.
+    chain_length = 0
+
     def get_piece(self, position):
         raise NotImplemented()
 
     def set_piece(self, position, moved_piece):
         raise NotImplemented()
 
+    # Subclasses override these with versions that skip Position.make; move
+    # generation only ever goes through them.
+    def get_piece_at_index(self, index):
+        return self.get_piece(Position.from_index(index))
+
+    def set_piece_at_index(self, index, piece):
+        self.set_piece(Position.from_index(index), piece=piece)
+
+    def snapshot(self):
+        """Return a standalone board with the same pieces, which later changes
+        to this board don't affect."""
+        return BasicChessBoard([self.get_piece_at_index(index)
+                                for index in range(64)])
+
     def make_move(self, source, dest, moved_piece=None):
         if moved_piece is None:
             moved_piece = self.get_piece(source)
@@ -58,11 +78,14 @@ class ChessBoard(object):
 
 class BasicChessBoard(ChessBoard):
 
-    def __init__(self):
-        self.reset_board()
+    def __init__(self, board_array=None):
+        self.reset_board(board_array)
 
-    def reset_board(self):
-        self._board = self._new_board_array
+    def reset_board(self, board_array=None):
+        if board_array is None:
+            board_array = self._new_board_array
+        self._board = list(board_array)
+        self._shared = False
 
     @Position.provide_position
     def get_piece(self, position):
@@ -70,13 +93,43 @@ class BasicChessBoard(ChessBoard):
 
     @Position.provide_position
     def set_piece(self, position, piece=pieces.Empty):
-        self._board[position.index] = piece
+        self.set_piece_at_index(position.index, piece)
+
+    def get_piece_at_index(self, index):
+        return self._board[index]
+
+    def set_piece_at_index(self, index, piece):
+        if self._shared:
+            # Copy on write: stop sharing the squares with the snapshot.
+            self._board = list(self._board)
+            self._shared = False
+        self._board[index] = piece
+
+    def snapshot(self):
+        """Return a copy of this board that shares its squares with it until
+        either of them is changed."""
+        clone = object.__new__(type(self))
+        clone._board = self._board
+        clone._shared = self._shared = True
+        return clone
 
 
 class DeltaChessBoard(ChessBoard):
+    """A board that records its changes on top of a parent board.
+
+    Lookups fall through the chain of parents, so a parent that is more than
+    `max_chain_length` deltas deep is flattened into a snapshot first.
+    """
 
-    def __init__(self, parent):
+    max_chain_length = 4
+
+    def __init__(self, parent, max_chain_length=None):
+        if max_chain_length is not None:
+            self.max_chain_length = max_chain_length
+        if parent.chain_length >= self.max_chain_length:
+            parent = parent.snapshot()
         self.parent = parent
+        self.chain_length = parent.chain_length + 1
         self.reset_to_parent()
 
     def reset_to_parent(self):
@@ -84,11 +137,17 @@ class DeltaChessBoard(ChessBoard):
 
     @Position.provide_position
     def get_piece(self, position):
-        piece = self.delta_dictionary.get(position, None)
-        if piece is None:
-            return self.parent[position]
-        return piece
+        return self.get_piece_at_index(position.index)
 
     @Position.provide_position
     def set_piece(self, position, piece=pieces.Empty):
-        self.delta_dictionary[position] = piece
+        self.delta_dictionary[position.index] = piece
+
+    def get_piece_at_index(self, index):
+        piece = self.delta_dictionary.get(index, None)
+        if piece is None:
+            return self.parent.get_piece_at_index(index)
+        return piece
+
+    def set_piece_at_index(self, index, piece):
+        self.delta_dictionary[index] = piece
@@ -0,0 +1,99 @@
+"""Bounded LRU caches for results that only depend on the position.
+
+ChessRules consults a cache only when one is passed to it, keyed by the
+position's Zobrist key, so replaying the same positions (e.g. openings)
+skips recomputing legal moves and game status.
+"""
+from __future__ import absolute_import
+import collections
+import sys
+
+
+def estimate_size(value):
+    """Roughly estimate the memory held by `value`, counting one level of
+    container items."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class PositionCache(object):
+    """A least-recently-used mapping bounded by its number of entries and,
+    optionally, by the estimated size of its keys and values in bytes."""
+
+    def __init__(self, max_entries=100000, max_bytes=None,
+                 sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clear()
+
+    def clear(self):
+        self._entries = collections.OrderedDict()
+        self._sizes = {}
+        self.size_in_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size_in_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # Reinsert to mark the entry as the most recently used.
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if key in self._entries:
+            del self._entries[key]
+            self.size_in_bytes -= self._sizes.pop(key, 0)
+        self._entries[key] = value
+        if self.max_bytes is not None:
+            size = self.sizeof(key) + self.sizeof(value)
+            self._sizes[key] = size
+            self.size_in_bytes += size
+        self._evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or
+            (self.max_bytes is not None and self.size_in_bytes > self.max_bytes)
+        ):
+            key, _ = self._entries.popitem(last=False)
+            self.size_in_bytes -= self._sizes.pop(key, 0)
+            self.evictions += 1
+
+
+_missing = object()
+
+# Shared by every ChessRules/ChessGame that opts into it, so that all the
+# games in a process benefit from each other's work.
+default_cache = PositionCache()
@@ -24,6 +24,19 @@ class IllegalSquareError(Exception): pass
 class ImpossibleMoveError(Exception): pass
 class InvalidNotationError(Exception): pass
 class PieceNotFoundError(Exception): pass
+class StaleMoveError(Exception): pass
+
+# What parsing a move from notation and making it raise when the move is bad,
+# as opposed to a bug.
+BAD_MOVE_ERRORS = (
+    ActiveColorError,
+    AmbiguousAlgebraicMoveError,
+    IllegalMoveError,
+    IllegalPositionError,
+    ImpossibleMoveError,
+    InvalidNotationError,
+    PieceNotFoundError,
+)
 
 
 def listify(function):
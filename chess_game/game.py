@@ -1,28 +1,141 @@
+import array
+
+from . import board
 from . import notation
 from . import rules
+from .move import decode_move
+
+
+# Validation levels for ChessGame.make_moves_from_long_uci_string.
+STRICT = 'strict'
+TRUSTED = 'trusted'
+UNCHECKED = 'unchecked'
 
 
 class ChessGame(object):
 
-    def __init__(self):
-        self._rules = rules.ChessRules()
+    def __init__(self, board_class=board.BasicChessBoard, position_cache=None,
+                 fen=None, lazy_finalization=False, checkpoint_interval=16):
+        if fen is None:
+            self._rules = rules.ChessRules(_board=board_class(),
+                                           position_cache=position_cache,
+                                           lazy_finalization=lazy_finalization)
+        else:
+            self._rules = rules.ChessRules.from_fen(
+                fen, board_class, position_cache=position_cache,
+                lazy_finalization=lazy_finalization
+            )
         self._notation_processor = notation.ChessNotationProcessor(self._rules)
+        # Every move code of the game, including the ones after the current
+        # ply, and a snapshot of the rules every `checkpoint_interval` plies.
+        self._line = array.array('H')
+        self._ply = 0
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoints = {0: self._rules.snapshot()}
+        # Whether lazily finalized moves handed out still need the current
+        # rules' history, which goto must then leave alone.
+        self._lazy_moves_outstanding = False
 
     def make_move_from_algebraic_and_return_uci(self, algebraic_move):
         return self.make_move_from_algebraic(algebraic_move).uci
 
     def make_move_from_algebraic(self, algebraic_move):
         move = self._notation_processor.parse_algebraic_move(algebraic_move)
-        return self._rules.make_legal_move(move)
+        return self.make_move_direct(move)
 
     def make_move_direct(self, move):
-        return self._rules.make_legal_move(move)
+        finalized_move = self._rules.make_legal_move(move)
+        self._record_move()
+        if self._rules.lazy_finalization:
+            self._lazy_moves_outstanding = True
+        return finalized_move
+
+    def make_moves_from_long_uci_string(self, long_uci_string,
+                                       validation=STRICT, record=False):
+        """Make the moves in `long_uci_string`.
 
-    def make_moves_from_long_uci_string(self, long_uci_string):
+        With STRICT validation every move is fully checked and finalized, and
+        the finalized moves are returned. TRUSTED validation only checks that
+        each move is pseudo-legal and leaves the king safe, and UNCHECKED
+        makes the moves as they are; both skip finalization and return the
+        final FEN, or with `record` the Zobrist key after each ply.
+        """
         moves = self._notation_processor.build_moves_from_long_uci_string(
             long_uci_string
         )
-        return map(self.make_move_direct, moves)
+        if validation == STRICT:
+            return map(self.make_move_direct, moves)
+        validate = validation == TRUSTED
+        zobrist_keys = []
+        for move in moves:
+            self._rules.make_trusted_move(move, validate=validate)
+            self._record_move()
+            if record:
+                zobrist_keys.append(self._rules.zobrist_key)
+        return zobrist_keys if record else self.fen()
+
+    def _record_move(self):
+        # A move made before the end of the line starts a new line from it.
+        del self._line[self._ply:]
+        for ply in [ply for ply in self._checkpoints if ply > self._ply]:
+            del self._checkpoints[ply]
+        self._line.append(self._rules.moves.codes[-1])
+        self._ply += 1
+        if self._ply % self.checkpoint_interval == 0:
+            self._checkpoints[self._ply] = self._rules.snapshot()
+
+    @property
+    def ply(self):
+        """The number of plies played to reach the current position."""
+        return self._ply
+
+    @property
+    def plies(self):
+        """The number of plies in the game, which can be more than `ply`
+        after going back with `goto`."""
+        return len(self._line)
+
+    def goto(self, ply):
+        """Go to the position after `ply` plies of the game.
+
+        Moves are taken back or replayed from the current position, or
+        replayed from the closest checkpoint before `ply` if that is
+        shorter, so at most `checkpoint_interval - 1` moves are made.
+
+        Lazily finalized moves made before are left on rules of their own,
+        so they keep computing their SAN from the line they were made in.
+        """
+        if not 0 <= ply <= len(self._line):
+            raise IndexError('ply {0} is not in the game'.format(ply))
+        if ply == self._ply:
+            return
+        # The rules' history only goes back to the checkpoint they were
+        # restored from.
+        first_ply = self._ply - len(self._rules.moves)
+        checkpoint_ply = ply - ply % self.checkpoint_interval
+        if (self._lazy_moves_outstanding or ply < first_ply or
+            abs(ply - self._ply) > ply - checkpoint_ply):
+            self._rules = self._checkpoints[checkpoint_ply].snapshot()
+            self._notation_processor = notation.ChessNotationProcessor(
+                self._rules
+            )
+            self._ply = checkpoint_ply
+            self._lazy_moves_outstanding = False
+        while self._ply > ply:
+            self._rules.pop()
+            self._ply -= 1
+        while self._ply < ply:
+            self._rules.push(decode_move(self._line[self._ply], self._rules))
+            self._ply += 1
+
+    def step_forward(self):
+        self.goto(self._ply + 1)
+
+    def step_backward(self):
+        self.goto(self._ply - 1)
+
+    def fen(self):
+        return self._rules.to_fen()
 
     def board_string(self):
         return self._rules._board.board_string()
@@ -0,0 +1,232 @@
+"""Prove mate-in-N puzzles.
+
+`MateSolver` runs a depth-limited AND/OR search: some move of the side to
+move (the attacker) must mate or lead to a position where every defence
+loses within the remaining moves. Checks are tried first, and on the last
+move only the checking moves are generated at all. Proven and refuted
+positions are remembered by Zobrist key.
+
+`solve_puzzles` spreads many puzzles over a process pool. Run
+``python -m chess_game.mate PATH`` on a file with one ``FEN;N`` puzzle per
+line.
+"""
+from __future__ import absolute_import
+import argparse
+import collections
+import multiprocessing
+
+from . import cache
+from . import pieces
+from . import rules
+
+
+class MateSolution(collections.namedtuple('MateSolution',
+                                          ['mate_in', 'line', 'first_moves'])):
+    """`line` is the forced mate against the longest defence, and
+    `first_moves` every attacking first move that mates in `mate_in`."""
+
+    __slots__ = ()
+
+    @property
+    def unique(self):
+        return len(self.first_moves) == 1
+
+
+class MateSolver(object):
+    """Proves mates for the side to move of a ChessRules, which it leaves as
+    it found it."""
+
+    def __init__(self, chess_rules, proven_cache=None):
+        self.chess_rules = chess_rules
+        if proven_cache is None:
+            proven_cache = cache.PositionCache()
+        # Zobrist key -> (the fewest moves the attacker was proven to mate
+        # in, or None, the most moves it was proven not to mate in).
+        self.proven_cache = proven_cache
+
+    def solve(self, max_moves):
+        """Return the MateSolution for the shortest mate in at most
+        `max_moves` moves, or None if there isn't one."""
+        for mate_in in range(1, max_moves + 1):
+            if self.mates_in(mate_in):
+                break
+        else:
+            return None
+        first_moves = [
+            move for move in self._attacking_moves(mate_in)
+            if self._move_mates_in(move, mate_in)
+        ]
+        return MateSolution(mate_in, self._line(mate_in, first_moves[0]),
+                            first_moves)
+
+    def mates_in(self, moves):
+        """Return whether the side to move can force mate within `moves`
+        moves."""
+        key = self.chess_rules.zobrist_key
+        proven, refuted = self.proven_cache.get(key) or (None, 0)
+        if proven is not None and proven <= moves:
+            return True
+        if refuted >= moves:
+            return False
+        mates = any(self._move_mates_in(move, moves)
+                    for move in self._attacking_moves(moves))
+        if mates:
+            proven = moves if proven is None else min(proven, moves)
+        else:
+            refuted = max(refuted, moves)
+        self.proven_cache.set(key, (proven, refuted))
+        return mates
+
+    def _attacking_moves(self, moves):
+        chess_rules = self.chess_rules
+        checks = list(chess_rules.iterate_checking_moves())
+        if moves == 1:
+            # Only a check can mate.
+            return checks
+        check_ucis = set(move.uci for move in checks)
+        quiet_moves = [move for move in chess_rules.generate_legal_moves()
+                       if move.uci not in check_ucis]
+        # Then captures, which most often remove the last defenders.
+        quiet_moves.sort(key=lambda move: move.taken_piece.is_empty)
+        return checks + quiet_moves
+
+    def _move_mates_in(self, move, moves):
+        chess_rules = self.chess_rules
+        chess_rules.push(move)
+        try:
+            defences = chess_rules.generate_legal_moves()
+            if not defences:
+                return chess_rules.is_king_threatened(chess_rules.action)
+            if moves == 1:
+                return False
+            return all(self._defence_loses(defence, moves - 1)
+                       for defence in self._order_defences(defences))
+        finally:
+            chess_rules.pop()
+
+    def _defence_loses(self, defence, moves):
+        self.chess_rules.push(defence)
+        try:
+            return self.mates_in(moves)
+        finally:
+            self.chess_rules.pop()
+
+    @staticmethod
+    def _order_defences(defences):
+        # King moves and captures refute the most attempts, so try them first.
+        defences.sort(key=lambda move: not (
+            isinstance(move.piece, pieces.King) or
+            not move.taken_piece.is_empty
+        ))
+        return defences
+
+    def _line(self, moves, first_move):
+        """Return the forced line starting with `first_move`, in which the
+        defender always delays the mate the longest."""
+        chess_rules = self.chess_rules
+        line = []
+        try:
+            move = first_move
+            while True:
+                line.append(move)
+                chess_rules.push(move)
+                defences = chess_rules.generate_legal_moves()
+                if not defences:
+                    break
+                moves -= 1
+                defence_lengths = [
+                    (self._shortest_mate_after(defence, moves), defence)
+                    for defence in defences
+                ]
+                moves, defence = max(defence_lengths, key=lambda pair: pair[0])
+                line.append(defence)
+                chess_rules.push(defence)
+                move = next(move for move in self._attacking_moves(moves)
+                            if self._move_mates_in(move, moves))
+        finally:
+            for _ in line:
+                chess_rules.pop()
+        return line
+
+    def _shortest_mate_after(self, defence, moves):
+        self.chess_rules.push(defence)
+        try:
+            return next(mate_in for mate_in in range(1, moves + 1)
+                        if self.mates_in(mate_in))
+        finally:
+            self.chess_rules.pop()
+
+
+def solve(chess_rules, max_moves):
+    """Solve `chess_rules` with a fresh MateSolver. See `MateSolver.solve`."""
+    return MateSolver(chess_rules).solve(max_moves)
+
+
+PuzzleResult = collections.namedtuple('PuzzleResult', [
+    'fen', 'mate_in', 'line', 'first_moves'
+])
+
+
+def solve_puzzle(puzzle):
+    """Solve a (FEN, max_moves) puzzle and return its PuzzleResult, with the
+    moves in UCI. `mate_in` is None if no mate was found."""
+    fen, max_moves = puzzle
+    solution = solve(rules.ChessRules.from_fen(fen), max_moves)
+    if solution is None:
+        return PuzzleResult(fen, None, (), ())
+    return PuzzleResult(fen, solution.mate_in,
+                        tuple(move.uci for move in solution.line),
+                        tuple(move.uci for move in solution.first_moves))
+
+
+def solve_puzzles(puzzles, processes=None, chunksize=64):
+    """Lazily yield the PuzzleResult of each (FEN, max_moves) puzzle, in
+    order, solving them on a pool of `processes` workers."""
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(solve_puzzle, puzzles, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def read_puzzles(path, default_moves=2):
+    """Yield (FEN, max_moves) for each ``FEN;N`` line of the file at `path`;
+    lines without ``;N`` use `default_moves`."""
+    with open(path) as puzzle_file:
+        for line in puzzle_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fen, _, moves = line.partition(';')
+            yield fen.strip(), int(moves) if moves.strip() else default_moves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--moves', type=int, default=2,
+                        help='mate length for puzzles that do not give one')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    counts = collections.Counter()
+    for result in solve_puzzles(read_puzzles(args.path, args.moves),
+                                processes=args.processes):
+        if result.mate_in is None:
+            counts['unsolved'] += 1
+            print 'no mate: {0}'.format(result.fen)
+        elif len(result.first_moves) > 1:
+            counts['not unique'] += 1
+            print 'not unique ({0}): {1}'.format(' '.join(result.first_moves),
+                                                 result.fen)
+        else:
+            counts['unique'] += 1
+    for status, count in sorted(counts.items()):
+        print '{0}: {1}'.format(status, count)
+
+
+if __name__ == '__main__':
+    main()
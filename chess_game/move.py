@@ -1,11 +1,46 @@
 from __future__ import absolute_import
+import array
+import functools
 
+from . import common
 from .position import Position
-from .pieces import Pawn, Piece
+from .pieces import Pawn, Piece, promotion_classes
+
+
+# A move code packs a move into 16 bits: the source square index in bits 0-5,
+# the destination square index in bits 6-11, the promotion piece's index in
+# `promotion_classes` in bits 12-13 and one of these flags in bits 14-15.
+NORMAL = 0
+PROMOTION = 1
+ENPASSANT = 2
+CASTLING = 3
+
+
+def encode_move(source, destination, promotion=None, flag=NORMAL):
+    code = source.index | destination.index << 6
+    if promotion is not None:
+        code |= promotion_classes.index(promotion) << 12
+        flag = PROMOTION
+    return code | flag << 14
+
+
+def decode_move(code, chess_rules):
+    promotion = None
+    if code >> 14 == PROMOTION:
+        promotion = promotion_classes[code >> 12 & 3]
+    return Move.from_positions(Position.from_index(code & 63),
+                               Position.from_index(code >> 6 & 63),
+                               chess_rules, promotion)
+
+
+def move_flag(code):
+    return code >> 14
 
 
 class BaseMove(object):
 
+    __slots__ = ('source', 'destination', 'promotion', 'chess_rules')
+
     @Position.src_dst_provide_position
     def __init__(self, source, destination, chess_rules, promotion=None):
         self.source = source
@@ -13,6 +48,17 @@ class BaseMove(object):
         self.promotion = Piece.get_promotion_class(promotion)
         self.chess_rules = chess_rules
 
+    @classmethod
+    def from_positions(cls, source, destination, chess_rules, promotion=None):
+        """Build a move from Positions and a promotion class (or None)
+        without the conversions `__init__` does, for move generation."""
+        self = object.__new__(cls)
+        self.source = source
+        self.destination = destination
+        self.promotion = promotion
+        self.chess_rules = chess_rules
+        return self
+
     @property
     def uci(self):
         return (self.source.algebraic + self.destination.algebraic +
@@ -60,38 +106,100 @@ class BaseMove(object):
                 self.chess_rules == other.chess_rules)
 
 
+def _computed_before_move(function):
+    """Turn `function` into a property that is evaluated, at most once, on
+    the position from just before the move was made."""
+    name = function.__name__
+
+    @property
+    @functools.wraps(function)
+    def wrapped(self):
+        try:
+            return self._computed[name]
+        except KeyError:
+            pass
+        chess_rules = self.chess_rules
+        if len(chess_rules.moves) < self.ply:
+            raise common.StaleMoveError(
+                'move {0} was taken back'.format(self.uci)
+            )
+        with chess_rules.rewound_to(self.ply):
+            # The history may have been taken back and replayed differently.
+            if chess_rules.zobrist_key != self._key_before:
+                raise common.StaleMoveError(
+                    'move {0} is no longer in the history'.format(self.uci)
+                )
+            value = self._computed[name] = function(self)
+        return value
+    return wrapped
+
+
 class FinalizedMove(BaseMove):
+    """A move whose piece and taken piece are fixed when it is made.
 
-    finalized_attributes = ('piece', 'taken_piece', 'disambiguation', 'check_string')
-    delivers_check = False
+    Its disambiguation, check and mate are computed on first access from the
+    position before the move (taking back any later moves temporarily), and
+    then remembered. Unless `lazy` is passed to `from_move` they are computed
+    straight away; reading a lazy move once the position before it has left
+    the history raises common.StaleMoveError.
+    """
+
+    __slots__ = ('piece', 'taken_piece', 'ply', '_key_before', '_computed')
+
+    computed_attributes = ('disambiguation', 'delivers_check', 'is_checkmate')
 
     @classmethod
-    def from_move(cls, move):
+    def from_move(cls, move, lazy=False):
         self = cls(move.source, move.destination,
                    move.chess_rules, move.promotion)
-        for attribute in cls.finalized_attributes:
-            setattr(self, attribute, getattr(move, attribute))
-        self.delivers_check = self.chess_rules.delivers_check(self)
+        self.piece = move.piece
+        self.taken_piece = move.taken_piece
+        self.ply = len(self.chess_rules.moves)
+        self._key_before = self.chess_rules.zobrist_key
+        self._computed = {}
+        if not lazy:
+            for attribute in cls.computed_attributes:
+                getattr(self, attribute)
         return self
 
+    @_computed_before_move
+    def disambiguation(self):
+        return self.piece.build_disambiguation(self.chess_rules, self)
+
+    @_computed_before_move
+    def delivers_check(self):
+        return self.chess_rules.delivers_check(self)
+
+    @_computed_before_move
+    def is_checkmate(self):
+        return self.delivers_check and self.chess_rules.is_move_checkmate(self)
+
+    @property
+    def check_string(self):
+        return ('#' if self.is_checkmate else '+') if self.delivers_check else ''
+
 
 class Move(BaseMove):
 
-    def finalized(self):
-        return FinalizedMove.from_move(self)
+    __slots__ = ()
+
+    def finalized(self, lazy=False):
+        return FinalizedMove.from_move(self, lazy=lazy)
 
     @property
     def piece(self):
-        return self.chess_rules[self.source]
+        return self.chess_rules.get_piece_at_index(self.source.index)
 
     @property
     def taken_piece(self):
         # Handles enpassant.
         if (isinstance(self.piece, Pawn) and
             self.source.file_index != self.destination.file_index and
-            self.chess_rules[self.destination].is_empty):
-            return self.chess_rules[self.source.rank_index, self.destination.file_index]
-        return self.chess_rules[self.destination]
+            self.chess_rules.get_piece_at_index(self.destination.index).is_empty):
+            return self.chess_rules.get_piece_at_index(
+                self.source.index & ~7 | self.destination.file_index
+            )
+        return self.chess_rules.get_piece_at_index(self.destination.index)
 
     @property
     def check_string(self):
@@ -104,3 +212,70 @@ class Move(BaseMove):
     @property
     def delivers_check(self):
         return self.chess_rules.delivers_check(self)
+
+
+class MoveHistory(object):
+    """The moves made on a ChessRules, stored as move codes in an array.
+
+    Moves are decoded only when they are read: the rules are rewound to
+    before each one so that it is finalized, lazily, on the position it was
+    made from, as `FinalizedMove` describes.
+    """
+
+    __slots__ = ('chess_rules', 'codes')
+
+    def __init__(self, chess_rules):
+        self.chess_rules = chess_rules
+        self.codes = array.array('H')
+
+    def append(self, code):
+        self.codes.append(code)
+
+    def pop(self):
+        return decode_move(self.codes.pop(), self.chess_rules)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _finalized_from(self, ply):
+        # Each move is finalized right after it is taken back, which leaves
+        # the board as it was before the move.
+        chess_rules = self.chess_rules
+        taken_back = []
+        try:
+            while len(self.codes) > ply:
+                taken_back.append(chess_rules.pop().finalized(lazy=True))
+        finally:
+            for finalized_move in reversed(taken_back):
+                chess_rules.push(finalized_move)
+        taken_back.reverse()
+        return taken_back
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            plies = range(*index.indices(len(self)))
+            if not plies:
+                return []
+            first_ply = min(plies)
+            finalized_moves = self._finalized_from(first_ply)
+            return [finalized_moves[ply - first_ply] for ply in plies]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('move history index out of range')
+        return self._finalized_from(index)[0]
+
+    def __iter__(self):
+        return iter(self._finalized_from(0))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'MoveHistory({0})'.format(
+            ' '.join(decode_move(code, self.chess_rules).uci
+                     for code in self.codes)
+        )
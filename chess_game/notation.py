@@ -46,6 +46,13 @@ class ChessNotationProcessor(object):
         return self._build_move(move[:2], move[2:], promotion)
 
     def parse_algebraic_move(self, algebraic_move):
+        try:
+            return self._parse_algebraic_move(algebraic_move)
+        except (AssertionError, IndexError, KeyError, ValueError):
+            # Malformed squares and piece letters fail deep in the parser.
+            raise common.InvalidNotationError(algebraic_move)
+
+    def _parse_algebraic_move(self, algebraic_move):
         algebraic_move = algebraic_move.strip(' \n+#!?')
         if algebraic_move[0] == 'O':
             return self._parse_castle_move(algebraic_move)
@@ -82,7 +89,12 @@ class ChessNotationProcessor(object):
             find_all=True
         )
         if len(results) > 1:
-            raise common.AmbiguousAlgebraicMoveError()
+            # SAN leaves out the disambiguation when all but one of the
+            # pieces are pinned.
+            results = [source for source in results
+                       if destination in self._rules.get_legal_moves(source)]
+            if len(results) != 1:
+                raise common.AmbiguousAlgebraicMoveError()
         try:
             source, = results
         except:
@@ -109,6 +121,7 @@ class ChessNotationProcessor(object):
             else:
                 return self._build_move((7, 4), (7, 2))
 
+        raise common.InvalidNotationError(algebraic_move)
 
     def _parse_pawn_move(self, algebraic_move):
         # Clean up the textmove
@@ -0,0 +1,245 @@
+"""An on-disk index of the moves played from each position of a game
+collection.
+
+`build_index` replays PGN games and counts, for each (Zobrist key, move)
+pair, how many games played the move and how they ended. The counts are
+aggregated in memory up to `max_entries` pairs at a time, then spilled to
+sorted run files, which are merged into one file of fixed-size records
+sorted by key. Memory use is therefore bounded however large the
+collection is.
+
+`OpeningIndex` memory-maps such a file and binary-searches it, so lookups
+read only the few pages they touch.
+
+Run ``python -m chess_game.openings build INDEX PGN...`` to build an index,
+and ``python -m chess_game.openings query INDEX FEN`` to look a position up.
+"""
+from __future__ import absolute_import
+import argparse
+import collections
+import heapq
+import mmap
+import struct
+import tempfile
+
+from . import common
+from . import move
+from . import notation
+from . import pgn
+from . import rules
+from .pieces import promotion_classes
+from .position import Position
+
+
+MoveStats = collections.namedtuple('MoveStats', [
+    'uci', 'games', 'white_wins', 'draws', 'black_wins'
+])
+
+# A record is a position's Zobrist key, a move code and the number of
+# games, white wins, draws and black wins.
+_record = struct.Struct('<QHIIII')
+_header = struct.Struct('<4sIQ')
+_magic = 'CGOI'
+
+_result_counts = {
+    '1-0': (1, 1, 0, 0),
+    '1/2-1/2': (1, 0, 1, 0),
+    '0-1': (1, 0, 0, 1),
+}
+_unfinished = (1, 0, 0, 0)
+
+
+def _code_to_uci(code):
+    uci = (Position.from_index(code & 63).algebraic +
+           Position.from_index(code >> 6 & 63).algebraic)
+    if move.move_flag(code) == move.PROMOTION:
+        uci += promotion_classes[code >> 12 & 3].character
+    return uci
+
+
+def iterate_game_moves(games, max_plies=None):
+    """Yield (Zobrist key, move code, result) for each move of `games`, up to
+    `max_plies` plies into each game. A game stops at its first illegal or
+    unreadable move."""
+    chess_rules = rules.ChessRules()
+    notation_processor = notation.ChessNotationProcessor(chess_rules)
+    for game in games:
+        try:
+            for algebraic_move in game.moves[:max_plies]:
+                key = chess_rules.zobrist_key
+                chess_rules.make_trusted_move(
+                    notation_processor.parse_algebraic_move(algebraic_move)
+                )
+                yield key, chess_rules.moves.codes[-1], game.result
+        except common.BAD_MOVE_ERRORS:
+            # Keep the moves up to the bad one, like a truncated game.
+            pass
+        finally:
+            while chess_rules.moves:
+                chess_rules.pop()
+
+
+def _write_run(counts, directory):
+    run_file = tempfile.TemporaryFile(dir=directory)
+    for (key, code), (games, white_wins, draws, black_wins) in sorted(
+        counts.iteritems()
+    ):
+        run_file.write(_record.pack(key, code, games, white_wins, draws,
+                                    black_wins))
+    run_file.seek(0)
+    return run_file
+
+
+def _read_run(run_file, buffer_records=4096):
+    while True:
+        data = run_file.read(_record.size * buffer_records)
+        if not data:
+            return
+        for offset in xrange(0, len(data), _record.size):
+            yield _record.unpack_from(data, offset)
+
+
+def _merge_runs(runs):
+    """Yield the records of the sorted `runs`, summing those with the same
+    key and move."""
+    current = None
+    for record in heapq.merge(*runs):
+        if current is not None and record[:2] == current[:2]:
+            current = current[:2] + tuple(
+                total + count for total, count in zip(current[2:], record[2:])
+            )
+            continue
+        if current is not None:
+            yield current
+        current = record
+    if current is not None:
+        yield current
+
+
+def build_index(pgn_paths, index_path, max_plies=None, max_entries=1 << 20,
+                temp_directory=None):
+    """Build the index of the games in the PGN files at `pgn_paths` and
+    write it to `index_path`, holding at most `max_entries` aggregated
+    records in memory. Return the number of records written."""
+    run_files = []
+    counts = {}
+    try:
+        for path in pgn_paths:
+            for key, code, result in iterate_game_moves(pgn.read_games(path),
+                                                        max_plies):
+                increments = _result_counts.get(result, _unfinished)
+                totals = counts.get((key, code))
+                counts[key, code] = increments if totals is None else tuple(
+                    total + increment
+                    for total, increment in zip(totals, increments)
+                )
+                if len(counts) >= max_entries:
+                    run_files.append(_write_run(counts, temp_directory))
+                    counts = {}
+        if counts or not run_files:
+            run_files.append(_write_run(counts, temp_directory))
+        counts = None
+
+        record_count = 0
+        with open(index_path, 'wb') as index_file:
+            index_file.write(_header.pack(_magic, _record.size, 0))
+            for record in _merge_runs([_read_run(run_file)
+                                       for run_file in run_files]):
+                index_file.write(_record.pack(*record))
+                record_count += 1
+            index_file.seek(0)
+            index_file.write(_header.pack(_magic, _record.size, record_count))
+        return record_count
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+class OpeningIndex(object):
+    """A memory-mapped index written by `build_index`."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as index_file:
+            self._data = mmap.mmap(index_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        magic, record_size, self._count = _header.unpack_from(self._data)
+        if magic != _magic or record_size != _record.size:
+            self._data.close()
+            raise ValueError('{0} is not an opening index'.format(path))
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record_at(self, index):
+        return _record.unpack_from(self._data,
+                                   _header.size + index * _record.size)
+
+    def _key_at(self, index):
+        return struct.unpack_from('<Q', self._data,
+                                  _header.size + index * _record.size)[0]
+
+    def _first_index(self, key):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, key):
+        """Return the MoveStats of the moves played from the position with
+        Zobrist key `key`, most played first."""
+        moves = []
+        index = self._first_index(key)
+        while index < self._count:
+            record = self._record_at(index)
+            if record[0] != key:
+                break
+            moves.append(MoveStats(_code_to_uci(record[1]), *record[2:]))
+            index += 1
+        moves.sort(key=lambda stats: -stats.games)
+        return moves
+
+    def probe(self, chess_rules):
+        return self.lookup(chess_rules.zobrist_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('index')
+    build_parser.add_argument('pgn_paths', nargs='+')
+    build_parser.add_argument('--max-plies', type=int, default=None)
+    build_parser.add_argument('--max-entries', type=int, default=1 << 20)
+    build_parser.add_argument('--temp-directory', default=None)
+    query_parser = subparsers.add_parser('query')
+    query_parser.add_argument('index')
+    query_parser.add_argument('fen')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        record_count = build_index(args.pgn_paths, args.index,
+                                   max_plies=args.max_plies,
+                                   max_entries=args.max_entries,
+                                   temp_directory=args.temp_directory)
+        print '{0} records written to {1}'.format(record_count, args.index)
+        return
+    with OpeningIndex(args.index) as index:
+        for stats in index.probe(rules.ChessRules.from_fen(args.fen)):
+            print '{0} {1} games, +{2} ={3} -{4}'.format(*stats)
+
+
+if __name__ == '__main__':
+    main()
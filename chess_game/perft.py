@@ -0,0 +1,167 @@
+"""Perft move path enumeration, used to verify and benchmark move generation.
+
+Run ``python -m chess_game.perft`` to benchmark the standard positions, and
+``--save-baseline``/``--baseline`` to record a run and compare later runs
+against it.
+"""
+from __future__ import absolute_import
+import argparse
+import collections
+import json
+import sys
+import time
+
+from . import bitboard
+from . import board
+from . import rules
+
+
+class NodeCountError(Exception):
+    """Raised by `run_benchmark` when perft disagrees with a known count."""
+
+
+def perft(chess_rules, depth):
+    """Return the number of leaf nodes of the legal move tree of the given
+    depth from the current position."""
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return sum(1 for _ in chess_rules.iterate_legal_moves())
+    nodes = 0
+    for move in chess_rules.generate_legal_moves():
+        chess_rules.push(move)
+        nodes += perft(chess_rules, depth - 1)
+        chess_rules.pop()
+    return nodes
+
+
+def divide(chess_rules, depth):
+    """Return the perft count below each legal root move, keyed by UCI."""
+    counts = collections.OrderedDict()
+    for move in chess_rules.generate_legal_moves():
+        chess_rules.push(move)
+        counts[move.uci] = perft(chess_rules, depth - 1)
+        chess_rules.pop()
+    return counts
+
+
+PerftPosition = collections.namedtuple('PerftPosition',
+                                       ['name', 'fen', 'node_counts'])
+
+# node_counts[depth - 1] is the exact perft count at that depth.
+STANDARD_POSITIONS = [
+    PerftPosition(
+        'initial',
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+        [20, 400, 8902, 197281],
+    ),
+    PerftPosition(
+        'kiwipete',
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        [48, 2039, 97862],
+    ),
+    PerftPosition(
+        'enpassant',
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+        [14, 191, 2812, 43238],
+    ),
+    PerftPosition(
+        'promotion',
+        'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+        [6, 264, 9467],
+    ),
+    PerftPosition(
+        'castling',
+        'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+        [44, 1486, 62379],
+    ),
+]
+
+
+def run_benchmark(positions=STANDARD_POSITIONS, max_depth=None,
+                  board_class=board.BasicChessBoard, out=sys.stdout):
+    """Run perft over `positions` and return a result dict per position.
+
+    Raises NodeCountError if a node count differs from the known one.
+    """
+    results = collections.OrderedDict()
+    for perft_position in positions:
+        depth = len(perft_position.node_counts)
+        if max_depth is not None:
+            depth = min(depth, max_depth)
+        chess_rules = rules.ChessRules.from_fen(perft_position.fen, board_class)
+        start = time.time()
+        nodes = perft(chess_rules, depth)
+        seconds = time.time() - start
+        expected = perft_position.node_counts[depth - 1]
+        if nodes != expected:
+            raise NodeCountError('{0}: perft({1}) = {2}, expected {3}'.format(
+                perft_position.name, depth, nodes, expected
+            ))
+        results[perft_position.name] = {
+            'depth': depth,
+            'nodes': nodes,
+            'seconds': seconds,
+            'nodes_per_second': nodes / seconds if seconds else 0.0,
+        }
+        out.write('{0:<10} depth {1} {2:>9} nodes {3:8.2f}s {4:>10.0f} nodes/s\n'.format(
+            perft_position.name, depth, nodes, seconds,
+            results[perft_position.name]['nodes_per_second']
+        ))
+    return results
+
+
+def compare_to_baseline(results, baseline, out=sys.stdout):
+    """Write the speed of each position relative to `baseline`, returning the
+    ratios keyed by position name."""
+    ratios = {}
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if (previous is None or previous['depth'] != result['depth'] or
+            not previous['nodes_per_second']):
+            continue
+        ratios[name] = result['nodes_per_second'] / previous['nodes_per_second']
+        out.write('{0:<10} {1:6.2f}x baseline\n'.format(name, ratios[name]))
+    return ratios
+
+
+_board_classes = {
+    'basic': board.BasicChessBoard,
+    'bitboard': bitboard.BitboardChessBoard,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--depth', type=int, default=None,
+                        help='limit the depth searched for every position')
+    parser.add_argument('--board', choices=sorted(_board_classes),
+                        default='basic')
+    parser.add_argument('--divide', metavar='FEN',
+                        help='print the divide of FEN instead of benchmarking')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare this run against a saved baseline')
+    parser.add_argument('--save-baseline', metavar='PATH',
+                        help='store the results of this run as a baseline')
+    args = parser.parse_args(argv)
+
+    board_class = _board_classes[args.board]
+    if args.divide:
+        counts = divide(rules.ChessRules.from_fen(args.divide, board_class),
+                        args.depth or 1)
+        for uci, nodes in counts.items():
+            print '{0}: {1}'.format(uci, nodes)
+        print 'Total: {0}'.format(sum(counts.values()))
+        return
+
+    results = run_benchmark(max_depth=args.depth, board_class=board_class)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare_to_baseline(results, json.load(baseline_file))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
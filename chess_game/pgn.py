@@ -0,0 +1,123 @@
+"""A lazy PGN reader.
+
+`read_games` memory-maps a PGN file and yields one `PGNGame` at a time, so
+archives far larger than memory can be streamed. The SAN moves it yields
+can be passed straight to `ChessNotationProcessor.parse_algebraic_move`.
+"""
+from __future__ import absolute_import
+import collections
+import mmap
+import re
+
+
+PGNGame = collections.namedtuple('PGNGame',
+                                 ['tags', 'moves', 'result', 'offset'])
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+_tag_pattern = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_token_pattern = re.compile(r'''
+    \{[^}]*\}            # comment
+  | ;[^\n]*              # rest-of-line comment
+  | [()]                 # variation delimiters
+  | \$\d+                # numeric annotation glyph
+  | \d+\.+               # move number
+  | 1-0 | 0-1 | 1/2-1/2 | \*
+  | [^\s(){};$]+         # a move
+''', re.VERBOSE)
+
+
+def read_games(path, tag_filter=None):
+    """Lazily yield the games in the PGN file at `path`.
+
+    `tag_filter`, if given, is called with each game's tags before its moves
+    are parsed, and games for which it returns a false value are skipped.
+    """
+    with open(path, 'rb') as pgn_file:
+        try:
+            data = mmap.mmap(pgn_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return
+        try:
+            for game in iterate_games(data, tag_filter=tag_filter):
+                yield game
+        finally:
+            data.close()
+
+
+def iterate_games(data, tag_filter=None, start=0, end=None):
+    """Lazily yield the games in `data[start:end]`, which may be a string or
+    an mmap. See `read_games` for `tag_filter`."""
+    for game_start, tags_end, game_end in iterate_game_spans(data, start, end):
+        tags = parse_tags(data[game_start:tags_end])
+        if tag_filter is not None and not tag_filter(tags):
+            continue
+        moves, result = parse_movetext(data[tags_end:game_end])
+        if result is None:
+            result = tags.get('Result', '*')
+        yield PGNGame(tags, moves, result, game_start)
+
+
+def iterate_game_spans(data, start=0, end=None):
+    """Yield (game_start, tags_end, game_end) offsets for each game in
+    `data[start:end]`, without parsing anything.
+
+    `start` must be the start of a line. A game runs from its first tag line
+    to the next line that starts a tag section.
+    """
+    if end is None:
+        end = len(data)
+    position = _next_tag_line(data, start, end)
+    if data[start:position].strip():
+        # Movetext without any tags before the first tag section.
+        yield start, start, position
+    while position < end:
+        tags_end = position
+        while tags_end < end and data[tags_end:tags_end + 1] == '[':
+            line_end = data.find('\n', tags_end, end)
+            tags_end = end if line_end == -1 else line_end + 1
+        game_end = _next_tag_line(data, tags_end, end)
+        yield position, tags_end, game_end
+        position = game_end
+
+
+def _next_tag_line(data, position, end):
+    if data[position:position + 1] == '[':
+        return position
+    found = data.find('\n[', position, end)
+    return end if found == -1 else found + 1
+
+
+def parse_tags(tag_text):
+    return collections.OrderedDict(
+        (name, value.replace('\\"', '"').replace('\\\\', '\\'))
+        for name, value in _tag_pattern.findall(tag_text)
+    )
+
+
+def parse_movetext(movetext):
+    """Return the SAN moves of the main line of `movetext` and its result
+    (None if it has no game termination marker)."""
+    moves = []
+    result = None
+    variation_depth = 0
+    for token in _token_pattern.findall(movetext):
+        first_character = token[0]
+        if first_character in '{;$':
+            continue
+        if token == '(':
+            variation_depth += 1
+        elif token == ')':
+            variation_depth -= 1
+        elif variation_depth:
+            continue
+        elif token in RESULTS:
+            result = token
+        elif first_character.isdigit() and token.endswith('.'):
+            continue
+        else:
+            if token.startswith('0-0'):
+                token = token.replace('0', 'O')
+            moves.append(token)
+    return moves, result
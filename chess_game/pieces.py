@@ -1,60 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 import itertools
-import math
 
 from . import common
+from . import tables
 from .position import Position
 
 
-class DirectionalIterator(object):
-
-    @Position.provide_position
-    def __init__(self, position, rank_direction, file_direction):
-          self.rank_index = position.rank_index
-          self.file_index = position.file_index
-          self.rank_direction = rank_direction
-          self.file_direction = file_direction
-
-    def next(self):
-        self.rank_index += self.rank_direction
-        self.file_index += self.file_direction
-        try:
-            return Position.from_rank_file(self.rank_index, self.file_index)
-        except common.IllegalPositionError:
-            raise StopIteration()
-
-    def __iter__(self):
-        return self
-
-    def matches(self, rank_delta, file_delta):
-        if (self._both_are_zero_if_one_is(rank_delta, self.rank_direction) or
-            self._both_are_zero_if_one_is(file_delta, self.file_direction)):
-            return False
-        if rank_delta: # We don't care about 0 or None
-            if math.copysign(rank_delta, self.rank_direction) != rank_delta:
-                return False
-        if file_delta: # We don't care about 0 or None
-            if math.copysign(file_delta, self.file_direction) != file_delta:
-                return False
-        return True
-
-    @staticmethod
-    def _both_are_zero_if_one_is(first, second):
-        if first is None or second is None:
-            return False
-        return ((first == 0 or second == 0) and first != second)
-
-
-class OneSquareIterator(DirectionalIterator):
-
-    def next(self):
-        position = super(OneSquareIterator, self).next()
-        self.rank_index = -1
-        self.file_index = -1
-        self.rank_direction = 0
-        self.file_direction = 0
-        return position
+_canonical_colors = dict((color, color) for color in (common.color.WHITE,
+                                                      common.color.BLACK))
 
 
 class Piece(object):
@@ -63,6 +17,11 @@ class Piece(object):
 
         character_to_piece_class = {}
 
+        def __new__(mcs, name, bases, namespace):
+            # Keep every piece class slotted, so that no piece has a __dict__.
+            namespace.setdefault('__slots__', ())
+            return type.__new__(mcs, name, bases, namespace)
+
         def __init__(cls, *args):
             type.__init__(cls, *args)
             if cls.character is not None:
@@ -85,25 +44,26 @@ class Piece(object):
 
     character = None
     directions = None
-    move_iterator_class = None
     piece_finder_class = None
     is_empty = False
     black_unicode_string = None
     white_unicode_string = None
 
-    @classmethod
-    @Position.provide_position
-    def move_iterators(cls, position, invert_direction=False):
-        for rank_direction, file_direction in cls.directions:
-            if invert_direction:
-                rank_direction *= -1
-                file_direction *= -1
-            yield cls.move_iterator_class(position, rank_direction,
-                                          file_direction)
+    __slots__ = ('color',)
+    _instances = {}
 
+    def __new__(cls, color):
+        # Pieces are immutable, so every class and color share one instance.
+        try:
+            return cls._instances[cls, color]
+        except KeyError:
+            piece = cls._instances[cls, color] = object.__new__(cls)
+            # Store the canonical constant, so colors compare by identity too.
+            piece.color = _canonical_colors[color]
+            return piece
 
-    def __init__(self, color):
-        self.color = color
+    def __reduce__(self):
+        return type(self), (self.color,)
 
     @property
     def name(self):
@@ -122,20 +82,16 @@ class Piece(object):
 
     @Position.provide_position
     def get_all_threatened_moves(self, position, chess_board):
+        return self._get_threatened_moves(position, chess_board)
+
+    def _get_threatened_moves(self, position, chess_board):
         return itertools.chain(self._get_normal_threatened_moves(position,
                                                                  chess_board),
                                self._get_special_threatened_moves(position,
                                                                   chess_board))
 
     def _get_normal_threatened_moves(self, position, chess_board):
-        for move_iterator in self.move_iterators(position):
-            for test_position in move_iterator:
-                piece = chess_board[test_position]
-                if piece.color == self.color:
-                    break
-                yield test_position
-                if piece.color == self.color.opponent:
-                    break
+        return []
 
     def _get_special_threatened_moves(self, position, chess_board):
         return []
@@ -189,120 +145,80 @@ class PieceFinder(object):
         return piece.color == self.color and type(piece) == self.piece_class
 
     @staticmethod
-    def _get_deltas(destination_position, source_rank, source_file):
-        rank_delta = None if source_rank is None else \
-                     source_rank - destination_position.rank_index
-        file_delta = None if source_file is None else \
-                     source_file - destination_position.file_index
-        return rank_delta, file_delta
+    def _source_matches(position, source_rank, source_file):
+        return ((source_rank is None or position.rank_index == source_rank) and
+                (source_file is None or position.file_index == source_file))
 
-    @Position.provide_position
-    def move_iterators_matching(self, destination_position,
-                                source_rank=None, source_file=None):
-        rank_delta, file_delta = self._get_deltas(destination_position,
-                                                  source_rank, source_file)
-        return [move_iterator
-                for move_iterator in self.piece_class.move_iterators(destination_position)
-                if move_iterator.matches(rank_delta, file_delta)]
+    def _collect(self, found_positions):
+        if self.find_all:
+            return list(found_positions)
+        for position in found_positions:
+            return [position]
+        return []
 
 
 class NormalPieceFinder(PieceFinder):
 
     @Position.provide_position
     def find(self, destination_position, source_rank=None, source_file=None):
-        rank_delta, file_delta = self._get_deltas(destination_position,
-                                                  source_rank, source_file)
-        def direction_matches(rank_direction, file_direction):
-            if rank_delta is not None and rank_direction != rank_delta:
-                return None
-            if file_delta is not None and file_direction != file_delta:
-                return None
-
-            try:
-                test_position = destination_position.delta(rank_direction,
-                                                           file_direction)
-            except common.IllegalPositionError:
-                return None
-
-            if self._piece_matches(self.chess_board[test_position]):
-                return test_position
-
-        if self.find_all:
-            return self._find_all(direction_matches)
-        else:
-            return self._find_one(direction_matches)
-
-    @common.listify
-    def _find_all(self, direction_matches):
-        for direction in self.piece_class.directions:
-            position = direction_matches(*direction)
-            if position is not None:
-                yield position
-
-    def _find_one(self, direction_matches):
-        for direction in self.piece_class.directions:
-            position = direction_matches(*direction)
-            if position is not None:
-                return [position]
-        return []
+        return self._collect(
+            position
+            for position in self.piece_class.targets[destination_position.index]
+            if self._source_matches(position, source_rank, source_file) and
+            self._piece_matches(
+                self.chess_board.get_piece_at_index(position.index)
+            )
+        )
 
 
 class NormalPiece(Piece):
 
-    move_iterator_class = OneSquareIterator
+    targets = None
     piece_finder_class = NormalPieceFinder
 
+    def _get_normal_threatened_moves(self, position, chess_board):
+        for test_position in self.targets[position.index]:
+            if (chess_board.get_piece_at_index(test_position.index).color !=
+                self.color):
+                yield test_position
+
 
 class SlidingPieceFinder(PieceFinder):
 
     @Position.provide_position
     def find(self, destination_position, source_rank=None, source_file=None):
-        move_iterators = self.move_iterators_matching(
-            destination_position, source_rank, source_file
+        return self._collect(
+            self._find_along_rays(destination_position, source_rank, source_file)
         )
-        def find_using_move_iterator(move_iterator):
-            for position in move_iterator:
-                piece = self.chess_board[position]
-                if self._piece_matches(piece):
-                    if source_rank is not None:
-                        if position.rank_index != source_rank:
-                            return None
-                    if source_file is not None:
-                        if position.file_index != source_file:
-                            return None
-                    return position
-                elif piece.color != common.color.NONE:
-                    return None
-            else:
-                return None
-        if self.find_all:
-            return self._find_all(move_iterators, find_using_move_iterator)
-        else:
-            return self._find_one(move_iterators, find_using_move_iterator)
-
-    @common.listify
-    def _find_all(self, move_iterators, find_using_move_iterator):
-        for move_iterator in move_iterators:
-            position = find_using_move_iterator(move_iterator)
-            if position is not None:
-                yield position
-
-    def _find_one(self, move_iterators, find_using_move_iterator):
-        for move_iterator in move_iterators:
-            position = find_using_move_iterator(move_iterator)
-            if position is not None:
-                return [position]
-        return []
+
+    def _find_along_rays(self, destination_position, source_rank, source_file):
+        for ray in self.piece_class.rays[destination_position.index]:
+            for position in ray:
+                piece = self.chess_board.get_piece_at_index(position.index)
+                if piece.color == common.color.NONE:
+                    continue
+                if (self._piece_matches(piece) and
+                    self._source_matches(position, source_rank, source_file)):
+                    yield position
+                break
 
 
 class SlidingPiece(Piece):
 
-    move_iterator_class = DirectionalIterator
+    rays = None
     piece_finder_class = SlidingPieceFinder
 
+    def _get_normal_threatened_moves(self, position, chess_board):
+        for ray in self.rays[position.index]:
+            for test_position in ray:
+                piece = chess_board.get_piece_at_index(test_position.index)
+                if piece.color == self.color:
+                    break
+                yield test_position
+                if piece.color == self.color.opponent:
+                    break
+
 
-_diagonals = ((-1, 1), (1, -1), (1, 1), (-1, -1))
-_straights = ((1,  0), (-1, 0), (0, 1), (0,  -1))
 _back_rank_squares = {common.color.WHITE: 0, common.color.BLACK: 7}
 
 
@@ -311,7 +227,8 @@ class King(NormalPiece):
     character = 'k'
     white_unicode_string = u'♔'
     black_unicode_string = u'♚'
-    directions = _diagonals + _straights
+    directions = tables.DIAGONALS + tables.STRAIGHTS
+    targets = tables.KING_TARGETS
 
     @property
     def back_rank(self):
@@ -320,14 +237,15 @@ class King(NormalPiece):
     def _get_special_threatened_moves(self, position, chess_rules):
         if position.rank_index != self.back_rank:
             raise StopIteration()
+        rank_start = position.index & ~7
         if chess_rules.can_castle_kingside(self.color) and all(
-            chess_rules[position.replace(file_index=file_index)].is_empty
+            chess_rules.get_piece_at_index(rank_start + file_index).is_empty
             for file_index in range(5, 7)
         ):
              yield position.replace(file_index=6)
 
         if chess_rules.can_castle_queenside(self.color) and all(
-            chess_rules[position.replace(file_index=file_index)].is_empty
+            chess_rules.get_piece_at_index(rank_start + file_index).is_empty
             for file_index in range(1, 4)
         ):
             yield position.replace(file_index=2)
@@ -341,7 +259,8 @@ class Queen(SlidingPiece):
     character = 'q'
     white_unicode_string = u'♕'
     black_unicode_string = u'♛'
-    directions = _diagonals + _straights
+    directions = tables.DIAGONALS + tables.STRAIGHTS
+    rays = tables.build_sliding_ray_table(directions)
 
 
 class Rook(SlidingPiece):
@@ -349,7 +268,8 @@ class Rook(SlidingPiece):
     character = 'r'
     white_unicode_string = u'♖'
     black_unicode_string = u'♜'
-    directions = _straights
+    directions = tables.STRAIGHTS
+    rays = tables.build_sliding_ray_table(directions)
 
 
 class Bishop(SlidingPiece):
@@ -357,7 +277,8 @@ class Bishop(SlidingPiece):
     character = 'b'
     white_unicode_string = u'♗'
     black_unicode_string = u'♝'
-    directions = _diagonals
+    directions = tables.DIAGONALS
+    rays = tables.build_sliding_ray_table(directions)
 
 
 class Knight(NormalPiece):
@@ -365,8 +286,8 @@ class Knight(NormalPiece):
     character = 'n'
     white_unicode_string = u'♘'
     black_unicode_string = u'♞'
-    directions = [(1,  2), (2,  1), (-1,  2), (-2,  1),
-                  (1, -2), (2, -1), (-1, -2), (-2, -1)]
+    directions = tables.KNIGHT_OFFSETS
+    targets = tables.KNIGHT_TARGETS
 
 
 class Pawn(Piece):
@@ -380,51 +301,28 @@ class Pawn(Piece):
         common.color.BLACK: 3
     }
 
-    @classmethod
-    def move_iterators(*args, **kwargs):
-        return []
-
-    @Position.provide_position
     def _get_special_threatened_moves(self, position, chess_board):
-        new_rank_index = position.rank_index + self.color
-        for new_file_index in (-1 + position.file_index, 1 + position.file_index):
-            try:
-                new_position = Position.from_rank_file(new_rank_index, new_file_index)
-            except common.IllegalPositionError:
-                continue
-            if (chess_board[new_position].color == self.color * -1 or
+        for new_position in tables.PAWN_ATTACKS[self.color][position.index]:
+            piece = chess_board.get_piece_at_index(new_position.index)
+            if (piece.color == self.color.opponent or
                 self.is_enpassant_available(position, new_position, chess_board)):
                 yield new_position
-        new_position = position.replace(new_rank_index)
-        if chess_board[new_position].is_empty:
+        # The double pawn move is only listed from the starting rank, and is
+        # blocked along with the single move.
+        for new_position in tables.PAWN_PUSHES[self.color][position.index]:
+            if not chess_board.get_piece_at_index(new_position.index).is_empty:
+                break
             yield new_position
-        else:
-            # Break here because we can't do the double pawn move either.
-            raise StopIteration()
-
-        # Check for double pawn move.
-        if position.rank_index == _back_rank_squares[self.color] + self.color:
-            new_position = position.delta(self.color * 2)
-            if chess_board[new_position].is_empty:
-                yield new_position
 
     @property
     def enpassant_square(self):
         return self._enpassant_squares[self.color]
 
     def is_enpassant_available(self, position, new_position, chess_board):
-        if position.rank_index != self.enpassant_square:
-            return False
-
-        if chess_board.moves:
-            last_move = chess_board.moves[-1]
-        else:
-            return False
-
-        return (type(last_move.piece) == type(self) and
-                last_move.source.file_index == new_position.file_index and
-                last_move.source.rank_index == new_position.rank_index + self.color and
-                last_move.destination.rank_index == new_position.rank_index - self.color)
+        enpassant_position = chess_board.enpassant_position
+        return (position.rank_index == self.enpassant_square and
+                enpassant_position is not None and
+                enpassant_position == new_position)
 
     def build_disambiguation(self, chess_board, move):
         return "" if move.source.file_index == move.destination.file_index else \
@@ -449,6 +347,7 @@ class Empty(object):
 
 
 _back_rank_classes = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
+promotion_classes = (Queen, Rook, Bishop, Knight)
 
 
 def build_back_rank(color):
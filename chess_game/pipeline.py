@@ -0,0 +1,199 @@
+"""Validate PGN files across a pool of worker processes.
+
+The file is split into chunks at game boundaries, and each worker replays
+the games of a chunk on its own ChessRules, rewinding it with `pop`
+between games. Only chunk offsets are sent to the workers, and at most
+`max_in_flight` chunks are outstanding at once, which bounds memory use.
+"""
+from __future__ import absolute_import
+import argparse
+import collections
+import mmap
+import multiprocessing
+
+from . import board
+from . import common
+from . import notation
+from . import pgn
+from . import rules
+
+
+GameResult = collections.namedtuple('GameResult', [
+    'offset', 'tags', 'legal', 'plies', 'error_ply', 'error', 'status'
+])
+
+CHECKMATE = 'checkmate'
+STALEMATE = 'stalemate'
+ONGOING = 'ongoing'
+
+_poll_seconds = 0.01
+
+
+def split_into_chunks(data, chunk_bytes):
+    """Yield (start, end) offsets that cover `data` and only break it where a
+    game's tag section starts."""
+    start = 0
+    end = len(data)
+    while start < end:
+        boundary = _next_game_start(data, start + chunk_bytes, end)
+        yield start, boundary
+        start = boundary
+
+
+def _next_game_start(data, position, end):
+    # A game starts at a tag line that does not follow another tag line.
+    while position < end:
+        found = data.find('\n[', position - 1, end)
+        if found == -1:
+            return end
+        line_start = data.rfind('\n', 0, found) + 1
+        if data[line_start:line_start + 1] != '[':
+            return found + 1
+        position = found + 2
+    return end
+
+
+def validate_game(game, chess_rules, notation_processor):
+    """Replay `game` on `chess_rules`, which must be at the initial position,
+    and rewind it before returning the game's GameResult."""
+    error_ply = None
+    error = None
+    try:
+        for ply, algebraic_move in enumerate(game.moves):
+            error_ply = ply
+            chess_rules.make_legal_move(
+                notation_processor.parse_algebraic_move(algebraic_move)
+            )
+        error_ply = None
+        if chess_rules.in_checkmate:
+            status = CHECKMATE
+        elif chess_rules.in_stalemate:
+            status = STALEMATE
+        else:
+            status = ONGOING
+    except common.BAD_MOVE_ERRORS as exception:
+        error = '{0}: {1}'.format(type(exception).__name__, exception)
+        status = None
+    plies = len(chess_rules.moves)
+    while chess_rules.moves:
+        chess_rules.pop()
+    return GameResult(game.offset, game.tags, error is None, plies,
+                      error_ply, error, status)
+
+
+_worker_state = {}
+
+
+def _initialize_worker(board_class):
+    chess_rules = rules.ChessRules(_board=board_class())
+    _worker_state['rules'] = chess_rules
+    _worker_state['notation_processor'] = notation.ChessNotationProcessor(chess_rules)
+
+
+def _validate_chunk(path, start, end):
+    with open(path, 'rb') as pgn_file:
+        data = mmap.mmap(pgn_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return [
+            validate_game(game, _worker_state['rules'],
+                          _worker_state['notation_processor'])
+            for game in pgn.iterate_games(data, start=start, end=end)
+        ]
+    finally:
+        data.close()
+
+
+def validate_pgn_file(path, processes=None, ordered=True, chunk_bytes=1 << 20,
+                      max_in_flight=None, board_class=board.BasicChessBoard):
+    """Validate every game in the PGN file at `path`, yielding a GameResult
+    per game as the workers finish.
+
+    With `ordered`, results come back in file order; otherwise in completion
+    order.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    max_in_flight = max_in_flight or 2 * processes
+    with open(path, 'rb') as pgn_file:
+        try:
+            data = mmap.mmap(pgn_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return
+        try:
+            chunks = list(split_into_chunks(data, chunk_bytes))
+        finally:
+            data.close()
+
+    pool = multiprocessing.Pool(processes, initializer=_initialize_worker,
+                                initargs=(board_class,))
+    try:
+        if ordered:
+            results = _run_ordered(pool, path, chunks, max_in_flight)
+        else:
+            results = _run_unordered(pool, path, chunks, max_in_flight)
+        for result in results:
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _run_ordered(pool, path, chunks, max_in_flight):
+    pending = collections.deque()
+    for start, end in chunks:
+        pending.append(pool.apply_async(_validate_chunk, (path, start, end)))
+        if len(pending) >= max_in_flight:
+            for result in pending.popleft().get():
+                yield result
+    while pending:
+        for result in pending.popleft().get():
+            yield result
+
+
+def _run_unordered(pool, path, chunks, max_in_flight):
+    # apply_async callbacks never fire for a task that raises, so poll the
+    # tasks instead, letting `get` re-raise a worker's error here.
+    chunks = iter(chunks)
+    pending = []
+    while True:
+        for start, end in chunks:
+            pending.append(pool.apply_async(_validate_chunk,
+                                            (path, start, end)))
+            if len(pending) >= max_in_flight:
+                break
+        if not pending:
+            return
+        finished = [task for task in pending if task.ready()]
+        if not finished:
+            pending[0].wait(_poll_seconds)
+            continue
+        for task in finished:
+            pending.remove(task)
+            for result in task.get():
+                yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--unordered', action='store_true')
+    parser.add_argument('--chunk-bytes', type=int, default=1 << 20)
+    args = parser.parse_args(argv)
+
+    counts = collections.Counter()
+    for result in validate_pgn_file(args.path, processes=args.processes,
+                                    ordered=not args.unordered,
+                                    chunk_bytes=args.chunk_bytes):
+        counts[result.status or 'illegal'] += 1
+        if not result.legal:
+            print 'offset {0}, ply {1}: {2}'.format(result.offset,
+                                                    result.error_ply,
+                                                    result.error)
+    for status, count in sorted(counts.items()):
+        print '{0}: {1}'.format(status, count)
+
+
+if __name__ == '__main__':
+    main()
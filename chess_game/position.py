@@ -5,6 +5,12 @@ from . import common
 
 
 class Position(object):
+    """A square of the board.
+
+    There is exactly one Position per square: constructing one returns the
+    interned instance from `ALL_POSITIONS`, so positions never need to be
+    allocated and can be compared by identity.
+    """
 
     __slots__ = ('index',)
 
@@ -13,7 +19,13 @@ class Position(object):
         if isinstance(incoming, cls):
             return incoming
         if isinstance(incoming, basestring):
-            return cls.from_rank_file(*common.square_name_to_indices(incoming))
+            try:
+                return ALL_POSITIONS_by_name[incoming]
+            except KeyError:
+                # Let the slow path raise the appropriate error.
+                return cls.from_rank_file(
+                    *common.square_name_to_indices(incoming)
+                )
         try:
             rank_index, file_index = incoming
         except:
@@ -43,10 +55,19 @@ class Position(object):
     def from_rank_file(cls, rank_index, file_index):
         if rank_index < 0 or rank_index > 7 or file_index < 0 or file_index > 7:
             raise common.IllegalPositionError()
-        return cls(rank_index * 8 + file_index)
+        return ALL_POSITIONS[rank_index * 8 + file_index]
+
+    @staticmethod
+    def from_index(index):
+        return ALL_POSITIONS[index]
+
+    def __new__(cls, index):
+        if not 0 <= index < 64:
+            raise common.IllegalPositionError()
+        return ALL_POSITIONS[index]
 
-    def __init__(self, index):
-        self.index = index
+    def __reduce__(self):
+        return Position, (self.index,)
 
     @property
     def rank_index(self):
@@ -86,3 +107,14 @@ class Position(object):
 
     def __eq__(self, other):
         return self.index == other.index
+
+
+def _build_position(index):
+    position = object.__new__(Position)
+    position.index = index
+    return position
+
+
+ALL_POSITIONS = tuple(_build_position(index) for index in range(64))
+ALL_POSITIONS_by_name = dict((position.algebraic, position)
+                          for position in ALL_POSITIONS)
@@ -1,30 +1,78 @@
 from __future__ import absolute_import
+import collections
+import contextlib
 
 from . import board
 from . import common
 from . import move
 from . import pieces
-from .position import Position
+from . import tablebase
+from . import tables
+from . import zobrist
+from .move import CASTLING, ENPASSANT, NORMAL, encode_move
+from .position import ALL_POSITIONS, Position
+
+
+KingSafety = collections.namedtuple('KingSafety',
+                                    ['checkers', 'pins', 'check_mask'])
+
+
+# Pieces whose moves are exactly the squares they attack, which boards that
+# provide attacks can generate.
+_board_generated_classes = (pieces.Knight, pieces.Bishop, pieces.Rook,
+                            pieces.Queen)
 
 
 class ChessRules(object):
 
+    __slots__ = (
+        '_board', '_action', 'moves', '_undo_stack', '_enpassant_position',
+        'halfmove_clock', 'fullmove_number', 'king_position',
+        'king_side_castling', 'queen_side_castling', 'zobrist_key',
+        'position_cache', 'lazy_finalization',
+    )
+
     @property
     def delta_rules(self):
-        return type(self)(_board=board.DeltaChessBoard(self._board),
+        return self._copy_with_board(board.DeltaChessBoard(self._board))
+
+    def snapshot(self):
+        """Return an independent ChessRules at the current position.
+
+        The board is copied on write (delta chains are flattened), so this is
+        cheap, and the snapshot keeps no reference to this ChessRules or its
+        move history, which it starts without.
+        """
+        return self._copy_with_board(self._board.snapshot())
+
+    def _copy_with_board(self, chess_board):
+        return type(self)(_board=chess_board,
                           king_position=self.king_position.copy(),
                           queen_side_castling=self.queen_side_castling.copy(),
                           king_side_castling=self.king_side_castling.copy(),
-                          action=self.action)
+                          action=self.action,
+                          enpassant_position=self.enpassant_position,
+                          zobrist_key=self.zobrist_key,
+                          position_cache=self.position_cache,
+                          halfmove_clock=self.halfmove_clock,
+                          fullmove_number=self.fullmove_number,
+                          lazy_finalization=self.lazy_finalization)
 
     def __init__(self, _board=None, king_position=None,
                  king_side_castling=None, queen_side_castling=None,
-                 action=common.color.WHITE):
+                 action=common.color.WHITE, enpassant_position=None,
+                 zobrist_key=None, position_cache=None, halfmove_clock=0,
+                 fullmove_number=1, lazy_finalization=False):
         if _board == None:
             _board = board.BasicChessBoard()
         self._board = _board
-        self.action = action
-        self.moves = []
+        self._action = action
+        self.moves = move.MoveHistory(self)
+        self._undo_stack = []
+        # The square a pawn that just made a double move passed over, if any.
+        self._enpassant_position = enpassant_position
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
         self.king_position = king_position or {
             common.color.WHITE: Position.make('e1'),
             common.color.BLACK: Position.make('e8')
@@ -37,74 +85,394 @@ class ChessRules(object):
             common.color.WHITE: True,
             common.color.BLACK: True
         }
+        self.zobrist_key = zobrist_key
+        if zobrist_key is None:
+            self.recompute_zobrist_key()
+        # An optional cache.PositionCache for results that only depend on the
+        # position; it is keyed by zobrist_key.
+        self.position_cache = position_cache
+        # Whether make_legal_move defers SAN, check and mate detection until
+        # they are asked for.
+        self.lazy_finalization = lazy_finalization
+
+    def _cached(self, cache_key, compute):
+        if self.position_cache is None:
+            return compute()
+        return self.position_cache.get_or_compute(
+            (self.zobrist_key,) + cache_key, compute
+        )
+
+    @classmethod
+    def from_fen(cls, fen, board_class=board.BasicChessBoard, **kwargs):
+        """Build rules for the position described by the FEN string `fen`.
+
+        The halfmove clock and fullmove number may be omitted. Extra keyword
+        arguments are passed through to the constructor.
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise common.InvalidNotationError(fen)
+        placement, active_color, castling, enpassant = fields[:4]
+
+        board_array = [pieces.Empty] * 64
+        king_position = {}
+        rank_index, file_index = 7, 0
+        try:
+            for character in placement:
+                if character == '/':
+                    if file_index != 8:
+                        raise common.InvalidNotationError(fen)
+                    rank_index, file_index = rank_index - 1, 0
+                elif character.isdigit():
+                    file_index += int(character)
+                else:
+                    color = (common.color.WHITE if character.isupper()
+                             else common.color.BLACK)
+                    piece = pieces.Piece.get_piece_class(character)(color)
+                    position = Position.from_rank_file(rank_index, file_index)
+                    board_array[position.index] = piece
+                    if isinstance(piece, pieces.King):
+                        king_position[color] = position
+                    file_index += 1
+            if rank_index != 0 or file_index != 8 or len(king_position) != 2:
+                raise common.InvalidNotationError(fen)
+            action = {'w': common.color.WHITE, 'b': common.color.BLACK}[active_color]
+            enpassant_position = (None if enpassant == '-'
+                                  else Position.make(enpassant))
+            if len(fields) == 6:
+                kwargs.setdefault('halfmove_clock', int(fields[4]))
+                kwargs.setdefault('fullmove_number', int(fields[5]))
+        except (KeyError, ValueError, AssertionError,
+                common.IllegalPositionError):
+            raise common.InvalidNotationError(fen)
+
+        return cls(
+            _board=board_class(board_array),
+            king_position=king_position,
+            king_side_castling={common.color.WHITE: 'K' in castling,
+                                common.color.BLACK: 'k' in castling},
+            queen_side_castling={common.color.WHITE: 'Q' in castling,
+                                 common.color.BLACK: 'q' in castling},
+            action=action,
+            enpassant_position=enpassant_position,
+            **kwargs
+        )
+
+    def to_fen(self):
+        """Return the FEN string describing the current position."""
+        ranks = []
+        for rank_index in range(7, -1, -1):
+            rank = ''
+            empty_squares = 0
+            for index in range(rank_index * 8, rank_index * 8 + 8):
+                piece = self._board.get_piece_at_index(index)
+                if piece.is_empty:
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    rank += str(empty_squares)
+                    empty_squares = 0
+                rank += (piece.character.upper()
+                         if piece.color == common.color.WHITE
+                         else piece.character)
+            if empty_squares:
+                rank += str(empty_squares)
+            ranks.append(rank)
+
+        castling = ''.join(
+            character for character, available in zip('KQkq', self._castling_rights)
+            if available
+        ) or '-'
+        return ' '.join([
+            '/'.join(ranks),
+            'w' if self.action == common.color.WHITE else 'b',
+            castling,
+            '-' if self.enpassant_position is None else self.enpassant_position.algebraic,
+            str(self.halfmove_clock),
+            str(self.fullmove_number),
+        ])
+
+    def recompute_zobrist_key(self):
+        """Rebuild `zobrist_key` from scratch. Only needed after the board has
+        been modified directly rather than through these rules."""
+        self.zobrist_key = zobrist.compute_key(self)
+
+    @property
+    def action(self):
+        return self._action
+
+    @action.setter
+    def action(self, action):
+        self.zobrist_key ^= (zobrist.side_key(self._action) ^
+                             zobrist.side_key(action))
+        self._action = action
+
+    @property
+    def enpassant_position(self):
+        return self._enpassant_position
+
+    @enpassant_position.setter
+    def enpassant_position(self, enpassant_position):
+        # The key depends on the pawns next to the square. push sets the
+        # square before moving any pawn that could capture on it, so the old
+        # square's key is removed on the board it was added on.
+        self.zobrist_key ^= (
+            zobrist.enpassant_key(self._enpassant_position, self._board) ^
+            zobrist.enpassant_key(enpassant_position, self._board)
+        )
+        self._enpassant_position = enpassant_position
 
     @Position.provide_position
     def get_legal_moves(self, position):
-        piece = self[position]
+        piece = self.get_piece_at_index(position.index)
         if piece.is_empty:
             raise common.PieceNotFoundError()
-        if self._board[position].color != self.action:
+        if self._board.get_piece_at_index(position.index).color != self.action:
             raise common.ActiveColorError()
-        return self._filter_moves_for_king_safety(
-            position,
-            self.get_squares_threatened_by(position)
-        )
+        return list(self._cached(
+            ('legal_moves', position.index),
+            lambda: self._filter_moves_for_king_safety(
+                position,
+                self._threatened_by(position)
+            )
+        ))
 
     @Position.provide_position
     def is_square_threatened(self, position, by_color=common.color.WHITE):
-        for i in range(8):
-            for j in range(8):
-                if (self[i, j].color == by_color and
-                    position in set(self.get_squares_threatened_by((i, j)))):
-                    return True
+        return self._is_threatened(position, by_color)
+
+    def _is_threatened(self, position, by_color):
+        if self._board.provides_attacks:
+            return self._board.is_index_threatened(position.index, by_color)
+        for _ in self._iterate_attackers(position, by_color):
+            return True
         return False
 
+    @Position.provide_position
+    def get_attackers(self, position, by_color=common.color.WHITE):
+        """Return the positions of all pieces of `by_color` that attack
+        `position`."""
+        return self._attackers(position, by_color)
+
+    def _attackers(self, position, by_color):
+        if self._board.provides_attacks:
+            return self._board.get_index_attackers(position.index, by_color)
+        return list(self._iterate_attackers(position, by_color))
+
+    def _iterate_attackers(self, position, by_color):
+        # Work outward from the target square, so that only the squares an
+        # attacker could actually stand on are ever inspected.
+        chess_board = self._board
+        index = position.index
+        for attacker_class, targets in (
+            (pieces.Knight, tables.KNIGHT_TARGETS[index]),
+            (pieces.Pawn, tables.PAWN_ATTACKS[by_color.opponent][index]),
+            (pieces.King, tables.KING_TARGETS[index]),
+        ):
+            for test_position in targets:
+                piece = chess_board.get_piece_at_index(test_position.index)
+                if piece.color == by_color and isinstance(piece, attacker_class):
+                    yield test_position
+
+        for attacker_classes, directions in (
+            ((pieces.Bishop, pieces.Queen), tables.DIAGONALS),
+            ((pieces.Rook, pieces.Queen), tables.STRAIGHTS),
+        ):
+            for direction in directions:
+                for test_position in tables.SLIDING_RAYS[direction][index]:
+                    piece = chess_board.get_piece_at_index(test_position.index)
+                    if piece.is_empty:
+                        continue
+                    if (piece.color == by_color and
+                        isinstance(piece, attacker_classes)):
+                        yield test_position
+                    break
+
     def get_all_threatened_squares(self, by_color):
         threatened_squares = set()
-        for i in range(8):
-            for j in range(8):
-                if self[i, j].color == by_color:
-                    threatened_squares = threatened_squares.union(set(self.get_squares_threatened_by((i, j))))
+        for position in ALL_POSITIONS:
+            if self._board.get_piece_at_index(position.index).color == by_color:
+                threatened_squares.update(
+                    self._threatened_by(position)
+                )
         return threatened_squares
 
     @Position.src_dst_provide_position
     def is_legal_move(self, source, destination):
         return destination in self.get_legal_moves(source)
 
-    def make_legal_move(self, move):
+    def make_legal_move(self, move, lazy=None):
         if not self.is_legal_move(move.source, move.destination):
             raise common.IllegalMoveError()
         self._check_promotion_info(move)
-        return self._make_move(move.finalized())
+        if lazy is None:
+            lazy = self.lazy_finalization
+        return self.push(move.finalized(lazy=lazy))
+
+    def make_trusted_move(self, move, validate=True):
+        """Make `move` without finalizing it.
+
+        With `validate`, the move only has to be pseudo-legal and leave the
+        mover's king safe, which is much cheaper than a full legal move
+        check; without it, `move` is made as is.
+        """
+        if not validate:
+            return self.push(move)
+        piece = self._board.get_piece_at_index(move.source.index)
+        if (piece.color != self.action or
+            move.destination not in self._threatened_by(move.source)):
+            raise common.IllegalMoveError()
+        self._check_promotion_info(move)
+        if isinstance(piece, pieces.King) and (move.is_kingside_castle or
+                                               move.is_queenside_castle):
+            destinations = set([move.destination])
+            self._filter_illegal_castling_moves(destinations, piece,
+                                                move.source)
+            if not destinations:
+                raise common.IllegalMoveError()
+        self.push(move)
+        if self.is_king_threatened(piece.color):
+            self.pop()
+            raise common.IllegalMoveError()
+        return move
+
+    def push(self, move):
+        """Make `move` without checking its legality, recording what is needed
+        to take it back with `pop`."""
+        piece = self._board.get_piece_at_index(move.source.index)
+        captured_position = move.destination
+        if self._is_enpassant_capture(piece, move.source, move.destination):
+            captured_position = Position.from_rank_file(
+                move.source.rank_index, move.destination.file_index
+            )
+        captured_piece = self._board.get_piece_at_index(
+            captured_position.index
+        )
+        castling_rights = self._castling_rights
+        flag = NORMAL
+        if captured_position != move.destination:
+            flag = ENPASSANT
+        elif (isinstance(piece, pieces.King) and
+              abs(move.destination.file_index - move.source.file_index) == 2):
+            flag = CASTLING
+        code = encode_move(move.source, move.destination, move.promotion, flag)
+        self._undo_stack.append((
+            piece, captured_piece, captured_position, castling_rights,
+            self.enpassant_position, self.zobrist_key, self.halfmove_clock
+        ))
+        if isinstance(piece, pieces.Pawn) or not captured_piece.is_empty:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece.color == common.color.BLACK:
+            self.fullmove_number += 1
 
-    def _make_move(self, move):
-        piece = self._board[move.source]
         if isinstance(piece, pieces.Pawn):
             self._handle_pawn_move(move)
 
         if isinstance(piece, pieces.King):
             self._handle_king_move(move)
 
-        if move.source == Position.from_rank_file(0, 0):
-            self.queen_side_castling[common.color.WHITE] = False
-        if move.source == Position.from_rank_file(0, 7):
-            self.king_side_castling[common.color.WHITE] = False
-        if move.source == Position.from_rank_file(7, 0):
-            self.queen_side_castling[common.color.BLACK] = False
-        if move.source == Position.from_rank_file(7, 7):
-            self.king_side_castling[common.color.BLACK] = False
-
-        self._board.make_move(move.source, move.destination, piece)
-        if move.promotion:
-            self._board[move.destination] = move.promotion(piece.color)
+        # Castling is lost when a rook leaves its corner or is captured there.
+        for position in (move.source, move.destination):
+            if position == Position.from_rank_file(0, 0):
+                self.queen_side_castling[common.color.WHITE] = False
+            if position == Position.from_rank_file(0, 7):
+                self.king_side_castling[common.color.WHITE] = False
+            if position == Position.from_rank_file(7, 0):
+                self.queen_side_castling[common.color.BLACK] = False
+            if position == Position.from_rank_file(7, 7):
+                self.king_side_castling[common.color.BLACK] = False
+
+        if (isinstance(piece, pieces.Pawn) and
+            abs(move.destination.rank_index - move.source.rank_index) == 2):
+            self.enpassant_position = Position.from_rank_file(
+                move.source.rank_index + piece.color, move.source.file_index
+            )
+        else:
+            self.enpassant_position = None
+
+        self._set_piece(move.destination, piece if move.promotion is None
+                        else move.promotion(piece.color))
+        self._set_piece(move.source, pieces.Empty)
+        self.zobrist_key ^= (zobrist.CASTLING_KEYS[castling_rights] ^
+                             zobrist.CASTLING_KEYS[self._castling_rights])
         self.action = self.action.opponent
-        self.moves.append(move)
+        self.moves.append(code)
         return move
 
+    def pop(self):
+        """Take back the last move made with `push`, and return it."""
+        move = self.moves.pop()
+        (piece, captured_piece, captured_position, castling_rights,
+         self._enpassant_position, self.zobrist_key,
+         self.halfmove_clock) = self._undo_stack.pop()
+        self._action = self._action.opponent
+        self._castling_rights = castling_rights
+        if piece.color == common.color.BLACK:
+            self.fullmove_number -= 1
+
+        self._board.set_piece_at_index(move.destination.index, pieces.Empty)
+        self._board.set_piece_at_index(captured_position.index, captured_piece)
+        self._board.set_piece_at_index(move.source.index, piece)
+        if isinstance(piece, pieces.King):
+            self.king_position[piece.color] = move.source
+            rank_start = move.source.index & ~7
+            if move.is_kingside_castle:
+                self._unmove_rook(rank_start + 5, rank_start + 7)
+            if move.is_queenside_castle:
+                self._unmove_rook(rank_start + 3, rank_start)
+        return move
+
+    def _unmove_rook(self, index, home_index):
+        # The Zobrist key was restored from the undo stack already.
+        self._board.set_piece_at_index(home_index,
+                                       self._board.get_piece_at_index(index))
+        self._board.set_piece_at_index(index, pieces.Empty)
+
+    def _set_piece(self, position, piece):
+        index = position.index
+        self.zobrist_key ^= (
+            zobrist.piece_key(self._board.get_piece_at_index(index), index) ^
+            zobrist.piece_key(piece, index)
+        )
+        self._board.set_piece_at_index(index, piece)
+
+    def _move_piece(self, source, destination):
+        self._set_piece(destination,
+                        self._board.get_piece_at_index(source.index))
+        self._set_piece(source, pieces.Empty)
+
+    @contextlib.contextmanager
+    def rewound_to(self, ply):
+        """Temporarily take back moves until only `ply` of them are left."""
+        taken_back = []
+        while len(self.moves) > ply:
+            taken_back.append(self.pop())
+        try:
+            yield self
+        finally:
+            for move in reversed(taken_back):
+                self.push(move)
+
+    @property
+    def _castling_rights(self):
+        return (self.king_side_castling[common.color.WHITE],
+                self.queen_side_castling[common.color.WHITE],
+                self.king_side_castling[common.color.BLACK],
+                self.queen_side_castling[common.color.BLACK])
+
+    @_castling_rights.setter
+    def _castling_rights(self, castling_rights):
+        (self.king_side_castling[common.color.WHITE],
+         self.queen_side_castling[common.color.WHITE],
+         self.king_side_castling[common.color.BLACK],
+         self.queen_side_castling[common.color.BLACK]) = castling_rights
+
     def _check_promotion_info(self, move):
         """Make sure that we got promotion info if we need it, and that we didn't
         get it if we don't."""
-        piece = self._board[move.source]
+        piece = self._board.get_piece_at_index(move.source.index)
         if isinstance(piece, pieces.Pawn):
             if not ((move.promotion is not None) ==
                     (move.destination.rank_index in (0, 7))):
@@ -115,19 +483,19 @@ class ChessRules(object):
     def _handle_pawn_move(self, move):
         # Handle enpassant
         if (move.destination.file_index != move.source.file_index and
-           self._board[move.destination].is_empty):
-            self._board.set_piece((move.source.rank_index,
-                                   move.destination.file_index),
-                                  pieces.Empty)
+           self._board.get_piece_at_index(move.destination.index).is_empty):
+            self._set_piece(Position.from_rank_file(move.source.rank_index,
+                                                    move.destination.file_index),
+                            pieces.Empty)
 
     def _handle_king_move(self, move):
         if move.is_kingside_castle:
             # Kingside castle.
-            self._board.make_move((move.source.rank_index, 7),
-                                  (move.source.rank_index, 5))
+            self._move_piece(Position.from_rank_file(move.source.rank_index, 7),
+                             Position.from_rank_file(move.source.rank_index, 5))
         if move.is_queenside_castle:
-            self._board.make_move((move.source.rank_index, 0),
-                                  (move.source.rank_index, 3))
+            self._move_piece(Position.from_rank_file(move.source.rank_index, 0),
+                             Position.from_rank_file(move.source.rank_index, 3))
         # Disable castling after a king move no matter what.
         self.king_side_castling[self.action] = False
         self.queen_side_castling[self.action] = False
@@ -136,97 +504,406 @@ class ChessRules(object):
     def find_piece(self, piece_class, destination, *args, **kwargs):
         return piece_class.find(destination, self, *args, **kwargs)
 
+    def generate_legal_moves(self):
+        """Return every legal move for the side to move."""
+        return list(self.iterate_legal_moves())
+
+    def iterate_legal_moves(self):
+        """Lazily yield the legal moves for the side to move.
+
+        Checkers and pins are computed once and shared by every piece, and
+        nothing is generated past the move the caller stops at.
+        """
+        king_safety = self.get_king_safety(self.action)
+        if len(king_safety.checkers) > 1:
+            positions = [self.king_position[self.action]]
+        else:
+            positions = ALL_POSITIONS
+        for position in positions:
+            piece = self._board.get_piece_at_index(position.index)
+            if piece.color != self.action:
+                continue
+            destinations = self._filter_moves_for_king_safety(
+                position, self._threatened_by(position),
+                king_safety=king_safety
+            )
+            is_pawn = isinstance(piece, pieces.Pawn)
+            for destination in destinations:
+                if is_pawn and destination.rank_index in (0, 7):
+                    for promotion in pieces.promotion_classes:
+                        yield move.Move.from_positions(position, destination,
+                                                       self, promotion)
+                else:
+                    yield move.Move.from_positions(position, destination, self)
+
     @property
     def legal_moves_available(self):
-        for i in range(8):
-            for j in range(8):
-                if self[i, j].color == self.action:
-                    if self.get_legal_moves((i, j)):
-                        return True
+        for _ in self.iterate_legal_moves():
+            return True
         return False
 
+    @property
+    def _game_status(self):
+        return self._cached(
+            ('game_status',),
+            lambda: (self.legal_moves_available,
+                     self.is_king_threatened(self.action))
+        )
+
     @property
     def in_checkmate(self):
-        return not self.legal_moves_available and self.is_king_threatened(self.action)
+        legal_moves_available, in_check = self._game_status
+        return not legal_moves_available and in_check
 
     @property
     def in_stalemate(self):
-        return not self.legal_moves_available and not self.is_king_threatened(self.action)
+        legal_moves_available, in_check = self._game_status
+        return not legal_moves_available and not in_check
+
+    def probe_tablebase(self, tablebases=None):
+        """Return the tablebase.TablebaseResult of the position for the side
+        to move, or None if no tablebase covers it.
+
+        Tablebases are looked up in `tablebases`, by default
+        `tablebase.default_tablebases`. Positions with castling rights, or
+        with an en-passant capture the side to move can play, are never
+        covered.
+        """
+        if tablebases is None:
+            tablebases = tablebase.default_tablebases
+        return tablebases.probe(self)
+
+    def iterate_checking_moves(self):
+        """Lazily yield the legal moves that give check.
+
+        Only moves that land where the moved (or promoted) piece could attack
+        the enemy king from, that leave a line to the king, castling and
+        en-passant captures are actually tried.
+        """
+        king_index = self.king_position[self.action.opponent].index
+        diagonal_squares = set(
+            position for direction in tables.DIAGONALS
+            for position in tables.SLIDING_RAYS[direction][king_index]
+        )
+        straight_squares = set(
+            position for direction in tables.STRAIGHTS
+            for position in tables.SLIDING_RAYS[direction][king_index]
+        )
+        line_squares = diagonal_squares | straight_squares
+        checking_squares = {
+            pieces.Pawn: set(
+                tables.PAWN_ATTACKS[self.action.opponent][king_index]
+            ),
+            pieces.Knight: set(tables.KNIGHT_TARGETS[king_index]),
+            pieces.Bishop: diagonal_squares,
+            pieces.Rook: straight_squares,
+            pieces.Queen: line_squares,
+            pieces.King: (),
+        }
+        for legal_move in self.iterate_legal_moves():
+            piece = self._board.get_piece_at_index(legal_move.source.index)
+            if not (
+                legal_move.destination in
+                checking_squares[legal_move.promotion or type(piece)] or
+                legal_move.source in line_squares or
+                isinstance(piece, pieces.King) and abs(
+                    legal_move.destination.file_index -
+                    legal_move.source.file_index
+                ) == 2 or
+                self._is_enpassant_capture(piece, legal_move.source,
+                                           legal_move.destination)
+            ):
+                continue
+            if self.delivers_check(legal_move):
+                yield legal_move
+
+    def legal_moves_san(self):
+        """Return an OrderedDict mapping the SAN of every legal move to the
+        move.
+
+        Unlike `BaseMove.algebraic`, the keys leave pinned pieces out of the
+        disambiguation, as SAN does, and give castling moves their check or
+        mate suffix. Disambiguation comes from grouping the legal moves by
+        piece and destination. Checks are found from the lines to the enemy king,
+        which are traced once, and only checking moves (and castling and
+        en-passant captures) are made, to look for mates.
+        """
+        legal_moves = self.generate_legal_moves()
+        board = self._board
+        king_lines = self._king_lines(self.action.opponent)
+        sources_by_target = collections.defaultdict(list)
+        for legal_move in legal_moves:
+            piece = board.get_piece_at_index(legal_move.source.index)
+            sources_by_target[type(piece), legal_move.destination].append(
+                legal_move.source
+            )
+        san_moves = collections.OrderedDict()
+        for legal_move in legal_moves:
+            piece = board.get_piece_at_index(legal_move.source.index)
+            if (legal_move.is_kingside_castle or
+                legal_move.is_queenside_castle):
+                # The rook gives any check, so make the move to find it.
+                check_string = ''
+                if self.delivers_check(legal_move):
+                    check_string = ('#' if self.is_move_checkmate(legal_move)
+                                    else '+')
+                castle = 'O-O' if legal_move.is_kingside_castle else 'O-O-O'
+                san_moves[castle + check_string] = legal_move
+                continue
+            if isinstance(piece, pieces.Pawn):
+                disambiguation = piece.build_disambiguation(board, legal_move)
+            else:
+                disambiguation = self._disambiguation(
+                    legal_move.source,
+                    sources_by_target[type(piece), legal_move.destination]
+                )
+            check_string = ''
+            if self._gives_check(legal_move, piece, king_lines):
+                check_string = ('#' if self.is_move_checkmate(legal_move)
+                                else '+')
+            san_moves[''.join([
+                piece.move_prefix, disambiguation, legal_move.take_string,
+                legal_move.destination.algebraic,
+                legal_move.promotion_string, check_string
+            ])] = legal_move
+        return san_moves
+
+    def _king_lines(self, color):
+        """Map each square on a line from `color`'s king to the line's
+        direction and the squares between it and the king."""
+        king_index = self.king_position[color].index
+        king_lines = {}
+        for direction in tables.DIAGONALS + tables.STRAIGHTS:
+            ray = tables.SLIDING_RAYS[direction][king_index]
+            for distance, position in enumerate(ray):
+                king_lines[position] = (direction, ray[:distance])
+        return king_lines
+
+    def _gives_check(self, move, piece, king_lines):
+        """Return whether the legal `move` checks the enemy king, whose
+        `_king_lines` are given."""
+        board = self._board
+        if (isinstance(piece, pieces.King) and
+            abs(move.destination.file_index - move.source.file_index) == 2 or
+            self._is_enpassant_capture(piece, move.source, move.destination)):
+            return self.delivers_check(move)
+        king_index = self.king_position[self.action.opponent].index
+        piece_class = move.promotion or type(piece)
+
+        def is_open(between):
+            return all(
+                position == move.source or
+                board.get_piece_at_index(position.index).is_empty
+                for position in between
+            )
+
+        if piece_class is pieces.Knight:
+            if move.destination in tables.KNIGHT_TARGETS[king_index]:
+                return True
+        elif piece_class is pieces.Pawn:
+            if move.destination in tables.PAWN_ATTACKS[
+                self.action.opponent
+            ][king_index]:
+                return True
+        elif piece_class is not pieces.King and move.destination in king_lines:
+            direction, between = king_lines[move.destination]
+            if direction in piece_class.directions and is_open(between):
+                return True
+        # A discovered check, by a slider behind the moved piece.
+        if move.source not in king_lines:
+            return False
+        direction, between = king_lines[move.source]
+        if move.destination in between or not is_open(between):
+            return False
+        ray = tables.SLIDING_RAYS[direction][king_index]
+        for position in ray[len(between) + 1:]:
+            if position == move.destination:
+                return False
+            behind = board.get_piece_at_index(position.index)
+            if not behind.is_empty:
+                return (behind.color == self.action and
+                        isinstance(behind, pieces.SlidingPiece) and
+                        direction in behind.directions)
+        return False
 
-    def is_move_checkmate(self, move):
-        delta_rules = self.delta_rules
-        delta_rules._make_move(move)
-        return delta_rules.in_checkmate
+    @staticmethod
+    def _disambiguation(source, sources):
+        if len(sources) < 2:
+            return ''
+        same_rank = same_file = False
+        for other_source in sources:
+            if other_source == source:
+                continue
+            same_rank = same_rank or other_source.rank_index == source.rank_index
+            same_file = same_file or other_source.file_index == source.file_index
+        if same_rank and same_file:
+            return source.algebraic
+        if not same_file:
+            return common.index_to_file(source.file_index)
+        return common.index_to_rank(source.rank_index)
 
-    @Position.provide_position
-    def _filter_moves_for_king_safety(self, start_position, moves):
-        moves = set(moves)
-        piece = self[start_position]
-        delta_board = board.DeltaChessBoard(self._board)
-        delta_rules = ChessRules(delta_board)
-
-        if isinstance(piece, pieces.King):
-            self._filter_illegal_castling_moves(moves, piece, start_position)
+    def is_move_checkmate(self, move):
+        self.push(move)
+        try:
+            return self.in_checkmate
+        finally:
+            self.pop()
+
+    def get_king_safety(self, color):
+        """Return the checkers of `color`'s king, its absolutely pinned pieces
+        and the squares that resolve a single check."""
+        king_position = self.king_position[color]
+        opponent = color.opponent
+        checkers = self._attackers(king_position, opponent)
+        if not checkers:
+            check_mask = None
+        elif len(checkers) == 1:
+            check_mask = set(self._squares_between(king_position, checkers[0]))
+            check_mask.add(checkers[0])
         else:
-            # Do an initial check to see if we can avoid checking every move.
-            delta_rules[start_position] = pieces.Empty
-            if not delta_rules.is_square_threatened(
-                self.king_position[piece.color],
-                by_color=piece.color.opponent
-            ):
-                return moves
+            # Only the king can get out of a double check.
+            check_mask = set()
+
+        pins = {}
+        for attacker_classes, directions in (
+            ((pieces.Bishop, pieces.Queen), tables.DIAGONALS),
+            ((pieces.Rook, pieces.Queen), tables.STRAIGHTS),
+        ):
+            for direction in directions:
+                ray = tables.SLIDING_RAYS[direction][king_position.index]
+                pinned_position = None
+                for ray_index, test_position in enumerate(ray):
+                    piece = self._board.get_piece_at_index(test_position.index)
+                    if piece.is_empty:
+                        continue
+                    if pinned_position is None:
+                        if piece.color != color:
+                            break
+                        pinned_position = test_position
+                        continue
+                    if (piece.color == opponent and
+                        isinstance(piece, attacker_classes)):
+                        pins[pinned_position] = set(ray[:ray_index + 1])
+                    break
+
+        return KingSafety(checkers, pins, check_mask)
+
+    @staticmethod
+    def _squares_between(source, destination):
+        for ray in tables.SLIDING_RAYS.itervalues():
+            squares = ray[source.index]
+            if destination in squares:
+                return squares[:squares.index(destination)]
+        return ()
+
+    def _filter_moves_for_king_safety(self, start_position, moves,
+                                      king_safety=None):
+        piece = self.get_piece_at_index(start_position.index)
+        if isinstance(piece, pieces.King):
+            return self._filter_king_moves(start_position, piece, moves)
+
+        if king_safety is None:
+            king_safety = self.get_king_safety(piece.color)
+        if len(king_safety.checkers) > 1:
+            return []
+        pin_ray = king_safety.pins.get(start_position)
+        check_mask = king_safety.check_mask
 
         king_safe_moves = []
         for move_destination in moves:
-            if isinstance(piece, pieces.King):
-                king_position = move_destination
-            else:
-                king_position = self.king_position[piece.color]
-            delta_board.reset_to_parent()
-            # This is ugly, but it needs to be done to make sure that
-            # a pawn removed by enpassant doesnt affect the
-            # determination of whether the king is safe.
-            if isinstance(piece, pieces.Pawn):
-                delta_rules._handle_pawn_move(move.BaseMove(start_position, move_destination, self))
-            delta_board.make_move(start_position, move_destination, piece)
-            if not delta_rules.is_square_threatened(king_position,
-                                                    by_color=piece.color.opponent):
-                king_safe_moves.append(move_destination)
+            if self._is_enpassant_capture(piece, start_position,
+                                          move_destination):
+                # The captured pawn leaves a square that is on neither the pin
+                # ray nor the check mask, so just try the move.
+                if self._is_enpassant_capture_safe(piece, start_position,
+                                                   move_destination):
+                    king_safe_moves.append(move_destination)
+                continue
+            if pin_ray is not None and move_destination not in pin_ray:
+                continue
+            if check_mask is not None and move_destination not in check_mask:
+                continue
+            king_safe_moves.append(move_destination)
 
         return king_safe_moves
 
-    def _filter_illegal_castling_moves(self, moves, piece, start_position):
-        back_rank_index = 0 if piece.color is common.color.WHITE else 7
-        if start_position == Position.make((back_rank_index, 4)):
-            castling_square = Position.make((back_rank_index, 6))
+    def _filter_king_moves(self, start_position, piece, moves):
+        moves = set(moves)
+        self._filter_illegal_castling_moves(moves, piece, start_position)
+        # Lift the king off the board so that it doesn't shield the squares
+        # behind it from the sliding piece that is checking it.
+        self._board.set_piece_at_index(start_position.index, pieces.Empty)
+        try:
+            return [
+                move_destination for move_destination in moves
+                if not self._is_threatened(move_destination,
+                                           piece.color.opponent)
+            ]
+        finally:
+            self._board.set_piece_at_index(start_position.index, piece)
+
+    def _is_enpassant_capture(self, piece, source, destination):
+        return (isinstance(piece, pieces.Pawn) and
+                source.file_index != destination.file_index and
+                self._board.get_piece_at_index(destination.index).is_empty)
+
+    def _is_enpassant_capture_safe(self, piece, source, destination):
+        captured_position = Position.from_rank_file(source.rank_index,
+                                                     destination.file_index)
+        captured_piece = self._board.get_piece_at_index(
+            captured_position.index
+        )
+        self._board.set_piece_at_index(source.index, pieces.Empty)
+        self._board.set_piece_at_index(captured_position.index, pieces.Empty)
+        self._board.set_piece_at_index(destination.index, piece)
+        try:
+            return not self.is_king_threatened(piece.color)
+        finally:
+            self._board.set_piece_at_index(destination.index, pieces.Empty)
+            self._board.set_piece_at_index(captured_position.index, captured_piece)
+            self._board.set_piece_at_index(source.index, piece)
 
+    def _filter_illegal_castling_moves(self, moves, piece, start_position):
+        back_rank_start = 0 if piece.color == common.color.WHITE else 56
+        if start_position.index != back_rank_start + 4:
+            return
+        opponent = piece.color.opponent
+        for castling_file, crossed_files in ((6, xrange(4, 7)),
+                                             (2, xrange(2, 5))):
+            castling_square = ALL_POSITIONS[back_rank_start + castling_file]
             if castling_square in moves and any(
-                self.is_square_threatened((back_rank_index, file_index),
-                                          by_color=piece.color.opponent)
-                for file_index in range(4, 7)
-            ):
-                moves.remove(castling_square)
-            castling_square = Position.make((back_rank_index, 2))
-            if castling_square in moves and any(
-                self.is_square_threatened((back_rank_index, file_index),
-                                          by_color=piece.color.opponent)
-                    for file_index in range(2, 5)
+                self._is_threatened(ALL_POSITIONS[back_rank_start + file_index],
+                                    opponent)
+                for file_index in crossed_files
             ):
                 moves.remove(castling_square)
 
     @Position.provide_position
     def get_squares_threatened_by(self, position):
-        return self[position].get_all_threatened_moves(position, self)
+        return self._threatened_by(position)
+
+    def _threatened_by(self, position):
+        piece = self._board.get_piece_at_index(position.index)
+        if (self._board.provides_attacks and
+            isinstance(piece, _board_generated_classes)):
+            return self._board.get_piece_destinations(position.index)
+        return piece._get_threatened_moves(position, self)
 
     @Position.provide_position
     def __getitem__(self, item):
-        return self._board[item]
+        return self._board.get_piece_at_index(item.index)
 
     @Position.provide_position
     def __setitem__(self, position, piece):
         if isinstance(piece, pieces.King):
             self.king_position[piece.color] = position
-        self._board[position] = piece
+        self._set_piece(position, piece)
+
+    def get_piece_at_index(self, index):
+        return self._board.get_piece_at_index(index)
+
+    def set_piece_at_index(self, index, piece):
+        self[Position.from_index(index)] = piece
 
     def can_castle_kingside(self, color):
         return self.king_side_castling[color]
@@ -235,10 +912,15 @@ class ChessRules(object):
         return self.queen_side_castling[color]
 
     def is_king_threatened(self, color):
-        return self.is_square_threatened(self.king_position[color],
-                                         by_color=color.opponent)
+        return self._is_threatened(self.king_position[color], color.opponent)
 
     def delivers_check(self, move):
-        delta_rules = self.delta_rules
-        delta_rules._make_move(move)
-        return delta_rules.is_king_threatened(delta_rules.action)
+        return self._cached(('delivers_check', move.uci),
+                            lambda: self._delivers_check(move))
+
+    def _delivers_check(self, move):
+        self.push(move)
+        try:
+            return self.is_king_threatened(self.action)
+        finally:
+            self.pop()
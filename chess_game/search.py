@@ -0,0 +1,394 @@
+"""A small alpha-beta search engine on top of ChessRules.
+
+`Search(chess_rules).search(...)` runs a negamax alpha-beta search with
+iterative deepening, a transposition table, MVV-LVA and killer move
+ordering and a quiescence search over captures, using a material and
+piece-square evaluation. It stops at a depth, node or time limit, and
+returns the result of the deepest completed iteration. Run
+``python -m chess_game.search FEN`` to search a position.
+"""
+from __future__ import absolute_import
+import argparse
+import collections
+import time
+
+from . import cache
+from . import common
+from . import pieces
+from . import rules
+from .move import encode_move
+
+
+PIECE_VALUES = {
+    pieces.Pawn: 100,
+    pieces.Knight: 320,
+    pieces.Bishop: 330,
+    pieces.Rook: 500,
+    pieces.Queen: 900,
+    pieces.King: 0,
+}
+
+# Piece-square bonuses as seen from white's side of the board, with the
+# eighth rank on the first line.
+_piece_square_rows = {
+    pieces.Pawn: (
+        0,   0,   0,   0,   0,   0,   0,   0,
+        50,  50,  50,  50,  50,  50,  50,  50,
+        10,  10,  20,  30,  30,  20,  10,  10,
+        5,   5,   10,  25,  25,  10,  5,   5,
+        0,   0,   0,   20,  20,  0,   0,   0,
+        5,   -5,  -10, 0,   0,   -10, -5,  5,
+        5,   10,  10,  -20, -20, 10,  10,  5,
+        0,   0,   0,   0,   0,   0,   0,   0,
+    ),
+    pieces.Knight: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0,   0,   0,   0,   -20, -40,
+        -30, 0,   10,  15,  15,  10,  0,   -30,
+        -30, 5,   15,  20,  20,  15,  5,   -30,
+        -30, 0,   15,  20,  20,  15,  0,   -30,
+        -30, 5,   10,  15,  15,  10,  5,   -30,
+        -40, -20, 0,   5,   5,   0,   -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ),
+    pieces.Bishop: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0,   0,   0,   0,   0,   0,   -10,
+        -10, 0,   5,   10,  10,  5,   0,   -10,
+        -10, 5,   5,   10,  10,  5,   5,   -10,
+        -10, 0,   10,  10,  10,  10,  0,   -10,
+        -10, 10,  10,  10,  10,  10,  10,  -10,
+        -10, 5,   0,   0,   0,   0,   5,   -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ),
+    pieces.Rook: (
+        0,   0,   0,   0,   0,   0,   0,   0,
+        5,   10,  10,  10,  10,  10,  10,  5,
+        -5,  0,   0,   0,   0,   0,   0,   -5,
+        -5,  0,   0,   0,   0,   0,   0,   -5,
+        -5,  0,   0,   0,   0,   0,   0,   -5,
+        -5,  0,   0,   0,   0,   0,   0,   -5,
+        -5,  0,   0,   0,   0,   0,   0,   -5,
+        0,   0,   0,   5,   5,   0,   0,   0,
+    ),
+    pieces.Queen: (
+        -20, -10, -10, -5,  -5,  -10, -10, -20,
+        -10, 0,   0,   0,   0,   0,   0,   -10,
+        -10, 0,   5,   5,   5,   5,   0,   -10,
+        -5,  0,   5,   5,   5,   5,   0,   -5,
+        0,   0,   5,   5,   5,   5,   0,   -5,
+        -10, 5,   5,   5,   5,   5,   0,   -10,
+        -10, 0,   5,   0,   0,   0,   0,   -10,
+        -20, -10, -10, -5,  -5,  -10, -10, -20,
+    ),
+    pieces.King: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20,  20,  0,   0,   0,   0,   20,  20,
+        20,  30,  10,  0,   0,   10,  30,  20,
+    ),
+}
+
+
+def _build_square_values():
+    # Material plus piece-square bonus, indexed by Position.index and signed
+    # for the piece's color. Black reads white's table upside down.
+    square_values = {}
+    for piece_class, rows in _piece_square_rows.items():
+        value = PIECE_VALUES[piece_class]
+        for color in (common.color.WHITE, common.color.BLACK):
+            square_values[piece_class, color] = tuple(
+                color * (value + rows[
+                    (7 - index // 8 if color == common.color.WHITE
+                     else index // 8) * 8 + index % 8
+                ])
+                for index in range(64)
+            )
+    return square_values
+
+
+_square_values = _build_square_values()
+
+
+def evaluate(chess_rules):
+    """Return the material and piece-square score of the position, in
+    centipawns from the point of view of the side to move."""
+    get_piece_at_index = chess_rules.get_piece_at_index
+    score = 0
+    for index in range(64):
+        piece = get_piece_at_index(index)
+        if not piece.is_empty:
+            score += _square_values[type(piece), piece.color][index]
+    return score * chess_rules.action
+
+
+MATE_SCORE = 100000
+# Scores beyond this are mates, found that many plies short of MATE_SCORE.
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = MATE_SCORE + 1
+
+# Transposition table bounds.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+SearchResult = collections.namedtuple('SearchResult', [
+    'best_move', 'score', 'depth', 'nodes', 'seconds', 'nodes_per_second',
+    'principal_variation'
+])
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when it reaches its node or time limit."""
+
+
+def _move_code(move):
+    return encode_move(move.source, move.destination, move.promotion)
+
+
+def _capture_value(move):
+    """MVV-LVA: prefer the most valuable victim, then the cheapest attacker.
+    Promotions count as capturing the promoted piece."""
+    value = 10 * PIECE_VALUES.get(type(move.taken_piece), 0)
+    if move.promotion is not None:
+        value += 10 * PIECE_VALUES[move.promotion]
+    return value - PIECE_VALUES[type(move.piece)]
+
+
+class Search(object):
+    """Searches the position of a ChessRules, which it leaves as it found it.
+
+    The transposition table, a cache.PositionCache keyed by Zobrist key,
+    is kept between searches.
+    """
+
+    def __init__(self, chess_rules, transposition_table=None):
+        self.chess_rules = chess_rules
+        if transposition_table is None:
+            transposition_table = cache.PositionCache(max_entries=1 << 18)
+        self.transposition_table = transposition_table
+        self.nodes = 0
+
+    def search(self, max_depth=64, max_nodes=None, max_seconds=None,
+               on_iteration=None):
+        """Deepen iteratively up to `max_depth`, until `max_nodes` nodes have
+        been searched or `max_seconds` have passed, and return the
+        SearchResult of the deepest completed iteration.
+
+        `on_iteration`, if given, is called with the SearchResult of each
+        completed iteration.
+        """
+        self.nodes = 0
+        self._max_nodes = max_nodes
+        start = time.time()
+        self._deadline = None if max_seconds is None else start + max_seconds
+        self._killers = collections.defaultdict(list)
+        result = self._result(0, None, start)
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                break
+            result = self._result(depth, score, start)
+            if on_iteration is not None:
+                on_iteration(result)
+            if result.best_move is None or abs(score) >= MATE_THRESHOLD:
+                break
+        return result
+
+    def _result(self, depth, score, start):
+        seconds = time.time() - start
+        principal_variation = self._principal_variation(depth)
+        if principal_variation:
+            best_move = principal_variation[0]
+        else:
+            # Nothing was searched to completion: fall back on move ordering.
+            best_move = next(iter(self._order_moves(
+                self.chess_rules.generate_legal_moves(), None, 0
+            )), None)
+        return SearchResult(best_move, score, depth, self.nodes, seconds,
+                            self.nodes / seconds if seconds else 0.0,
+                            principal_variation)
+
+    def _principal_variation(self, depth):
+        chess_rules = self.chess_rules
+        principal_variation = []
+        try:
+            while len(principal_variation) < depth:
+                entry = self.transposition_table.get(chess_rules.zobrist_key)
+                if entry is None:
+                    break
+                best_code = entry[3]
+                for move in chess_rules.generate_legal_moves():
+                    if _move_code(move) == best_code:
+                        break
+                else:
+                    break
+                principal_variation.append(move)
+                chess_rules.push(move)
+        finally:
+            for _ in principal_variation:
+                chess_rules.pop()
+        return principal_variation
+
+    def _count_node(self):
+        self.nodes += 1
+        if self._max_nodes is not None and self.nodes > self._max_nodes:
+            raise SearchAborted()
+        if (self._deadline is not None and not self.nodes & 1023 and
+            time.time() > self._deadline):
+            raise SearchAborted()
+
+    def _negamax(self, depth, alpha, beta, ply):
+        chess_rules = self.chess_rules
+        if ply and chess_rules.halfmove_clock >= 100:
+            return 0
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+        self._count_node()
+
+        key = chess_rules.zobrist_key
+        best_code = None
+        entry = self.transposition_table.get(key)
+        if entry is not None:
+            entry_depth, score, bound, best_code = entry
+            if ply and entry_depth >= depth:
+                score = _score_from_table(score, ply)
+                if (bound == EXACT or
+                    (bound == LOWER and score >= beta) or
+                    (bound == UPPER and score <= alpha)):
+                    return score
+
+        moves = chess_rules.generate_legal_moves()
+        if not moves:
+            if chess_rules.is_king_threatened(chess_rules.action):
+                return ply - MATE_SCORE
+            return 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        for move in self._order_moves(moves, best_code, ply):
+            code = _move_code(move)
+            is_quiet = move.taken_piece.is_empty and move.promotion is None
+            chess_rules.push(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                chess_rules.pop()
+            if score > best_score:
+                best_score = score
+                best_code = code
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                if is_quiet:
+                    self._add_killer(code, ply)
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition_table.set(
+            key, (depth, _score_to_table(best_score, ply), bound, best_code)
+        )
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        self._count_node()
+        chess_rules = self.chess_rules
+        stand_pat = evaluate(chess_rules)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        captures = [
+            move for move in chess_rules.generate_legal_moves()
+            if (not move.taken_piece.is_empty and move.promotion is None or
+                move.promotion is pieces.Queen)
+        ]
+        captures.sort(key=_capture_value, reverse=True)
+        for move in captures:
+            chess_rules.push(move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                chess_rules.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def _order_moves(self, moves, best_code, ply):
+        """Order the transposition table's move first, then captures by
+        MVV-LVA, then this ply's killer moves, then the rest."""
+        killers = self._killers[ply]
+
+        def priority(move):
+            code = _move_code(move)
+            if code == best_code:
+                return 3, 0
+            if not move.taken_piece.is_empty or move.promotion is not None:
+                return 2, _capture_value(move)
+            if code in killers:
+                return 1, -killers.index(code)
+            return 0, 0
+        return sorted(moves, key=priority, reverse=True)
+
+    def _add_killer(self, code, ply):
+        killers = self._killers[ply]
+        if code not in killers:
+            killers.insert(0, code)
+            del killers[2:]
+
+
+def _score_to_table(score, ply):
+    # Mate scores are stored relative to the node, not the root.
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def search(chess_rules, **limits):
+    """Search `chess_rules` with a fresh Search. See `Search.search`."""
+    return Search(chess_rules).search(**limits)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('fen', nargs='?', default=rules.ChessRules().to_fen())
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--nodes', type=int, default=None)
+    parser.add_argument('--seconds', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    def report(result):
+        print 'depth {0} score {1} nodes {2} nps {3:.0f} pv {4}'.format(
+            result.depth, result.score, result.nodes, result.nodes_per_second,
+            ' '.join(move.uci for move in result.principal_variation)
+        )
+    result = search(rules.ChessRules.from_fen(args.fen), max_depth=args.depth,
+                    max_nodes=args.nodes, max_seconds=args.seconds,
+                    on_iteration=report)
+    print 'bestmove {0}'.format(
+        result.best_move.uci if result.best_move is not None else '(none)'
+    )
+
+
+if __name__ == '__main__':
+    main()
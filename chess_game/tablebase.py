@@ -0,0 +1,699 @@
+"""Endgame tablebases computed by retrograde analysis.
+
+`generate` enumerates every position of a material signature such as
+``'KQK'`` (white's pieces, then black's, each starting with the king),
+and solves them all backwards from the checkmates, giving each position
+its distance to mate. `Tablebase.write` stores the result with one signed
+byte per position, and `Tablebase.open` memory-maps such a file, so that
+probes index straight into the shared, read-only pages.
+
+Positions are stored with white to have the material on the left of the
+signature; positions with the colors reversed are probed mirrored. Tables
+without pawns are reduced by the board's eight symmetries, and tables
+with pawns by its left-right symmetry. Castling and en-passant rights are
+not covered.
+
+Run ``python -m chess_game.tablebase KQK KRK KPK --directory DIR`` to
+generate tablebase files.
+"""
+from __future__ import absolute_import
+import argparse
+import array
+import collections
+import mmap
+import os
+import struct
+
+from . import common
+from . import pieces
+from . import tables
+
+
+WIN = 'win'
+DRAW = 'draw'
+LOSS = 'loss'
+
+TablebaseResult = collections.namedtuple('TablebaseResult',
+                                         ['outcome', 'plies'])
+
+# A stored value is 0 for a draw, n for a win in n plies and -(n + 1) for a
+# loss in n plies, from the point of view of the side to move.
+ILLEGAL = -128
+MAX_PLIES = 126
+
+_letters = 'KQRBNP'
+_white, _black = common.color.WHITE, common.color.BLACK
+
+
+def _value_to_result(value):
+    if value == ILLEGAL:
+        return None
+    if value == 0:
+        return TablebaseResult(DRAW, None)
+    if value > 0:
+        return TablebaseResult(WIN, value)
+    return TablebaseResult(LOSS, -value - 1)
+
+
+def _after_move(value):
+    """Turn the value of the position after a move, for the opponent, into
+    the value of the move for the side that makes it."""
+    if value > 0:
+        return -value - 2
+    if value < 0:
+        return -value
+    return 0
+
+
+def _preference(value):
+    # Quick wins, then draws, then slow losses.
+    if value > 0:
+        return 2, -value
+    if value == 0:
+        return 1, 0
+    return 0, -value
+
+
+def normalize_signature(signature):
+    """Return `signature` with each side's pieces in KQRBNP order."""
+    signature = signature.upper()
+    split = signature.index('K', 1)
+    return ''.join(
+        'K' + ''.join(sorted(side[1:], key=_letters.index))
+        for side in (signature[:split], signature[split:])
+    )
+
+
+def parse_signature(signature):
+    """Return the (piece class, color) of each piece of `signature`, in the
+    order tablebase indexes list their squares."""
+    signature = normalize_signature(signature)
+    split = signature.index('K', 1)
+    return tuple(
+        (pieces.Piece.get_piece_class(letter), color)
+        for letters, color in ((signature[:split], _white),
+                               (signature[split:], _black))
+        for letter in letters
+    )
+
+
+def _signature_of(piece_list):
+    return ''.join(
+        ''.join(sorted((piece_class.character.upper()
+                        for piece_class, piece_color, _ in piece_list
+                        if piece_color == color), key=_letters.index))
+        for color in (_white, _black)
+    )
+
+
+def _piece_order(piece):
+    piece_class, color, _ = piece
+    return color != _white, _letters.index(piece_class.character.upper())
+
+
+def _ordered_squares(piece_list):
+    # Order squares like parse_signature orders the pieces.
+    return tuple(square for _, _, square in sorted(piece_list,
+                                                   key=_piece_order))
+
+
+def _mirrored(piece_list):
+    return [(piece_class, color.opponent, square ^ 56)
+            for piece_class, color, square in piece_list]
+
+
+def is_trivial_draw(signature):
+    """Return whether no sequence of moves can mate with this material."""
+    split = signature.index('K', 1)
+    return all(len(side) <= 2 and set(side[1:]) <= set('BN')
+               for side in (signature[:split], signature[split:]))
+
+
+def _square_transforms(has_pawns):
+    def transform(flip_files, flip_ranks, transpose):
+        squares = []
+        for index in range(64):
+            rank_index, file_index = index >> 3, index & 7
+            if flip_files:
+                file_index = 7 - file_index
+            if flip_ranks:
+                rank_index = 7 - rank_index
+            if transpose:
+                rank_index, file_index = file_index, rank_index
+            squares.append(rank_index * 8 + file_index)
+        return tuple(squares)
+    if has_pawns:
+        return [transform(False, False, False), transform(True, False, False)]
+    return [transform(flip_files, flip_ranks, transpose)
+            for transpose in (False, True)
+            for flip_ranks in (False, True)
+            for flip_files in (False, True)]
+
+
+def _in_region(index, has_pawns):
+    rank_index, file_index = index >> 3, index & 7
+    if has_pawns:
+        return file_index < 4
+    return file_index < 4 and rank_index <= file_index
+
+
+class _Layout(object):
+    """Maps the positions of a signature to table indexes.
+
+    The white king is moved into a region (the a1-d1-d4 triangle, or the
+    a-d files with pawns) by a symmetry of the board, and the index is made
+    of its slot in that region, the other pieces' squares and the side to
+    move.
+    """
+
+    def __init__(self, signature):
+        self.signature = normalize_signature(signature)
+        self.pieces = parse_signature(self.signature)
+        self.has_pawns = any(piece_class is pieces.Pawn
+                             for piece_class, _ in self.pieces)
+        transforms = _square_transforms(self.has_pawns)
+        self.region = [index for index in range(64)
+                       if _in_region(index, self.has_pawns)]
+        self._slots = dict((index, slot)
+                           for slot, index in enumerate(self.region))
+        self._transforms = [
+            [transform for transform in transforms
+             if _in_region(transform[index], self.has_pawns)]
+            for index in range(64)
+        ]
+        self.size = len(self.region) * 64 ** (len(self.pieces) - 1) * 2
+
+    def canonical(self, squares):
+        transforms = self._transforms[squares[0]]
+        if len(transforms) == 1:
+            transform = transforms[0]
+            return tuple(transform[square] for square in squares)
+        # The king is on a line of symmetry, so pick the smallest image.
+        return min(tuple(transform[square] for square in squares)
+                   for transform in transforms)
+
+    def index(self, squares, black_to_move):
+        """Return the index of the canonical `squares`."""
+        index = self._slots[squares[0]]
+        for square in squares[1:]:
+            index = index * 64 + square
+        return index * 2 + black_to_move
+
+    def index_of(self, squares, black_to_move):
+        """Return the index of `squares`, canonical or not."""
+        transforms = self._transforms[squares[0]]
+        if len(transforms) != 1:
+            return self.index(self.canonical(squares), black_to_move)
+        transform = transforms[0]
+        index = self._slots[transform[squares[0]]]
+        for square in squares[1:]:
+            index = index * 64 + transform[square]
+        return index * 2 + black_to_move
+
+    def decode(self, index):
+        black_to_move = index & 1
+        index >>= 1
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            squares.append(index & 63)
+            index >>= 6
+        squares.append(self.region[index])
+        squares.reverse()
+        return squares, black_to_move
+
+
+def _square_indexes(table):
+    return [tuple(position.index for position in targets) for targets in table]
+
+
+_knight_targets = _square_indexes(tables.KNIGHT_TARGETS)
+_king_targets = _square_indexes(tables.KING_TARGETS)
+_pawn_attacks = dict((color, _square_indexes(tables.PAWN_ATTACKS[color]))
+                     for color in (_white, _black))
+_rays = dict((direction, _square_indexes(tables.SLIDING_RAYS[direction]))
+             for direction in tables.DIAGONALS + tables.STRAIGHTS)
+_slider_directions = {
+    pieces.Bishop: tables.DIAGONALS,
+    pieces.Rook: tables.STRAIGHTS,
+    pieces.Queen: tables.DIAGONALS + tables.STRAIGHTS,
+}
+_step_targets = {pieces.Knight: _knight_targets, pieces.King: _king_targets}
+
+
+def _attack_lines(piece_class, color):
+    """Return, for each source square, a dict mapping each square the piece
+    attacks on an empty board to the squares in between."""
+    if piece_class is pieces.Pawn:
+        return [dict((target, ()) for target in targets)
+                for targets in _pawn_attacks[color]]
+    if piece_class in _step_targets:
+        return [dict((target, ()) for target in targets)
+                for targets in _step_targets[piece_class]]
+    lines = []
+    for source in range(64):
+        line = {}
+        for direction in _slider_directions[piece_class]:
+            ray = _rays[direction][source]
+            for distance, target in enumerate(ray):
+                line[target] = ray[:distance]
+        lines.append(line)
+    return lines
+
+
+_lines = dict(
+    ((piece_class, color), _attack_lines(piece_class, color))
+    for piece_class in (pieces.King, pieces.Queen, pieces.Rook, pieces.Bishop,
+                        pieces.Knight, pieces.Pawn)
+    for color in (_white, _black)
+)
+
+
+def _attacks(piece_class, color, source, target, occupied):
+    between = _lines[piece_class, color][source].get(target)
+    if between is None:
+        return False
+    for square in between:
+        if square in occupied:
+            return False
+    return True
+
+
+def _moves(piece_class, color, source, occupied):
+    """Yield the squares a non-pawn piece moves to, including the first
+    occupied square of each line."""
+    if piece_class in _step_targets:
+        for square in _step_targets[piece_class][source]:
+            yield square
+        return
+    for direction in _slider_directions[piece_class]:
+        for square in _rays[direction][source]:
+            yield square
+            if square in occupied:
+                break
+
+
+def _unmoves(piece_class, color, source, occupied):
+    """Yield the empty squares a piece may have moved to `source` from."""
+    if piece_class is not pieces.Pawn:
+        for square in _moves(piece_class, color, source, occupied):
+            if square not in occupied:
+                yield square
+        return
+    # Count ranks from the pawn's own side of the board.
+    rank_index = source >> 3 if color == _white else 7 - (source >> 3)
+    back = -8 * color
+    if rank_index >= 2 and source + back not in occupied:
+        yield source + back
+        if rank_index == 3 and source + 2 * back not in occupied:
+            yield source + 2 * back
+
+
+class Tablebase(object):
+    """The values of every position of one material signature.
+
+    `values` is indexable by table index, or, for a file opened with
+    `open`, an mmap whose values start at `offset`.
+    """
+
+    _header = struct.Struct('<4s16sI')
+    _magic = 'CGTB'
+    _value = struct.Struct('b')
+
+    def __init__(self, signature, values, offset=None):
+        self.layout = _Layout(signature)
+        self.signature = self.layout.signature
+        self.values = values
+        self.offset = offset
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as tablebase_file:
+            data = mmap.mmap(tablebase_file.fileno(), 0,
+                             access=mmap.ACCESS_READ)
+        magic, signature, size = cls._header.unpack_from(data)
+        if magic != cls._magic:
+            raise ValueError('{0} is not a tablebase file'.format(path))
+        tablebase = cls(signature.rstrip('\0'), data, cls._header.size)
+        if size != tablebase.layout.size:
+            raise ValueError('{0} has the wrong size'.format(path))
+        return tablebase
+
+    def write(self, path):
+        with open(path, 'wb') as tablebase_file:
+            tablebase_file.write(self._header.pack(
+                self._magic, self.signature, self.layout.size
+            ))
+            array.array('b', self.values).tofile(tablebase_file)
+
+    def close(self):
+        if self.offset is not None:
+            self.values.close()
+
+    def value_at(self, index):
+        if self.offset is None:
+            return self.values[index]
+        return self._value.unpack_from(self.values, self.offset + index)[0]
+
+    def value(self, squares, black_to_move):
+        """Return the value of the position with `squares`, ordered like the
+        signature's pieces."""
+        return self.value_at(self.layout.index_of(squares, black_to_move))
+
+
+class TablebaseSet(object):
+    """The tablebases available for probing, loaded lazily from the files
+    named ``<signature>.cgtb`` in its directories."""
+
+    extension = '.cgtb'
+
+    def __init__(self, directories=()):
+        self.directories = list(directories)
+        self._tablebases = {}
+
+    def add_directory(self, directory):
+        self.directories.append(directory)
+
+    def add(self, tablebase):
+        self._tablebases[tablebase.signature] = tablebase
+
+    def get(self, signature):
+        signature = normalize_signature(signature)
+        if signature not in self._tablebases:
+            self._tablebases[signature] = None
+            for directory in self.directories:
+                path = os.path.join(directory, signature + self.extension)
+                if os.path.exists(path):
+                    self._tablebases[signature] = Tablebase.open(path)
+                    break
+        return self._tablebases[signature]
+
+    def probe_value(self, piece_list, black_to_move):
+        """Return the stored value of the position made of the (piece class,
+        color, square) triples in `piece_list`, or None if no tablebase
+        covers it."""
+        signature = _signature_of(piece_list)
+        if is_trivial_draw(signature):
+            return 0
+        tablebase = self.get(signature)
+        if tablebase is None:
+            piece_list = _mirrored(piece_list)
+            black_to_move = not black_to_move
+            tablebase = self.get(_signature_of(piece_list))
+            if tablebase is None:
+                return None
+        return tablebase.value(_ordered_squares(piece_list), black_to_move)
+
+    def probe(self, chess_rules):
+        """Return the TablebaseResult of `chess_rules`' position for the side
+        to move, or None if it isn't covered."""
+        if (any(chess_rules._castling_rights) or
+            _can_capture_enpassant(chess_rules)):
+            return None
+        piece_list = []
+        for index in range(64):
+            piece = chess_rules.get_piece_at_index(index)
+            if not piece.is_empty:
+                piece_list.append((type(piece), piece.color, index))
+        value = self.probe_value(piece_list,
+                                 chess_rules.action == common.color.BLACK)
+        if value is None:
+            return None
+        return _value_to_result(value)
+
+
+def _can_capture_enpassant(chess_rules):
+    """Return whether the side to move has a legal en-passant capture, which
+    the tablebases don't account for."""
+    enpassant_position = chess_rules.enpassant_position
+    if enpassant_position is None:
+        return False
+    color = chess_rules.action
+    capturers = tables.PAWN_ATTACKS[color.opponent][enpassant_position.index]
+    for position in capturers:
+        piece = chess_rules.get_piece_at_index(position.index)
+        if (isinstance(piece, pieces.Pawn) and piece.color == color and
+            enpassant_position in chess_rules.get_legal_moves(position)):
+            return True
+    return False
+
+
+# Used by ChessRules.probe_tablebase unless it is given other tablebases.
+default_tablebases = TablebaseSet()
+
+
+def _sub_signatures(signature):
+    """Return the signatures a capture or promotion leads to."""
+    piece_list = [(piece_class, color, None)
+                  for piece_class, color in parse_signature(signature)]
+    sub_signatures = set()
+    for position, (piece_class, color, _) in enumerate(piece_list):
+        others = piece_list[:position] + piece_list[position + 1:]
+        if piece_class is not pieces.King:
+            sub_signatures.add(_signature_of(others))
+        if piece_class is pieces.Pawn:
+            for promotion_class in pieces.promotion_classes:
+                sub_signatures.add(_signature_of(
+                    others + [(promotion_class, color, None)]
+                ))
+    return sub_signatures
+
+
+def generate(signature, tablebases=None):
+    """Solve every position of `signature` and return its Tablebase.
+
+    Positions reached by captures and promotions are looked up in
+    `tablebases`, and missing ones are generated and added to it first.
+    """
+    if tablebases is None:
+        tablebases = TablebaseSet()
+    signature = normalize_signature(signature)
+    for sub_signature in _sub_signatures(signature):
+        if (not is_trivial_draw(sub_signature) and
+            tablebases.get(sub_signature) is None and
+            tablebases.get(_signature_of(_mirrored([
+                (piece_class, color, 0)
+                for piece_class, color in parse_signature(sub_signature)
+            ]))) is None):
+            tablebases.add(generate(sub_signature, tablebases))
+    return _Generator(signature, tablebases).run()
+
+
+class _Generator(object):
+
+    def __init__(self, signature, tablebases):
+        self.layout = _Layout(signature)
+        self.pieces = self.layout.pieces
+        self.tablebases = tablebases
+        self.king_of = {
+            _white: self.pieces.index((pieces.King, _white)),
+            _black: self.pieces.index((pieces.King, _black)),
+        }
+
+    def run(self):
+        layout = self.layout
+        size = layout.size
+        values = array.array('b', [ILLEGAL]) * size
+        resolved = bytearray(size)
+        counts = array.array('H', [0]) * size
+        # Best value among the moves that leave the table.
+        external = {}
+        buckets = collections.defaultdict(list)
+
+        for index in xrange(size):
+            squares, black_to_move = layout.decode(index)
+            if not self._is_valid(index, squares, black_to_move):
+                resolved[index] = 1
+                continue
+            successors, best_external, has_moves = self._successors(
+                squares, black_to_move
+            )
+            values[index] = 0
+            counts[index] = len(successors)
+            if best_external is not None:
+                external[index] = best_external
+            if not has_moves:
+                color = _black if black_to_move else _white
+                if self._in_check(squares, color):
+                    buckets[0].append((index, -1))
+                else:
+                    resolved[index] = 1
+            elif not successors:
+                if best_external == 0:
+                    resolved[index] = 1
+                else:
+                    buckets[self._plies(best_external)].append(
+                        (index, best_external)
+                    )
+            elif best_external is not None and best_external > 0:
+                buckets[best_external].append((index, best_external))
+
+        plies = 0
+        while plies <= max(buckets or [0]):
+            for index, value in buckets.pop(plies, ()):
+                if resolved[index]:
+                    continue
+                resolved[index] = 1
+                values[index] = value
+                if plies + 1 > MAX_PLIES:
+                    continue
+                for predecessor in self._predecessors(index):
+                    if resolved[predecessor]:
+                        continue
+                    if value < 0:
+                        buckets[plies + 1].append((predecessor, plies + 1))
+                        continue
+                    counts[predecessor] -= 1
+                    if counts[predecessor]:
+                        continue
+                    best_external = external.get(predecessor)
+                    if best_external is None or best_external < 0:
+                        loss_plies = plies + 1
+                        if best_external is not None:
+                            loss_plies = max(loss_plies,
+                                             self._plies(best_external))
+                        buckets[loss_plies].append(
+                            (predecessor, -loss_plies - 1)
+                        )
+            plies += 1
+        return Tablebase(layout.signature, values)
+
+    @staticmethod
+    def _plies(value):
+        return value if value > 0 else -value - 1
+
+    def _is_valid(self, index, squares, black_to_move):
+        if len(set(squares)) != len(squares):
+            return False
+        for (piece_class, _), square in zip(self.pieces, squares):
+            if piece_class is pieces.Pawn and square >> 3 in (0, 7):
+                return False
+        if self.layout.index_of(squares, black_to_move) != index:
+            # Another index holds the position, seen by a symmetry.
+            return False
+        # The side that just moved can't have left its king in check.
+        return not self._in_check(squares,
+                                  _white if black_to_move else _black)
+
+    def _in_check(self, squares, color, captured=None):
+        king_square = squares[self.king_of[color]]
+        occupied = set(squares)
+        return any(
+            _attacks(piece_class, piece_color, square, king_square, occupied)
+            for position, ((piece_class, piece_color), square)
+            in enumerate(zip(self.pieces, squares))
+            if piece_color != color and position != captured
+        )
+
+    def _successors(self, squares, black_to_move):
+        """Return the indexes of the positions the legal moves lead to
+        within the table, the best value of the moves that leave it and
+        whether there are any legal moves."""
+        color = _black if black_to_move else _white
+        occupied = dict((square, position)
+                        for position, square in enumerate(squares))
+        successors = set()
+        best_external = None
+        has_moves = False
+        for position, (piece_class, piece_color) in enumerate(self.pieces):
+            if piece_color != color:
+                continue
+            source = squares[position]
+            for destination, promotions in self._piece_moves(
+                piece_class, color, source, occupied
+            ):
+                captured = occupied.get(destination)
+                if captured is not None and self.pieces[captured][1] == color:
+                    continue
+                new_squares = list(squares)
+                new_squares[position] = destination
+                if self._in_check(new_squares, color, captured):
+                    continue
+                has_moves = True
+                if captured is None and not promotions:
+                    successors.add(self.layout.index_of(new_squares,
+                                                       not black_to_move))
+                    continue
+                for promotion_class in promotions or (piece_class,):
+                    piece_list = [
+                        (promotion_class if other == position else
+                         other_class, other_color, square)
+                        for other, ((other_class, other_color), square)
+                        in enumerate(zip(self.pieces, new_squares))
+                        if other != captured
+                    ]
+                    value = self.tablebases.probe_value(piece_list,
+                                                        not black_to_move)
+                    if value is None:
+                        raise ValueError('No tablebase for {0}'.format(
+                            _signature_of(piece_list)
+                        ))
+                    value = _after_move(value)
+                    if (best_external is None or
+                        _preference(value) > _preference(best_external)):
+                        best_external = value
+        return successors, best_external, has_moves
+
+    @staticmethod
+    def _piece_moves(piece_class, color, source, occupied):
+        """Yield (destination, promotion classes) pairs."""
+        if piece_class is not pieces.Pawn:
+            for destination in _moves(piece_class, color, source, occupied):
+                yield destination, ()
+            return
+        last_rank = 7 if color == _white else 0
+        destinations = [
+            square for square in _pawn_attacks[color][source]
+            if square in occupied
+        ]
+        push = source + 8 * color
+        if push not in occupied:
+            destinations.append(push)
+            double_push = push + 8 * color
+            if (source >> 3 == (1 if color == _white else 6) and
+                double_push not in occupied):
+                destinations.append(double_push)
+        for destination in destinations:
+            yield destination, (pieces.promotion_classes
+                                if destination >> 3 == last_rank else ())
+
+    def _predecessors(self, index):
+        squares, black_to_move = self.layout.decode(index)
+        # The side that is not to move made the last move.
+        color = _white if black_to_move else _black
+        occupied = set(squares)
+        predecessors = set()
+        for position, (piece_class, piece_color) in enumerate(self.pieces):
+            if piece_color != color:
+                continue
+            for source in _unmoves(piece_class, color, squares[position],
+                                   occupied):
+                new_squares = list(squares)
+                new_squares[position] = source
+                # Positions with the side to move in check were resolved as
+                # illegal, so they needn't be filtered out here.
+                predecessors.add(self.layout.index_of(new_squares,
+                                                   not black_to_move))
+        return predecessors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('signatures', nargs='+')
+    parser.add_argument('--directory', default='.')
+    args = parser.parse_args(argv)
+
+    tablebases = TablebaseSet([args.directory])
+    for signature in args.signatures:
+        signature = normalize_signature(signature)
+        if tablebases.get(signature) is not None:
+            print '{0}: already generated'.format(signature)
+            continue
+        tablebase = generate(signature, tablebases)
+        path = os.path.join(args.directory, signature + TablebaseSet.extension)
+        tablebase.write(path)
+        tablebases.add(Tablebase.open(path))
+        print '{0}: written to {1}'.format(signature, path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Per-square target and ray tables, computed once at import time.
+
+Every table is indexed by ``Position.index`` and holds ``Position``
+objects, so move generation can walk them without ever stepping off the
+board.
+"""
+from __future__ import absolute_import
+
+from . import common
+from .position import Position
+
+
+DIAGONALS = ((-1, 1), (1, -1), (1, 1), (-1, -1))
+STRAIGHTS = ((1,  0), (-1, 0), (0, 1), (0,  -1))
+KNIGHT_OFFSETS = ((1,  2), (2,  1), (-1,  2), (-2,  1),
+                  (1, -2), (2, -1), (-1, -2), (-2, -1))
+
+
+def _build_ray(index, rank_direction, file_direction, limit=None):
+    rank_index, file_index = index >> 3, index & 7
+    ray = []
+    while limit is None or len(ray) < limit:
+        rank_index += rank_direction
+        file_index += file_direction
+        if not (0 <= rank_index < 8 and 0 <= file_index < 8):
+            break
+        ray.append(Position(rank_index * 8 + file_index))
+    return tuple(ray)
+
+
+def build_ray_table(directions, limit=None):
+    """Return, for every square, one ray per direction in `directions`.
+
+    Each ray is a tuple of positions ordered outward from the square and
+    truncated at the board edge (or after `limit` steps).
+    """
+    return [
+        tuple(_build_ray(index, rank_direction, file_direction, limit)
+              for rank_direction, file_direction in directions)
+        for index in range(64)
+    ]
+
+
+def build_target_table(offsets):
+    """Return, for every square, the flat list of squares reached by one step
+    along each of `offsets`."""
+    return [
+        tuple(ray[0] for ray in rays if ray)
+        for rays in build_ray_table(offsets, limit=1)
+    ]
+
+
+def _build_pawn_attacks(color):
+    return build_target_table(((color, -1), (color, 1)))
+
+
+def _build_pawn_pushes(color):
+    start_rank_index = 1 if color == common.color.WHITE else 6
+    return [
+        _build_ray(index, color, 0,
+                   limit=2 if index >> 3 == start_rank_index else 1)
+        for index in range(64)
+    ]
+
+
+SLIDING_RAYS = dict(
+    (direction, [rays[0] for rays in build_ray_table((direction,))])
+    for direction in DIAGONALS + STRAIGHTS
+)
+KNIGHT_TARGETS = build_target_table(KNIGHT_OFFSETS)
+KING_TARGETS = build_target_table(DIAGONALS + STRAIGHTS)
+PAWN_ATTACKS = {
+    common.color.WHITE: _build_pawn_attacks(common.color.WHITE),
+    common.color.BLACK: _build_pawn_attacks(common.color.BLACK),
+}
+PAWN_PUSHES = {
+    common.color.WHITE: _build_pawn_pushes(common.color.WHITE),
+    common.color.BLACK: _build_pawn_pushes(common.color.BLACK),
+}
+
+
+def build_sliding_ray_table(directions):
+    """Return, for every square, the full rays along `directions`, sharing the
+    tuples in `SLIDING_RAYS`."""
+    return [
+        tuple(SLIDING_RAYS[direction][index] for direction in directions)
+        for index in range(64)
+    ]
@@ -0,0 +1,82 @@
+"""64-bit Zobrist keys for ChessRules positions.
+
+A position's key is the xor of one random number per (piece, square) pair
+on the board, plus numbers for black to move, each castling right that is
+still available and the file of the en-passant square, when a pawn can
+capture there. Keys are seeded
+deterministically, so they are stable across processes.
+"""
+from __future__ import absolute_import
+import itertools
+import operator
+import random
+
+from . import common
+from . import pieces
+from . import tables
+
+
+_random = random.Random(0x2f3a9e1c)
+
+
+def _random_keys(count):
+    return [_random.getrandbits(64) for _ in range(count)]
+
+
+_colors = (common.color.WHITE, common.color.BLACK)
+
+PIECE_KEYS = dict(
+    ((character, color), _random_keys(64))
+    for character in 'pnbrqk' for color in _colors
+)
+BLACK_TO_MOVE_KEY = _random_keys(1)[0]
+ENPASSANT_FILE_KEYS = _random_keys(8)
+# Ordered like ChessRules._castling_rights: white kingside, white
+# queenside, black kingside, black queenside.
+_castling_right_keys = _random_keys(4)
+CASTLING_KEYS = dict(
+    (castling_rights, reduce(
+        operator.xor,
+        [right_key for available, right_key
+         in zip(castling_rights, _castling_right_keys) if available],
+        0
+    ))
+    for castling_rights in itertools.product((False, True), repeat=4)
+)
+
+
+def piece_key(piece, index):
+    if piece.is_empty:
+        return 0
+    return PIECE_KEYS[piece.character, piece.color][index]
+
+
+def side_key(color):
+    return BLACK_TO_MOVE_KEY if color == common.color.BLACK else 0
+
+
+def enpassant_key(enpassant_position, chess_board):
+    """Return the key of the en-passant square, which only counts when a pawn
+    on `chess_board` stands ready to capture there, so that positions that
+    differ only by an unusable en-passant square share a key."""
+    if enpassant_position is None:
+        return 0
+    capturing_color = (common.color.BLACK if enpassant_position.rank_index == 2
+                       else common.color.WHITE)
+    for position in tables.PAWN_ATTACKS[capturing_color.opponent][
+        enpassant_position.index
+    ]:
+        piece = chess_board.get_piece_at_index(position.index)
+        if isinstance(piece, pieces.Pawn) and piece.color == capturing_color:
+            return ENPASSANT_FILE_KEYS[enpassant_position.file_index]
+    return 0
+
+
+def compute_key(chess_rules):
+    """Compute the key of `chess_rules` from scratch."""
+    key = side_key(chess_rules.action)
+    key ^= CASTLING_KEYS[chess_rules._castling_rights]
+    key ^= enpassant_key(chess_rules.enpassant_position, chess_rules._board)
+    for index in range(64):
+        key ^= piece_key(chess_rules._board.get_piece_at_index(index), index)
+    return key
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import pytest
+
+from chess_game import ChessGame, archive, move, pgn
+from chess_game.position import Position
+
+
+PGN_TEXT = '''[Event "First"]
+[White "Alice"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. O-O Be7 5. d4 exd4 1-0
+
+[Event "Broken"]
+[Result "*"]
+
+1. e4 e5 2. Ke3 *
+
+[Event "Third"]
+[Result "0-1"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+
+[Event "Pinned"]
+[Result "*"]
+
+1. e4 e5 2. d4 Bb4+ 3. Nc3 Nc6 4. Ne2 *
+'''
+
+
+@pytest.fixture
+def archive_path(tmpdir):
+    pgn_path = tmpdir.join('games.pgn')
+    pgn_path.write(PGN_TEXT)
+    path = str(tmpdir.join('games.cgga'))
+    assert archive.convert_pgn([str(pgn_path)], path) == (3, 1)
+    return path
+
+def test_read_games(archive_path):
+    with archive.GameArchive(archive_path) as games:
+        assert len(games) == 3
+        first, third, pinned = list(games)
+        assert first.tags == {'Event': 'First', 'White': 'Alice',
+                              'Result': '1-0'}
+        assert first.result == '1-0'
+        assert len(first.codes) == 10
+        assert third.result == '0-1'
+        assert games[1] == third
+        # 'Ne2' needs no disambiguation, as the knight on c3 is pinned.
+        assert len(pinned.codes) == 7
+        assert games[-1] == pinned
+        with pytest.raises(IndexError):
+            games[3]
+
+def test_replay_matches_san(archive_path):
+    with archive.GameArchive(archive_path) as games:
+        for number, san_game in enumerate([0, 2, 3]):
+            game = ChessGame()
+            for algebraic_move in list(pgn.iterate_games(PGN_TEXT))[
+                san_game
+            ].moves:
+                game.make_move_from_algebraic(algebraic_move)
+            assert games.replay(number).to_fen() == game.fen()
+
+def test_replay_part_of_a_game(archive_path):
+    with archive.GameArchive(archive_path) as games:
+        chess_rules = games.replay(0, plies=7)
+        assert chess_rules.to_fen() == (
+            'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQ1RK1 b kq - 5 4'
+        )
+        assert len(chess_rules.moves) == 7
+
+def test_castling_is_replayed(archive_path):
+    with archive.GameArchive(archive_path) as games:
+        assert games.replay(0, plies=7).moves[-1].uci == 'e1g1'
+
+def test_write_codes(tmpdir):
+    path = str(tmpdir.join('codes.cgga'))
+    codes = [move.encode_move(Position.make('e2'), Position.make('e4'))]
+    with archive.ArchiveWriter(path) as writer:
+        writer.add_game(codes)
+    with archive.GameArchive(path) as games:
+        game = games[0]
+        assert (game.tags, game.result, list(game.codes)) == ({}, '*', codes)
+        assert games.replay(0)[Position.make('e4')].character == 'p'
+
+def test_offset_table_is_64_bit_little_endian(archive_path):
+    with open(archive_path, 'rb') as archive_file:
+        data = archive_file.read()
+    _, _, count, table_offset = struct.unpack_from('<4sIQQ', data)
+    assert len(data) == table_offset + 8 * count
+    offsets = struct.unpack_from('<{0}Q'.format(count), data, table_offset)
+    assert offsets[0] == struct.calcsize('<4sIQQ')
+    with archive.GameArchive(archive_path) as games:
+        assert [games._game_offset(number)
+                for number in range(count)] == list(offsets)
+
+def test_convert_pgn_raises_bugs(monkeypatch, tmpdir):
+    def broken_add_game(self, codes, result='*', tags=None):
+        raise ZeroDivisionError()
+    monkeypatch.setattr(archive.ArchiveWriter, 'add_game', broken_add_game)
+    pgn_path = tmpdir.join('games.pgn')
+    pgn_path.write(PGN_TEXT)
+    with pytest.raises(ZeroDivisionError):
+        archive.convert_pgn([str(pgn_path)], str(tmpdir.join('games.cgga')))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import common, pieces, rules
+from chess_game.bitboard import BitboardChessBoard
+from chess_game.board import BasicChessBoard
+from chess_game.position import ALL_POSITIONS, Position
+
+
+@pytest.fixture
+def chess_board():
+    return BitboardChessBoard()
+
+@pytest.fixture
+def chess_rules(chess_board):
+    return rules.ChessRules(chess_board)
+
+def test_set_piece_updates_bitboards(chess_board):
+    assert chess_board.piece_bitboard(pieces.Pawn, common.color.WHITE) == 0xff00
+    chess_board.make_move('e2', 'e4')
+    assert chess_board['e4'] == pieces.Pawn(common.color.WHITE)
+    assert chess_board['e2'].is_empty
+    assert chess_board.piece_bitboard(pieces.Pawn, common.color.WHITE) == \
+        0xff00 & ~(1 << 12) | (1 << 28)
+    chess_board['e4'] = pieces.Empty
+    assert chess_board.occupancy(common.color.WHITE) == 0xffff & ~(1 << 12)
+
+def test_is_square_threatened(chess_rules):
+    assert chess_rules.is_square_threatened('f3', by_color=common.color.WHITE)
+    assert not chess_rules.is_square_threatened('e4', by_color=common.color.WHITE)
+    assert chess_rules.is_square_threatened('f6', by_color=common.color.BLACK)
+
+    chess_rules['e2'] = pieces.Empty
+    chess_rules['e5'] = pieces.Rook(common.color.BLACK)
+    assert chess_rules.is_square_threatened('e1', by_color=common.color.BLACK)
+    chess_rules['e3'] = pieces.Knight(common.color.WHITE)
+    assert not chess_rules.is_square_threatened('e1', by_color=common.color.BLACK)
+
+@pytest.mark.parametrize('board_class', [BasicChessBoard, BitboardChessBoard])
+@pytest.mark.parametrize('fen', [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+])
+def test_get_all_threatened_squares(board_class, fen):
+    chess_rules = rules.ChessRules.from_fen(fen, board_class)
+    for color in (common.color.WHITE, common.color.BLACK):
+        threatened = chess_rules.get_all_threatened_squares(color)
+        assert threatened == set(
+            destination for position in ALL_POSITIONS
+            if chess_rules[position].color == color
+            for destination in
+            chess_rules[position].get_all_threatened_moves(position,
+                                                           chess_rules)
+        )
+
+@pytest.mark.parametrize('board_class', [BasicChessBoard, BitboardChessBoard])
+def test_threatened_squares_are_move_destinations(board_class):
+    chess_rules = rules.ChessRules(board_class())
+    assert chess_rules.get_all_threatened_squares(common.color.WHITE) == set(
+        [Position.make((rank_index, file_index))
+         for rank_index in (2, 3) for file_index in range(8)]
+    )
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import board, common, notation, pieces, rules, zobrist
+from chess_game.bitboard import BitboardChessBoard
+
+
+queen = pieces.Queen(common.color.WHITE)
+
+
+@pytest.mark.parametrize('board_class', [board.BasicChessBoard,
+                                         BitboardChessBoard])
+def test_snapshots_are_independent(board_class):
+    chess_board = board_class()
+    snapshot = chess_board.snapshot()
+    assert type(snapshot) is board_class
+    chess_board['e4'] = queen
+    assert snapshot['e4'] is pieces.Empty
+    snapshot['d4'] = queen
+    assert chess_board['d4'] is pieces.Empty
+    assert chess_board['e4'] is queen
+
+def test_basic_snapshots_copy_on_write():
+    chess_board = board.BasicChessBoard()
+    snapshot = chess_board.snapshot()
+    assert snapshot._board is chess_board._board
+    snapshot['e4'] = queen
+    assert snapshot._board is not chess_board._board
+
+def test_delta_chains_are_flattened():
+    chess_board = board.BasicChessBoard()
+    delta_board = chess_board
+    for index in range(10):
+        delta_board = board.DeltaChessBoard(delta_board, max_chain_length=3)
+        delta_board.set_piece_at_index(16 + index, queen)
+        assert delta_board.chain_length <= 3
+    for index in range(10):
+        assert delta_board.get_piece_at_index(16 + index) is queen
+    assert chess_board['a3'] is pieces.Empty
+
+    flattened = delta_board.snapshot()
+    assert flattened.chain_length == 0
+    assert [flattened.get_piece_at_index(index) for index in range(64)] == \
+        [delta_board.get_piece_at_index(index) for index in range(64)]
+
+def test_rules_snapshot():
+    chess_rules = rules.ChessRules()
+    notation_processor = notation.ChessNotationProcessor(chess_rules)
+    for algebraic_move in ['e4', 'e5', 'Ke2']:
+        chess_rules.make_legal_move(
+            notation_processor.parse_algebraic_move(algebraic_move)
+        )
+    snapshot = chess_rules.snapshot()
+    fen = chess_rules.to_fen()
+    assert snapshot.to_fen() == fen
+    assert len(snapshot.moves) == 0
+    assert snapshot.zobrist_key == chess_rules.zobrist_key
+
+    snapshot.push(notation.ChessNotationProcessor(snapshot)
+                  .parse_algebraic_move('Nf6'))
+    assert snapshot.zobrist_key == zobrist.compute_key(snapshot)
+    assert chess_rules.to_fen() == fen
+    chess_rules.pop()
+    assert snapshot['e2'] is pieces.King(common.color.WHITE)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from chess_game import ChessGame
+from chess_game.cache import PositionCache
+
+
+def test_lru_eviction_and_counters():
+    position_cache = PositionCache(max_entries=2)
+    position_cache.set('a', 1)
+    position_cache.set('b', 2)
+    assert position_cache.get('a') == 1
+    position_cache.set('c', 3)
+    assert 'b' not in position_cache
+    assert position_cache.get('b') is None
+    assert position_cache.stats == {
+        'entries': 2, 'bytes': 0, 'hits': 1, 'misses': 1, 'evictions': 1
+    }
+
+def test_memory_bound():
+    position_cache = PositionCache(max_bytes=100, sizeof=lambda value: 10)
+    for key in range(10):
+        position_cache.set(key, key)
+    assert len(position_cache) == 5
+    assert position_cache.size_in_bytes == 100
+    position_cache.set(9, 'replaced')
+    assert position_cache.size_in_bytes == 100
+    assert position_cache.evictions == 5
+
+def test_replayed_games_hit_the_cache():
+    position_cache = PositionCache()
+    opening = ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6', 'Ba4', 'Nf6', 'O-O']
+    results = []
+    misses = []
+    for _ in range(2):
+        chess_game = ChessGame(position_cache=position_cache)
+        results.append([chess_game.make_move_from_algebraic(move).algebraic
+                        for move in opening])
+        misses.append(position_cache.misses)
+    assert results[0] == results[1] == opening
+    # The second replay is answered entirely from the cache.
+    assert misses[0] == misses[1]
+    assert position_cache.hits > 0
+    assert chess_game._rules.in_checkmate is False
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import ChessGame, common, perft, pieces, zobrist
+from chess_game.bitboard import BitboardChessBoard
+from chess_game.board import BasicChessBoard
+from chess_game.rules import ChessRules
+
+
+INITIAL_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+@pytest.mark.parametrize('board_class', [BasicChessBoard, BitboardChessBoard])
+def test_round_trip(board_class):
+    for perft_position in perft.STANDARD_POSITIONS:
+        chess_rules = ChessRules.from_fen(perft_position.fen, board_class)
+        assert chess_rules.to_fen() == perft_position.fen
+
+def test_matches_initial_position():
+    chess_rules = ChessRules.from_fen(INITIAL_FEN)
+    initial_rules = ChessRules()
+    assert [chess_rules[index] for index in range(64)] == \
+        [initial_rules[index] for index in range(64)]
+    assert chess_rules.king_position == initial_rules.king_position
+    assert chess_rules.zobrist_key == initial_rules.zobrist_key
+    assert initial_rules.to_fen() == INITIAL_FEN
+
+def test_state_is_loaded():
+    chess_rules = ChessRules.from_fen(
+        'r3k2r/8/8/3pP3/8/8/8/4K2R w Kq d6 3 20'
+    )
+    assert chess_rules.action == common.color.WHITE
+    assert chess_rules._castling_rights == (True, False, False, True)
+    assert chess_rules.enpassant_position.algebraic == 'd6'
+    assert chess_rules.halfmove_clock == 3
+    assert chess_rules.fullmove_number == 20
+    assert chess_rules.king_position[common.color.BLACK].algebraic == 'e8'
+    assert chess_rules['e5'] == pieces.Pawn(common.color.WHITE)
+    assert 'd6' in [position.algebraic for position in chess_rules.get_legal_moves('e5')]
+    assert chess_rules.zobrist_key == zobrist.compute_key(chess_rules)
+
+def test_clocks_follow_moves():
+    chess_game = ChessGame()
+    for algebraic_move in ['e4', 'Nf6', 'Nc3']:
+        chess_game.make_move_from_algebraic(algebraic_move)
+    assert chess_game.fen() == \
+        'rnbqkb1r/pppppppp/5n2/8/4P3/2N5/PPPP1PPP/R1BQKBNR b KQkq - 2 2'
+    chess_game._rules.pop()
+    assert chess_game.fen() == \
+        'rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2'
+
+def test_game_from_fen():
+    chess_game = ChessGame(fen='4k3/8/8/8/8/8/4P3/4K3 w - - 0 1')
+    assert chess_game.make_move_from_algebraic('e4').uci == 'e2e4'
+    assert chess_game.fen() == '4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1'
+
+@pytest.mark.parametrize('fen', [
+    '',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq z9 0 1',
+    'rnbqxbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+])
+def test_invalid_fen(fen):
+    with pytest.raises(common.InvalidNotationError):
+        ChessRules.from_fen(fen)
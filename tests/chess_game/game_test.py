@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from chess_game import ChessGame
+from chess_game import ChessGame, common, game
+from chess_game.bitboard import BitboardChessBoard
+from chess_game.board import BasicChessBoard
+from chess_game.rules import ChessRules
 
 
-@pytest.fixture
-def chess_game():
-    return ChessGame()
+@pytest.fixture(params=[BasicChessBoard, BitboardChessBoard])
+def chess_game(request):
+    return ChessGame(board_class=request.param)
 
 def play_moves(chess_game, moves, debug=False):
     for move in moves:
@@ -36,3 +39,113 @@ def test_moves4(chess_game):
 def test_moves5(chess_game):
     """Makes sure that complicated checkmates are detected."""
     play_moves(chess_game, ['e4', 'e5', 'Nf3', 'Nf6', 'Nxe5', 'Qe7', 'Nf3', 'Nxe4', 'Be2', 'Qd6', 'O-O', 'Be7', 'b3', 'Bf6', 'Ba3', 'Qb6', 'c3', 'd6', 'Bd3', 'Nc5', 'Re1+', 'Be6', 'Bf5', 'O-O', 'Bxc5', 'Qxc5', 'Bxe6', 'fxe6', 'Rxe6', 'Nd7', 'b4', 'Qd5', 'Re1', 'Rae8', 'Na3', 'Ne5', 'Nxe5', 'Bxe5', 'Qb3', 'Qxb3', 'axb3', 'a6', 'Nc4', 'b5', 'Nxe5', 'Rxe5', 'Rxe5', 'dxe5', 'Rxa6', 'Rd8', 'Ra2', 'Rd3', 'Kf1', 'e4', 'Ke2', 'Rd5', 'Ke3', 'Re5', 'Ra7', 'c6', 'g3', 'Re6', 'Ra1', 'h6', 'Re1', 'Kf7', 'Kd4', 'Rd6+', 'Ke3', 'Re6', 'Re2', 'Kf6', 'Kd4', 'Kf5', 'Kc5', 'g5', 'h3', 'h5', 'Kd4', 'g4', 'h4', 'Rd6+', 'Ke3', 'Rd3#'])
+
+
+UCI_GAME = 'e2e4e7e5g1f3b8c6f1c4g8f6e1g1f6e4d2d3e4f6c4f7e8f7f3g5f7g8d1f3d8e7b1c3c6d4g5f7'
+
+
+@pytest.mark.parametrize('validation', [game.TRUSTED, game.UNCHECKED])
+def test_fast_uci_replay_matches_strict(validation):
+    strict_game = ChessGame()
+    strict_game.make_moves_from_long_uci_string(UCI_GAME)
+    fast_game = ChessGame()
+    assert fast_game.make_moves_from_long_uci_string(
+        UCI_GAME, validation=validation
+    ) == strict_game.fen()
+
+    recording_game = ChessGame()
+    zobrist_keys = recording_game.make_moves_from_long_uci_string(
+        UCI_GAME, validation=validation, record=True
+    )
+    assert len(zobrist_keys) == len(UCI_GAME) / 4
+    assert zobrist_keys[-1] == strict_game._rules.zobrist_key
+
+
+@pytest.mark.parametrize('long_uci_string', [
+    'e2e5',
+    'e7e5',
+    'e2e4f7f5e1e2f5e4e2e3d8h4e3e4',
+    'g1f3b7b6e2e4c8a6g2g3a7a5f1h3a5a4e1g1',
+])
+def test_trusted_uci_replay_rejects_illegal_moves(long_uci_string):
+    chess_game = ChessGame()
+    with pytest.raises(common.IllegalMoveError):
+        chess_game.make_moves_from_long_uci_string(long_uci_string,
+                                                   validation=game.TRUSTED)
+
+
+@pytest.mark.parametrize('fen', ['5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+                                 '4k2r/8/8/8/8/8/8/5K2 b k - 0 1'])
+def test_castling_through_check_is_illegal(fen):
+    chess_game = ChessGame(fen=fen)
+    king_position = 'e1' if ' w ' in fen else 'e8'
+    assert len(chess_game._rules.get_legal_moves(king_position)) == 6
+    attacked_fen = fen.replace('5k2', '4kr2').replace('5K2', '4KR2')
+    chess_game = ChessGame(fen=attacked_fen)
+    assert 'g' not in ''.join(
+        position.algebraic[0]
+        for position in chess_game._rules.get_legal_moves(king_position)
+    )
+
+def test_goto(chess_game):
+    moves = ['e4', 'e5', 'Nf3', 'Nc6', 'Bc4', 'Nf6', 'O-O', 'Be7', 'd4', 'exd4']
+    fens = [chess_game.fen()]
+    for move in moves:
+        chess_game.make_move_from_algebraic(move)
+        fens.append(chess_game.fen())
+    for ply in [3, 0, 10, 7, 1, 8, 10, 2]:
+        chess_game.goto(ply)
+        assert chess_game.ply == ply
+        assert chess_game.fen() == fens[ply]
+    chess_game.step_forward()
+    chess_game.step_backward()
+    chess_game.step_backward()
+    assert chess_game.fen() == fens[1]
+    assert chess_game.plies == 10
+    with pytest.raises(IndexError):
+        chess_game.goto(11)
+
+def test_goto_uses_checkpoints(monkeypatch):
+    chess_game = ChessGame(checkpoint_interval=4)
+    for move in ['e4', 'e5', 'Nf3', 'Nc6', 'Bc4', 'Nf6', 'O-O', 'Be7', 'd4']:
+        chess_game.make_move_from_algebraic(move)
+    chess_game.goto(0)
+    pushes = []
+    push = ChessRules.push
+    def counting_push(chess_rules, move):
+        pushes.append(move)
+        return push(chess_rules, move)
+    monkeypatch.setattr(ChessRules, 'push', counting_push)
+    chess_game.goto(9)
+    assert len(pushes) == 1
+    chess_game.goto(6)
+    assert len(pushes) == 3
+
+def test_goto_keeps_lazy_moves_on_their_line():
+    chess_game = ChessGame(lazy_finalization=True)
+    moves = ['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6', 'Qxf7#']
+    finalized_moves = [chess_game.make_move_from_algebraic(move)
+                       for move in moves]
+    chess_game.goto(5)
+    assert finalized_moves[-1].algebraic == 'Qxf7#'
+    chess_game.goto(6)
+    finalized_move = chess_game.make_move_from_algebraic('Bxf7+')
+    chess_game.goto(2)
+    chess_game.goto(7)
+    assert [move.algebraic for move in finalized_moves] == moves
+    assert finalized_move.algebraic == 'Bxf7+'
+    assert chess_game.fen() == (
+        'r1bqkb1r/pppp1Bpp/2n2n2/4p2Q/4P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4'
+    )
+
+def test_moves_after_goto_start_a_new_line(chess_game):
+    for move in ['e4', 'e5', 'Nf3', 'Nc6']:
+        chess_game.make_move_from_algebraic(move)
+    chess_game.goto(2)
+    chess_game.make_move_from_algebraic('Bc4')
+    assert chess_game.plies == 3
+    chess_game.goto(0)
+    chess_game.goto(3)
+    assert chess_game.fen() == (
+        'rnbqkbnr/pppp1ppp/8/4p3/2B1P3/8/PPPP1PPP/RNBQK1NR b KQkq - 1 2'
+    )
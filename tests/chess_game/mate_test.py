@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import mate
+from chess_game.rules import ChessRules
+
+
+BACK_RANK = '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'
+TWO_ROOKS = '6k1/5ppp/8/8/8/8/8/RR4K1 w - - 0 1'
+LEGAL = 'r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP3/3P4/PPP2PPP/R2bK2R w KQkq - 1 1'
+CORNERED = 'kbK5/pp6/1P6/8/8/8/8/R7 w - - 0 1'
+INITIAL = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def ucis(moves):
+    return [move.uci for move in moves]
+
+@pytest.mark.parametrize(('fen', 'mate_in', 'line'), [
+    (BACK_RANK, 1, ['a1a8']),
+    (LEGAL, 2, ['d5f6', 'g7f6', 'c4f7']),
+    (CORNERED, 2, ['a1a6', 'b7a6', 'b6b7']),
+])
+def test_solves_unique_mates(fen, mate_in, line):
+    chess_rules = ChessRules.from_fen(fen)
+    solution = mate.solve(chess_rules, 3)
+    assert solution.mate_in == mate_in
+    assert ucis(solution.line) == line
+    assert solution.unique
+    assert chess_rules.to_fen() == fen
+
+def test_reports_every_first_move():
+    solution = mate.solve(ChessRules.from_fen(TWO_ROOKS), 2)
+    assert solution.mate_in == 1
+    assert sorted(ucis(solution.first_moves)) == ['a1a8', 'b1b8']
+    assert not solution.unique
+
+def test_no_mate():
+    assert mate.solve(ChessRules.from_fen(INITIAL), 2) is None
+
+def test_proven_positions_are_cached():
+    solver = mate.MateSolver(ChessRules.from_fen(LEGAL))
+    assert solver.mates_in(2)
+    misses = solver.proven_cache.misses
+    assert solver.mates_in(2)
+    assert not solver.mates_in(1)
+    assert solver.proven_cache.misses == misses
+
+def test_solve_puzzles(tmpdir):
+    path = tmpdir.join('puzzles.txt')
+    path.write('# A comment.\n{0};1\n{1}\n{2};1\n'.format(BACK_RANK, TWO_ROOKS,
+                                                          INITIAL))
+    results = list(mate.solve_puzzles(mate.read_puzzles(str(path)),
+                                      processes=2))
+    assert [result.mate_in for result in results] == [1, 1, None]
+    assert results[0].line == ('a1a8',)
+    assert len(results[1].first_moves) == 2
+
+@pytest.mark.parametrize('fen', [LEGAL, CORNERED, INITIAL,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    '8/8/8/1k6/3Pp3/8/8/4KQ2 b - d3 0 1',
+    '5k2/8/8/8/8/8/8/4K2R w K - 0 1'])
+def test_checking_moves(fen):
+    chess_rules = ChessRules.from_fen(fen)
+    assert sorted(ucis(chess_rules.iterate_checking_moves())) == sorted(
+        move.uci for move in chess_rules.generate_legal_moves()
+        if chess_rules.delivers_check(move)
+    )
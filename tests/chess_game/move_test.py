@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import ChessGame, common, move, pieces, rules
+from chess_game.position import Position
+
+
+MOVES = ['e4', 'e5', 'Nf3', 'Nc6', 'Bc4', 'Nd4', 'Nxe5', 'Qg5', 'Nxf7',
+         'Qxg2', 'Rf1', 'Qxe4+', 'Be2', 'Nf3#']
+
+
+@pytest.fixture
+def counted_rules(monkeypatch):
+    calls = []
+    delivers_check = rules.ChessRules.delivers_check
+    def counting_delivers_check(self, move):
+        calls.append(move.uci)
+        return delivers_check(self, move)
+    monkeypatch.setattr(rules.ChessRules, 'delivers_check',
+                        counting_delivers_check)
+    return calls
+
+def test_eager_finalization_checks_once(counted_rules):
+    chess_game = ChessGame()
+    for algebraic_move in MOVES:
+        chess_game.make_move_from_algebraic(algebraic_move)
+    assert len(counted_rules) == len(MOVES)
+
+def test_lazy_finalization_does_no_san_work(counted_rules):
+    chess_game = ChessGame(lazy_finalization=True)
+    ucis = [chess_game.make_move_from_algebraic(algebraic_move).uci
+            for algebraic_move in MOVES]
+    assert ucis[:3] == ['e2e4', 'e7e5', 'g1f3']
+    assert counted_rules == []
+
+def test_lazy_finalization_matches_eager():
+    chess_game = ChessGame(lazy_finalization=True)
+    finalized_moves = [chess_game.make_move_from_algebraic(algebraic_move)
+                       for algebraic_move in MOVES]
+    fen = chess_game.fen()
+    # Computed long after the moves were made, from the right positions.
+    assert [move.algebraic for move in finalized_moves] == MOVES
+    assert chess_game.fen() == fen
+    assert len(chess_game._rules.moves) == len(MOVES)
+    assert finalized_moves[-1].is_checkmate
+
+def test_lazy_values_are_memoised(counted_rules):
+    chess_game = ChessGame(lazy_finalization=True)
+    finalized_move = chess_game.make_move_from_algebraic('e4')
+    finalized_move.algebraic
+    finalized_move.algebraic
+    assert counted_rules == ['e2e4']
+
+def test_lazy_move_taken_back_is_stale():
+    chess_game = ChessGame(lazy_finalization=True)
+    chess_game.make_move_from_algebraic('e4')
+    finalized_move = chess_game.make_move_from_algebraic('e5')
+    chess_game._rules.pop()
+    chess_game._rules.pop()
+    with pytest.raises(common.StaleMoveError):
+        finalized_move.algebraic
+
+def test_lazy_move_replaced_in_history_is_stale():
+    chess_game = ChessGame(lazy_finalization=True)
+    chess_game.make_move_from_algebraic('e4')
+    finalized_move = chess_game.make_move_from_algebraic('e5')
+    chess_game._rules.pop()
+    chess_game._rules.pop()
+    chess_game.make_move_from_algebraic('d4')
+    chess_game.make_move_from_algebraic('e5')
+    with pytest.raises(common.StaleMoveError):
+        finalized_move.delivers_check
+    assert len(chess_game._rules.moves) == 2
+
+@pytest.mark.parametrize(('uci', 'flag'), [
+    ('e2e4', move.NORMAL),
+    ('a7a8q', move.PROMOTION),
+    ('h2h1n', move.PROMOTION),
+    ('d5e6', move.ENPASSANT),
+    ('e1g1', move.CASTLING),
+])
+def test_move_codes_round_trip(uci, flag):
+    chess_rules = rules.ChessRules()
+    code = move.encode_move(Position.make(uci[:2]), Position.make(uci[2:4]),
+                            pieces.Piece.get_promotion_class(uci[4:] or None),
+                            flag)
+    assert 0 <= code < 1 << 16
+    assert move.move_flag(code) == flag
+    assert move.decode_move(code, chess_rules).uci == uci
+
+def test_history_is_stored_as_move_codes():
+    chess_game = ChessGame()
+    chess_game.make_moves_from_long_uci_string('e2e4d7d5e4d5c7c5d5c6b8c6')
+    history = chess_game._rules.moves
+    assert history.codes.typecode == 'H'
+    assert [decoded.uci for decoded in history] == [
+        'e2e4', 'd7d5', 'e4d5', 'c7c5', 'd5c6', 'b8c6'
+    ]
+    assert move.move_flag(history.codes[4]) == move.ENPASSANT
+    assert history[-1].uci == 'b8c6'
+    assert [decoded.uci for decoded in history[:2]] == ['e2e4', 'd7d5']
+
+def test_history_moves_describe_their_positions():
+    chess_game = ChessGame()
+    for algebraic_move in MOVES:
+        chess_game.make_move_from_algebraic(algebraic_move)
+    history = chess_game._rules.moves
+    fen = chess_game.fen()
+    assert [decoded.algebraic for decoded in history] == MOVES
+    assert history[0].algebraic == 'e4'
+    assert repr(history[0]) == 'Move(e4)'
+    assert [decoded.algebraic for decoded in history[-3::2]] == [
+        'Qxe4+', 'Nf3#'
+    ]
+    assert chess_game.fen() == fen
+    assert len(history) == len(MOVES)
+
+def test_moves_are_slotted():
+    chess_game = ChessGame()
+    finalized_move = chess_game.make_move_from_algebraic('e4')
+    assert not hasattr(finalized_move, '__dict__')
+    assert not hasattr(chess_game._rules.moves[0], '__dict__')
+    assert not hasattr(chess_game._rules, '__dict__')
@@ -192,6 +192,21 @@ def test_no_move_found(notation_processor):
     with pytest.raises(common.ImpossibleMoveError):
         notation_processor.parse_algebraic_move('Qcb2')
 
+@pytest.mark.parametrize('algebraic_move', ['Qz9', 'i4', 'xyz', '+', 'Zf3',
+                                            'e8=Z', 'O-O-O-O', 'Oxf3'])
+def test_malformed_move_error(notation_processor, algebraic_move):
+    with pytest.raises(common.InvalidNotationError):
+        notation_processor.parse_algebraic_move(algebraic_move)
+
+def test_pinned_piece_is_not_ambiguous():
+    chess_rules = rules.ChessRules.from_fen(
+        '2R5/8/6k1/8/8/8/K1R4r/8 w - - 0 1'
+    )
+    move = notation.ChessNotationProcessor(chess_rules).parse_algebraic_move(
+        'Rc7'
+    )
+    assert move.uci == 'c8c7'
+
 def test_ambiguous_move_error(chess_rules, notation_processor):
     chess_rules['c2'] = pieces.Queen(common.color.WHITE)
     chess_rules['c3'] = pieces.Queen(common.color.WHITE)
@@ -204,6 +219,63 @@ def test_detects_checkmate(cleared_board):
     chess_rules = rules.ChessRules(cleared_board)
     assert Move('a7', 'e7', chess_rules).algebraic == 'Qae7#'
 
+def test_legal_moves_san_matches_algebraic():
+    chess_rules = rules.ChessRules.from_fen(
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+    )
+    san_moves = chess_rules.legal_moves_san()
+    assert sorted(san_moves) == sorted(
+        move.algebraic for move in chess_rules.generate_legal_moves()
+    )
+    assert san_moves['O-O'].uci == 'e1g1'
+    assert san_moves['Nxf7'].uci == 'e5f7'
+    assert san_moves['Qxf6'].uci == 'f3f6'
+
+def test_legal_moves_san_checks_and_promotions():
+    chess_rules = rules.ChessRules.from_fen(
+        'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8'
+    )
+    san_moves = chess_rules.legal_moves_san()
+    assert san_moves['dxc8=Q'].uci == 'd7c8q'
+    assert san_moves['Bxf7'].uci == 'c4f7'
+    assert 'Bh6' in san_moves
+    chess_rules = rules.ChessRules.from_fen('6k1/5ppp/8/8/8/8/1B6/R3K3 w Q - 0 1')
+    san_moves = chess_rules.legal_moves_san()
+    assert san_moves['Ra8#'].uci == 'a1a8'
+    # A discovered check by the bishop.
+    chess_rules = rules.ChessRules.from_fen('7k/8/8/8/8/2N5/1B6/4K3 w - - 0 1')
+    assert 'Ne4+' in chess_rules.legal_moves_san()
+
+def test_legal_moves_san_ignores_pinned_pieces():
+    # The knight on e6 is pinned, so the other knight needs no
+    # disambiguation.
+    chess_rules = rules.ChessRules.from_fen(
+        'r1b5/1p1kbp1r/2p1n1pp/p3p2P/4n3/PPNPq1PB/2PBP3/R2Q1KR1 b - - 8 23'
+    )
+    san_moves = chess_rules.legal_moves_san()
+    assert san_moves['Nc5'].uci == 'e4c5'
+    assert 'N4c5' not in san_moves
+
+@pytest.mark.parametrize('fen', [
+    'r1b5/1p1kbp1r/2p1n1pp/p3p2P/4n3/PPNPq1PB/2PBP3/R2Q1KR1 b - - 8 23',
+    '2R5/8/6k1/8/8/8/K1R4r/8 w - - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+])
+def test_legal_moves_san_parse_back(fen):
+    chess_rules = rules.ChessRules.from_fen(fen)
+    notation_processor = notation.ChessNotationProcessor(chess_rules)
+    for san, legal_move in chess_rules.legal_moves_san().iteritems():
+        assert notation_processor.parse_algebraic_move(san).uci == \
+            legal_move.uci
+
+def test_legal_moves_san_castling_checks():
+    chess_rules = rules.ChessRules.from_fen('5k2/8/8/8/8/8/8/4K2R w K - 0 1')
+    assert chess_rules.legal_moves_san()['O-O+'].uci == 'e1g1'
+    chess_rules = rules.ChessRules.from_fen(
+        '4rkr1/4p1p1/8/8/8/8/8/4K2R w K - 0 1'
+    )
+    assert chess_rules.legal_moves_san()['O-O#'].uci == 'e1g1'
+
 
 if __name__ == '__main__':
     T.run()
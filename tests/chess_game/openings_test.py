@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import move, openings, pieces
+from chess_game.position import Position
+from chess_game.rules import ChessRules
+
+
+PGN_TEXT = '''[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Result "0-1"]
+
+1. e4 c5 2. Nf3 d6 0-1
+
+[Result "1/2-1/2"]
+
+1. d4 d5 2. c4 e6 1/2-1/2
+
+[Result "*"]
+
+1. e4 e5 2. Nf3 Nf6 *
+
+[Result "1-0"]
+
+1. e4 e5 2. Qz9 Nc6 1-0
+
+[Result "0-1"]
+
+1. e4 e5 2. Zf3 Nc6 0-1
+
+[Result "0-1"]
+
+1. e4 e5 2. O-O-O-O Nc6 0-1
+'''
+
+
+@pytest.fixture
+def pgn_path(tmpdir):
+    path = tmpdir.join('games.pgn')
+    path.write(PGN_TEXT)
+    return str(path)
+
+def stats_by_uci(index, chess_rules):
+    return dict((stats.uci, stats[1:]) for stats in index.probe(chess_rules))
+
+@pytest.mark.parametrize('max_entries', [1 << 20, 2])
+def test_build_and_lookup(tmpdir, pgn_path, max_entries):
+    index_path = str(tmpdir.join('games.cgoi'))
+    openings.build_index([pgn_path], index_path, max_entries=max_entries)
+    with openings.OpeningIndex(index_path) as index:
+        chess_rules = ChessRules()
+        # The last three games stop at their bad second move.
+        assert index.probe(chess_rules)[0] == openings.MoveStats(
+            'e2e4', 6, 2, 0, 3
+        )
+        assert stats_by_uci(index, chess_rules)['d2d4'] == (1, 0, 1, 0)
+        chess_rules = ChessRules.from_fen(
+            'rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2'
+        )
+        assert stats_by_uci(index, chess_rules) == {'b8c6': (1, 1, 0, 0),
+                                                    'g8f6': (1, 0, 0, 0)}
+        assert index.probe(ChessRules.from_fen(
+            '4k3/8/8/8/8/8/8/4K3 w - - 0 1'
+        )) == []
+
+def test_max_plies(tmpdir, pgn_path):
+    index_path = str(tmpdir.join('games.cgoi'))
+    assert openings.build_index([pgn_path], index_path, max_plies=1) == 2
+    with openings.OpeningIndex(index_path) as index:
+        assert len(index) == 2
+
+def test_empty_collection(tmpdir):
+    pgn_path = tmpdir.join('empty.pgn')
+    pgn_path.write('')
+    index_path = str(tmpdir.join('empty.cgoi'))
+    assert openings.build_index([str(pgn_path)], index_path) == 0
+    with openings.OpeningIndex(index_path) as index:
+        assert index.probe(ChessRules()) == []
+
+@pytest.mark.parametrize(('uci', 'flag'), [
+    ('g1f3', move.NORMAL),
+    ('b7b8n', move.PROMOTION),
+    ('e7e8q', move.PROMOTION),
+    ('e5d6', move.ENPASSANT),
+    ('e8c8', move.CASTLING),
+])
+def test_code_to_uci(uci, flag):
+    code = move.encode_move(Position.make(uci[:2]), Position.make(uci[2:4]),
+                            pieces.Piece.get_promotion_class(uci[4:] or None),
+                            flag)
+    assert openings._code_to_uci(code) == uci
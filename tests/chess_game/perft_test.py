@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import StringIO
+
+import pytest
+
+from chess_game import perft
+from chess_game.position import Position
+from chess_game.rules import ChessRules
+from chess_game.bitboard import BitboardChessBoard
+from chess_game.board import BasicChessBoard
+
+
+@pytest.mark.parametrize('board_class', [BasicChessBoard, BitboardChessBoard])
+@pytest.mark.parametrize('perft_position', perft.STANDARD_POSITIONS,
+                         ids=[position.name for position in perft.STANDARD_POSITIONS])
+def test_standard_positions(perft_position, board_class):
+    chess_rules = ChessRules.from_fen(perft_position.fen, board_class)
+    assert perft.perft(chess_rules, 2) == perft_position.node_counts[1]
+
+def test_divide():
+    chess_rules = ChessRules.from_fen(perft.STANDARD_POSITIONS[0].fen)
+    counts = perft.divide(chess_rules, 2)
+    assert len(counts) == 20
+    assert counts['e2e4'] == 20
+    assert sum(counts.values()) == 400
+
+def test_benchmark_and_baseline():
+    out = StringIO.StringIO()
+    results = perft.run_benchmark(max_depth=1, out=out)
+    assert [result['nodes'] for result in results.values()] == \
+        [position.node_counts[0] for position in perft.STANDARD_POSITIONS]
+    ratios = perft.compare_to_baseline(results, results, out=out)
+    assert set(ratios) <= set(results)
+
+def test_benchmark_rejects_wrong_counts():
+    wrong_position = perft.PerftPosition(
+        'wrong', perft.STANDARD_POSITIONS[0].fen, [21]
+    )
+    with pytest.raises(perft.NodeCountError) as excinfo:
+        perft.run_benchmark([wrong_position], out=StringIO.StringIO())
+    assert 'perft(1) = 20, expected 21' in str(excinfo.value)
+
+@pytest.mark.parametrize('board_class', [BasicChessBoard, BitboardChessBoard])
+def test_move_generation_skips_position_conversion(monkeypatch, board_class):
+    perft_position = perft.STANDARD_POSITIONS[1]
+    chess_rules = ChessRules.from_fen(perft_position.fen, board_class)
+    conversions = []
+    make = Position.make.im_func
+    def counting_make(cls, incoming):
+        conversions.append(incoming)
+        return make(cls, incoming)
+    monkeypatch.setattr(Position, 'make', classmethod(counting_make))
+    assert perft.perft(chess_rules, 2) == perft_position.node_counts[1]
+    assert conversions == []
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import ChessGame, pgn
+
+
+PGN_TEXT = '''[Event "First"]
+[White "Alice"]
+[Black "Bob \\"The Rook\\""]
+[Result "1-0"]
+
+1. e4 {best by test} e5 2. Nf3 (2. f4 exf4 (2... d5) 3. Nf3) 2... Nc6 $1
+3. Bc4 Nf6?! 4. Ng5 d5 5. exd5 Na5 6. d3 h6 7. Nf3 e4 8. Qe2 Nxc4 9. dxc4
+Bc5 10. Nfd2 0-0 ; castles
+11. Nb3 Re8 1-0
+
+[Event "Second"]
+[Result "*"]
+
+1.d4 d5 2.c4 *
+[Event "Third"]
+[Result "0-1"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+'''
+
+
+@pytest.fixture
+def pgn_path(tmpdir):
+    path = tmpdir.join('games.pgn')
+    path.write(PGN_TEXT)
+    return str(path)
+
+def test_read_games(pgn_path):
+    games = list(pgn.read_games(pgn_path))
+    assert [game.tags['Event'] for game in games] == ['First', 'Second', 'Third']
+    assert games[0].tags['Black'] == 'Bob "The Rook"'
+    assert games[0].moves[:6] == ['e4', 'e5', 'Nf3', 'Nc6', 'Bc4', 'Nf6?!']
+    assert games[0].moves[-4:] == ['Nfd2', 'O-O', 'Nb3', 'Re8']
+    assert [game.result for game in games] == ['1-0', '*', '0-1']
+    assert games[1].moves == ['d4', 'd5', 'c4']
+    assert PGN_TEXT[games[2].offset:].startswith('[Event "Third"]')
+
+def test_moves_replay(pgn_path):
+    for game in pgn.read_games(pgn_path):
+        chess_game = ChessGame()
+        for algebraic_move in game.moves:
+            chess_game.make_move_from_algebraic(algebraic_move)
+    assert chess_game._rules.in_checkmate
+
+def test_tag_filter_skips_games(pgn_path, monkeypatch):
+    parsed = []
+    parse_movetext = pgn.parse_movetext
+    def recording_parse_movetext(movetext):
+        parsed.append(movetext)
+        return parse_movetext(movetext)
+    monkeypatch.setattr(pgn, 'parse_movetext', recording_parse_movetext)
+    games = list(pgn.read_games(
+        pgn_path, tag_filter=lambda tags: tags['Result'] != '*'
+    ))
+    assert [game.tags['Event'] for game in games] == ['First', 'Third']
+    assert len(parsed) == 2
+
+def test_empty_file(tmpdir):
+    path = tmpdir.join('empty.pgn')
+    path.write('')
+    assert list(pgn.read_games(str(path))) == []
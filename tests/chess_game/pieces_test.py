@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from chess_game import board, common, pieces
+
+
+@pytest.mark.parametrize('piece_class', [pieces.King, pieces.Queen,
+                                         pieces.Rook, pieces.Bishop,
+                                         pieces.Knight, pieces.Pawn])
+def test_pieces_are_shared(piece_class):
+    white = piece_class(common.color.WHITE)
+    assert piece_class(common.color.WHITE) is white
+    assert piece_class(1) is white
+    assert piece_class(1).color is common.color.WHITE
+    assert piece_class(common.color.WHITE.opponent).color is common.color.BLACK
+    assert piece_class(common.color.BLACK) is not white
+    assert pickle.loads(pickle.dumps(white)) is white
+    assert not hasattr(white, '__dict__')
+
+def test_board_squares_share_pieces():
+    chess_board = board.BasicChessBoard()
+    assert chess_board[0, 1] is chess_board[0, 6]
+    assert len(set(id(chess_board[index]) for index in range(64))) == 13
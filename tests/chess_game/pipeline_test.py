@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import notation, pgn, pipeline, rules
+
+
+GAMES = [
+    ('1-0', '1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 1-0'),
+    ('*', '1. d4 d5 2. c4 *'),
+    ('0-1', '1. e4 e5 2. Ke2 Ke7 3. Ke3 Ra3 0-1'),
+    ('1/2-1/2', '1. e3 a5 2. Qh5 Ra6 3. Qxa5 h5 4. h4 Rah6 5. Qxc7 f6 '
+                '6. Qxd7+ Kf7 7. Qxb7 Qd3 8. Qxb8 Qh7 9. Qxc8 Kg6 10. Qe6 1/2-1/2'),
+]
+
+
+@pytest.fixture
+def pgn_path(tmpdir):
+    path = tmpdir.join('games.pgn')
+    path.write(''.join(
+        '[Event "Game {0}"]\n[Result "{1}"]\n\n{2}\n\n'.format(index, result, movetext)
+        for _ in range(5) for index, (result, movetext) in enumerate(GAMES)
+    ))
+    return str(path)
+
+def test_split_into_chunks_breaks_at_game_starts(pgn_path):
+    data = open(pgn_path).read()
+    chunks = list(pipeline.split_into_chunks(data, 10))
+    assert len(chunks) == 20
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for start, end in chunks:
+        assert data[start:].startswith('[Event')
+        assert len(list(pgn.iterate_games(data, start=start, end=end))) == 1
+
+def test_validate_ordered(pgn_path):
+    results = list(pipeline.validate_pgn_file(pgn_path, processes=2,
+                                              chunk_bytes=100, max_in_flight=3))
+    assert [result.tags['Event'] for result in results] == \
+        ['Game {0}'.format(index) for _ in range(5) for index in range(4)]
+    assert [result.status for result in results[:4]] == \
+        [pipeline.CHECKMATE, pipeline.ONGOING, None, pipeline.STALEMATE]
+    illegal = results[2]
+    assert not illegal.legal
+    assert illegal.error_ply == 5
+    assert 'Error' in illegal.error
+    assert results[0].plies == 7
+
+def test_validate_unordered(pgn_path):
+    results = list(pipeline.validate_pgn_file(pgn_path, processes=2,
+                                              ordered=False, chunk_bytes=100))
+    assert sorted(result.offset for result in results) == \
+        [game.offset for game in pgn.read_games(pgn_path)]
+    assert sum(result.legal for result in results) == 15
+
+def test_pinned_piece_needs_no_disambiguation(tmpdir):
+    # The rook on c2 is pinned, so 'Rc7' can only be the one on c8.
+    path = tmpdir.join('pinned.pgn')
+    path.write('[Result "*"]\n\n1. Rc7 Kf5 *\n')
+    chess_rules = rules.ChessRules.from_fen('2R5/8/6k1/8/8/8/K1R4r/8 w - - 0 1')
+    result = pipeline.validate_game(
+        next(pgn.read_games(str(path))), chess_rules,
+        notation.ChessNotationProcessor(chess_rules)
+    )
+    assert (result.legal, result.plies) == (True, 2)
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_worker_errors_are_raised(monkeypatch, pgn_path, ordered):
+    def broken_make_legal_move(self, move, lazy=None):
+        raise ZeroDivisionError()
+    monkeypatch.setattr(rules.ChessRules, 'make_legal_move',
+                        broken_make_legal_move)
+    with pytest.raises(ZeroDivisionError):
+        list(pipeline.validate_pgn_file(pgn_path, processes=2,
+                                        ordered=ordered, chunk_bytes=100))
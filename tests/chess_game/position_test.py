@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from chess_game import board, common, pieces
+from chess_game.bitboard import BitboardChessBoard
+from chess_game.position import ALL_POSITIONS, Position
+
+
+def test_positions_are_interned():
+    e4 = Position.make('e4')
+    assert Position(28) is e4
+    assert Position.make((3, 4)) is e4
+    assert Position.from_rank_file(3, 4) is e4
+    assert Position.from_index(28) is e4
+    assert ALL_POSITIONS[28] is e4
+    assert pickle.loads(pickle.dumps(e4)) is e4
+
+@pytest.mark.parametrize('incoming', ['i1', 'a9', (8, 0), 64, -1])
+def test_invalid_positions(incoming):
+    with pytest.raises((common.IllegalPositionError, AssertionError)):
+        Position.make(incoming)
+
+@pytest.mark.parametrize('board_class', [board.BasicChessBoard,
+                                         BitboardChessBoard])
+def test_index_fast_paths_match_position_access(board_class):
+    chess_board = board_class()
+    delta_board = board.DeltaChessBoard(chess_board)
+    delta_board.set_piece_at_index(28, pieces.Queen(common.color.WHITE))
+    for index, position in enumerate(ALL_POSITIONS):
+        assert chess_board.get_piece_at_index(index) is chess_board[position]
+        assert delta_board.get_piece_at_index(index) is delta_board[position]
+    assert delta_board['e4'] is pieces.Queen(common.color.WHITE)
+    assert chess_board['e4'] is pieces.Empty
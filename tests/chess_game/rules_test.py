@@ -57,6 +57,64 @@ class ClearBoardChessRulesTestCase(ClearedBoardPlayableChessGameTestCase):
         T.assert_equal(self.chess_board[7, 2], pieces.King(common.color.BLACK))
         T.assert_equal(self.chess_board[7, 3], pieces.Rook(common.color.BLACK))
 
+    def test_get_attackers(self):
+        self.set_piece('e4', pieces.Rook(common.color.BLACK))
+        self.set_piece('b4', pieces.Bishop(common.color.BLACK))
+        self.set_piece('c2', pieces.Knight(common.color.BLACK))
+        self.set_piece('f2', pieces.Pawn(common.color.BLACK))
+        self.set_piece('e2', pieces.Pawn(common.color.WHITE))
+        self.assert_position_sets_equal(
+            self.chess_rules.get_attackers('e1', by_color=common.color.BLACK),
+            ['b4', 'c2', 'f2']
+        )
+        T.assert_equal(
+            self.chess_rules.is_square_threatened('e1', by_color=common.color.BLACK),
+            True
+        )
+
+        self.set_piece('e2', pieces.Empty)
+        self.assert_position_sets_equal(
+            self.chess_rules.get_attackers('e1', by_color=common.color.BLACK),
+            ['b4', 'c2', 'e4', 'f2']
+        )
+
+        # Pawns only threaten the squares they could capture on.
+        self.assert_position_sets_equal(
+            self.chess_rules.get_attackers('f1', by_color=common.color.BLACK),
+            []
+        )
+        T.assert_equal(
+            self.chess_rules.is_square_threatened('f1', by_color=common.color.BLACK),
+            False
+        )
+
+    def test_pinned_pieces_stay_on_pin_ray(self):
+        self.set_piece('e4', pieces.Rook(common.color.WHITE))
+        self.set_piece('e7', pieces.Rook(common.color.BLACK))
+        self.set_piece('c3', pieces.Bishop(common.color.WHITE))
+        self.set_piece('a5', pieces.Queen(common.color.BLACK))
+        self.assert_position_sets_equal(
+            self.chess_rules.get_legal_moves('e4'),
+            ['e2', 'e3', 'e5', 'e6', 'e7']
+        )
+        self.assert_position_sets_equal(
+            self.chess_rules.get_legal_moves('c3'),
+            ['b4', 'a5', 'd2']
+        )
+
+    def test_en_passant_cannot_expose_king(self):
+        self.chess_rules['e1'] = pieces.Empty
+        self.chess_rules['a5'] = pieces.King(common.color.WHITE)
+        self.chess_board[4, 1] = pieces.Pawn(common.color.WHITE)
+        self.chess_board[6, 2] = pieces.Pawn(common.color.BLACK)
+        self.chess_board[4, 7] = pieces.Rook(common.color.BLACK)
+        self.chess_rules.action = common.color.BLACK
+        self.make_legal_move((6, 2), (4, 2))
+        self.assert_position_sets_equal(
+            self.chess_rules.get_legal_moves('b5'),
+            ['b6']
+        )
+
 
 class DefaultBoardChessRulesTestCase(BasePlayableChessGameTestCase):
 
@@ -216,6 +274,24 @@ class DefaultBoardChessRulesTestCase(BasePlayableChessGameTestCase):
             (1, 6), (3, 6)
         )
 
+    def test_generate_legal_moves(self):
+        T.assert_equal(
+            sorted(move.uci for move in self.chess_rules.generate_legal_moves()),
+            sorted(
+                ['{0}{1}{0}{2}'.format(file_char, 2, rank)
+                 for file_char in 'abcdefgh' for rank in (3, 4)] +
+                ['b1a3', 'b1c3', 'g1f3', 'g1h3']
+            )
+        )
+
+        self.chess_board[6, 0] = pieces.Pawn(common.color.WHITE)
+        promotions = [move for move in self.chess_rules.generate_legal_moves()
+                      if move.source == Position.make('a7')]
+        T.assert_equal(
+            sorted(move.uci for move in promotions),
+            ['a7b8b', 'a7b8n', 'a7b8q', 'a7b8r']
+        )
+
     def test_active_color_error(self):
         T.assert_raises(
             common.ActiveColorError,
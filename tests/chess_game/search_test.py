@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import search
+from chess_game.rules import ChessRules
+
+
+def test_evaluation_is_symmetric():
+    chess_rules = ChessRules()
+    assert search.evaluate(chess_rules) == 0
+    chess_rules = ChessRules.from_fen(
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 b Qkq - 0 1'
+    )
+    assert search.evaluate(chess_rules) == 500
+
+@pytest.mark.parametrize(('fen', 'best_move'), [
+    # Scholar's mate.
+    ('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4',
+     'h5f7'),
+    # A hanging queen.
+    ('rnb1kbnr/pppp1ppp/8/4p1q1/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 1',
+     'c1g5'),
+    # Back rank mate.
+    ('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'a1a8'),
+])
+def test_finds_best_move(fen, best_move):
+    chess_rules = ChessRules.from_fen(fen)
+    result = search.search(chess_rules, max_depth=3)
+    assert result.best_move.uci == best_move
+    assert chess_rules.to_fen() == fen
+    assert len(chess_rules.moves) == 0
+
+def test_mate_scores_count_plies():
+    chess_rules = ChessRules.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+    result = search.search(chess_rules, max_depth=4)
+    assert result.score == search.MATE_SCORE - 1
+    assert [move.uci for move in result.principal_variation] == ['a1a8']
+
+def test_limits_and_report():
+    chess_rules = ChessRules()
+    results = []
+    result = search.search(chess_rules, max_depth=10, max_nodes=500,
+                           on_iteration=results.append)
+    assert results and result == results[-1]
+    assert result.depth < 10
+    assert result.nodes <= 500
+    assert result.nodes_per_second > 0
+    assert len(chess_rules.moves) == 0
+
+def test_aborted_first_iteration_still_suggests_a_move():
+    chess_rules = ChessRules()
+    result = search.search(chess_rules, max_nodes=1)
+    assert result.depth == 0
+    assert result.best_move is not None
+
+def test_no_move_when_checkmated():
+    chess_rules = ChessRules.from_fen(
+        'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3'
+    )
+    result = search.search(chess_rules, max_depth=3)
+    assert result.best_move is None
+    assert result.score == -search.MATE_SCORE
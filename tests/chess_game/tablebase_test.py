@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import tablebase
+from chess_game.rules import ChessRules
+
+
+MATE_IN_ONE = '7k/8/6K1/8/8/8/8/5Q2 w - - 0 1'
+CHECKMATED = 'k7/1Q6/1K6/8/8/8/8/8 b - - 0 1'
+STALEMATED = 'k7/8/1Q6/8/8/8/8/7K b - - 0 1'
+HANGING_QUEEN = '8/8/8/8/8/8/1k6/1Q5K b - - 0 1'
+
+
+@pytest.fixture(scope='module')
+def kqk():
+    return tablebase.generate('KQK')
+
+@pytest.fixture
+def tablebases(kqk):
+    tablebases = tablebase.TablebaseSet()
+    tablebases.add(kqk)
+    return tablebases
+
+def test_longest_mate(kqk):
+    # Ten moves, the last of which mates.
+    assert max(kqk.values) == 19
+
+@pytest.mark.parametrize(('fen', 'result'), [
+    (MATE_IN_ONE, tablebase.TablebaseResult(tablebase.WIN, 1)),
+    (CHECKMATED, tablebase.TablebaseResult(tablebase.LOSS, 0)),
+    (STALEMATED, tablebase.TablebaseResult(tablebase.DRAW, None)),
+    (HANGING_QUEEN, tablebase.TablebaseResult(tablebase.DRAW, None)),
+])
+def test_probe(tablebases, fen, result):
+    assert ChessRules.from_fen(fen).probe_tablebase(tablebases) == result
+
+def test_probe_with_colors_reversed(tablebases):
+    assert ChessRules.from_fen('7K/8/6k1/8/8/8/8/5q2 b - - 0 1').probe_tablebase(
+        tablebases
+    ) == tablebase.TablebaseResult(tablebase.WIN, 1)
+
+def test_values_agree_with_moves(tablebases):
+    chess_rules = ChessRules.from_fen('8/8/8/3k4/8/8/8/Q3K3 w - - 0 1')
+    result = chess_rules.probe_tablebase(tablebases)
+    assert result.outcome == tablebase.WIN
+    replies = []
+    for move in chess_rules.generate_legal_moves():
+        chess_rules.push(move)
+        replies.append(chess_rules.probe_tablebase(tablebases))
+        chess_rules.pop()
+    assert min(reply.plies for reply in replies
+               if reply.outcome == tablebase.LOSS) == result.plies - 1
+
+def test_uncovered_positions(tablebases):
+    assert ChessRules.from_fen(
+        '4k3/8/8/8/8/8/8/R3K3 w Q - 0 1'
+    ).probe_tablebase(tablebases) is None
+    assert ChessRules.from_fen(MATE_IN_ONE).probe_tablebase(
+        tablebase.TablebaseSet()
+    ) is None
+
+def test_probe_ignores_unusable_enpassant_square(tablebases):
+    chess_rules = ChessRules.from_fen('7k/8/6K1/8/8/8/8/5Q2 w - e6 0 1')
+    assert chess_rules.probe_tablebase(tablebases) == tablebase.TablebaseResult(
+        tablebase.WIN, 1
+    )
+
+@pytest.mark.parametrize(('fen', 'available'), [
+    ('4k3/8/8/8/3p4/8/4P3/4K3 b - - 0 1', False),
+    ('4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1', True),
+    ('8/8/8/8/k2pP2R/8/8/4K3 b - e3 0 1', False),
+    ('4k3/8/8/8/2p1P3/8/8/4K3 b - e3 0 1', False),
+])
+def test_can_capture_enpassant(fen, available):
+    assert tablebase._can_capture_enpassant(
+        ChessRules.from_fen(fen)
+    ) == available
+
+def test_trivial_draws(tablebases):
+    assert ChessRules.from_fen(
+        '4k3/8/8/8/8/8/8/2B1K3 w - - 0 1'
+    ).probe_tablebase(tablebases) == tablebase.TablebaseResult(tablebase.DRAW,
+                                                               None)
+
+def test_files_are_memory_mapped(tmpdir, kqk):
+    kqk.write(str(tmpdir.join('KQK.cgtb')))
+    tablebases = tablebase.TablebaseSet([str(tmpdir)])
+    mapped = tablebases.get('KQK')
+    assert mapped.offset is not None
+    assert all(mapped.value_at(index) == kqk.values[index]
+               for index in range(0, mapped.layout.size, 97))
+    assert ChessRules.from_fen(MATE_IN_ONE).probe_tablebase(
+        tablebases
+    ) == tablebase.TablebaseResult(tablebase.WIN, 1)
+    mapped.close()
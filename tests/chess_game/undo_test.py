@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from chess_game import board, common, notation, pieces, rules
+from chess_game import board, common, notation, rules
 
 
 @pytest.fixture
@@ -23,3 +23,37 @@ def test_no_move_found(notation_processor):
 def test_one_move_undo(chess_rules, notation_processor):
     finalized_move = chess_rules.make_legal_move(notation_processor.parse_algebraic_move('e4'))
     # assert finalized_move.board_state
+
+def board_state(chess_rules):
+    return ([chess_rules[index] for index in range(64)], chess_rules.action,
+            chess_rules.enpassant_position, chess_rules._castling_rights,
+            dict(chess_rules.king_position))
+
+def play(chess_rules, notation_processor, algebraic_moves):
+    for algebraic_move in algebraic_moves:
+        chess_rules.make_legal_move(
+            notation_processor.parse_algebraic_move(algebraic_move)
+        )
+
+def test_pop_restores_every_move(chess_rules, notation_processor):
+    algebraic_moves = ['e4', 'd5', 'exd5', 'c5', 'dxc6', 'Nf6', 'cxb7', 'e6',
+                       'bxa8=Q', 'Bc5', 'Nf3', 'O-O', 'Bc4', 'Qe7', 'O-O']
+    states = []
+    for algebraic_move in algebraic_moves:
+        states.append(board_state(chess_rules))
+        play(chess_rules, notation_processor, [algebraic_move])
+    for state in reversed(states):
+        chess_rules.pop()
+        assert board_state(chess_rules) == state
+    assert chess_rules.moves == []
+
+def test_push_and_pop_explore_in_place(chess_rules, notation_processor):
+    play(chess_rules, notation_processor, ['e4', 'e5', 'Qh5', 'Nc6', 'Bc4', 'Nf6'])
+    before = board_state(chess_rules)
+    mate = notation_processor.parse_algebraic_move('Qxf7')
+    chess_rules.push(mate)
+    assert chess_rules.in_checkmate
+    assert chess_rules.pop() == mate
+    assert board_state(chess_rules) == before
+    assert chess_rules.is_move_checkmate(mate)
+    assert board_state(chess_rules) == before
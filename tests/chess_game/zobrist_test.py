@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chess_game import board, common, notation, pieces, rules, zobrist
+
+
+@pytest.fixture
+def chess_rules():
+    return rules.ChessRules(board.BasicChessBoard())
+
+@pytest.fixture
+def notation_processor(chess_rules):
+    return notation.ChessNotationProcessor(chess_rules)
+
+def play(chess_rules, notation_processor, algebraic_moves):
+    for algebraic_move in algebraic_moves:
+        chess_rules.make_legal_move(
+            notation_processor.parse_algebraic_move(algebraic_move)
+        )
+        assert chess_rules.zobrist_key == zobrist.compute_key(chess_rules)
+
+def test_incremental_key_matches_recomputed_key(chess_rules, notation_processor):
+    play(chess_rules, notation_processor,
+         ['e4', 'd5', 'exd5', 'c5', 'dxc6', 'Nf6', 'cxb7', 'e6', 'bxa8=Q',
+          'Bc5', 'Nf3', 'O-O', 'Bc4', 'Qe7', 'O-O'])
+    while chess_rules.moves:
+        chess_rules.pop()
+        assert chess_rules.zobrist_key == zobrist.compute_key(chess_rules)
+
+@pytest.mark.parametrize(('first_moves', 'second_moves'), [
+    (['Nf3', 'Nf6', 'Nc3', 'Nc6'], ['Nc3', 'Nc6', 'Nf3', 'Nf6']),
+    # The last double push leaves an en-passant square no pawn can use.
+    (['e4', 'e6', 'd4'], ['d4', 'e6', 'e4']),
+    (['e4', 'd5', 'd4', 'e6'], ['d4', 'e6', 'e4', 'd5']),
+])
+def test_transpositions_share_a_key(first_moves, second_moves):
+    first_rules = rules.ChessRules()
+    second_rules = rules.ChessRules()
+    play(first_rules, notation.ChessNotationProcessor(first_rules),
+         first_moves)
+    play(second_rules, notation.ChessNotationProcessor(second_rules),
+         second_moves)
+    assert first_rules.zobrist_key == second_rules.zobrist_key
+    assert first_rules.zobrist_key == zobrist.compute_key(first_rules)
+
+def test_usable_enpassant_square_changes_the_key():
+    first_rules = rules.ChessRules()
+    second_rules = rules.ChessRules()
+    play(first_rules, notation.ChessNotationProcessor(first_rules),
+         ['e4', 'Nf6', 'e5', 'd5'])
+    play(second_rules, notation.ChessNotationProcessor(second_rules),
+         ['e3', 'd6', 'e4', 'Nf6', 'e5', 'd5'])
+    # Only the first position allows exd6.
+    assert first_rules.to_fen().split()[0] == second_rules.to_fen().split()[0]
+    assert first_rules.zobrist_key != second_rules.zobrist_key
+    assert first_rules.zobrist_key == zobrist.compute_key(first_rules)
+
+def test_key_covers_side_castling_and_enpassant(chess_rules, notation_processor):
+    initial_key = chess_rules.zobrist_key
+    chess_rules.action = common.color.BLACK
+    assert chess_rules.zobrist_key != initial_key
+    chess_rules.action = common.color.WHITE
+    assert chess_rules.zobrist_key == initial_key
+
+    play(chess_rules, notation_processor, ['Nf3', 'Nf6', 'Ng1', 'Ng8'])
+    assert chess_rules.zobrist_key == initial_key
+    play(chess_rules, notation_processor, ['Nf3', 'Nf6', 'Rg1', 'Rg8', 'Rh1', 'Rh8',
+                                           'Ng1', 'Ng8'])
+    assert chess_rules.zobrist_key != initial_key
+
+    chess_rules['e4'] = pieces.Pawn(common.color.WHITE)
+    assert chess_rules.zobrist_key == zobrist.compute_key(chess_rules)
+
+def test_delta_rules_inherit_the_key(chess_rules):
+    delta_rules = chess_rules.delta_rules
+    assert delta_rules.zobrist_key == chess_rules.zobrist_key
+    delta_rules['e4'] = pieces.Pawn(common.color.WHITE)
+    assert delta_rules.zobrist_key == zobrist.compute_key(delta_rules)